@@ -21,7 +21,25 @@ ALLOWED_HOSTS = []
 
 
 # Application definition
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# Sessions are served from the sessions cache and written to the database in batches, at most
+# a second after they are saved. The in-memory cache is only valid for a single process, see
+# SESSION_CACHE_REDIS below
+SESSION_ENGINE = 'website.sessions'
+SESSION_CACHE_ALIAS = 'sessions'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        # Least recently used sessions are evicted beyond MAX_ENTRIES, and every session after
+        # TIMEOUT seconds, so a save made by another process is seen by then at the latest
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -32,6 +50,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'channels',
     'website',
+    'users',
 ]
 # CHANNEL_LAYERS = {
 #     'default': {
@@ -46,17 +65,59 @@ INSTALLED_APPS = [
 #         'BACKEND': 'channels.layers.InMemoryChannelLayer',
 #     },
 # }
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'CONFIG': {
-            'hosts': [('127.0.0.1', 6379)],
+# "redis", "local" keeps the messages in the web process, "local-shared" shares them with the
+# game workers of this machine through a hub process listening on CHANNEL_LAYER_SOCKET
+CHANNEL_LAYER = os.environ.get('CHANNEL_LAYER', 'redis')
+if CHANNEL_LAYER == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [('127.0.0.1', 6379)],
+            },
         },
-    },
-}
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'website.layers.LocalChannelLayer',
+            'CONFIG': {
+                'capacity': 100,
+                'expiry': 60,
+            },
+        },
+    }
+    if CHANNEL_LAYER == 'local-shared':
+        CHANNEL_LAYERS['default']['CONFIG']['socket'] = os.environ.get('CHANNEL_LAYER_SOCKET', str(BASE_DIR / 'channels.sock'))
 
 ASGI_APPLICATION = 'addiction.asgi.application'
 
+# Number of game worker processes owning the rooms, 0 runs the game server in the web process
+POKER_GAME_WORKERS = int(os.environ.get('POKER_GAME_WORKERS', '0'))
+
+# Web server processes serving the site. With several of them or with game workers, the sessions
+# are cached in the Redis database at SESSION_CACHE_REDIS, shared by every process
+WEB_PROCESSES = int(os.environ.get('WEB_PROCESSES', '1'))
+SESSION_CACHE_REDIS = os.environ.get('SESSION_CACHE_REDIS', 'redis://127.0.0.1:6379/1')
+if POKER_GAME_WORKERS > 0 or WEB_PROCESSES > 1:
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': SESSION_CACHE_REDIS,
+        'TIMEOUT': None,
+    }
+
+# Redis url of the per room game event streams read by the front ends, no event log if empty
+POKER_EVENT_LOG_REDIS = os.environ.get('POKER_EVENT_LOG_REDIS', '')
+
+# Chip movements of the hands written to the users Transaction table
+POKER_LEDGER = os.environ.get('POKER_LEDGER', '1') == '1'
+
+# Hand histories written to the users PokerGame table, by batches of up to BATCH_SIZE hands
+# at most MAX_DELAY seconds after a hand is over
+POKER_HAND_HISTORY = os.environ.get('POKER_HAND_HISTORY', '1') == '1'
+POKER_HAND_HISTORY_BATCH_SIZE = int(os.environ.get('POKER_HAND_HISTORY_BATCH_SIZE', '100'))
+POKER_HAND_HISTORY_MAX_DELAY = float(os.environ.get('POKER_HAND_HISTORY_MAX_DELAY', '5'))
+
 
 
 
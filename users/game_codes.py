@@ -0,0 +1,91 @@
+import hashlib
+import string
+import threading
+
+from django.db import transaction
+from django.db.models import F
+
+
+class CodePermutation:
+    """
+    Reversible permutation of the numbers below ALPHABET ** LENGTH, written as codes.
+    A keyed Feistel network shuffles 32 bit numbers, numbers leaving the code range are
+    shuffled again until they are back in it (cycle walking).
+    """
+    ALPHABET = string.ascii_uppercase + string.digits
+    LENGTH = 6
+    ROUNDS = 4
+
+    def __init__(self, key: bytes):
+        self._key = hashlib.blake2b(key, digest_size=32).digest()
+        self.size = len(self.ALPHABET) ** self.LENGTH
+
+    def _round(self, half: int, i: int) -> int:
+        digest = hashlib.blake2b(half.to_bytes(2, "big") + bytes([i]), key=self._key, digest_size=2).digest()
+        return int.from_bytes(digest, "big")
+
+    def _shuffle(self, value: int) -> int:
+        left, right = value >> 16, value & 0xFFFF
+        for i in range(self.ROUNDS):
+            left, right = right, left ^ self._round(right, i)
+        return (left << 16) | right
+
+    def _unshuffle(self, value: int) -> int:
+        left, right = value >> 16, value & 0xFFFF
+        for i in reversed(range(self.ROUNDS)):
+            left, right = right ^ self._round(left, i), left
+        return (left << 16) | right
+
+    def encode(self, number: int) -> str:
+        if not 0 <= number < self.size:
+            raise ValueError("Game codes exhausted")
+        value = self._shuffle(number)
+        while value >= self.size:
+            value = self._shuffle(value)
+        code = []
+        for _ in range(self.LENGTH):
+            value, digit = divmod(value, len(self.ALPHABET))
+            code.append(self.ALPHABET[digit])
+        return "".join(reversed(code))
+
+    def decode(self, code: str) -> int:
+        value = 0
+        for char in code:
+            value = value * len(self.ALPHABET) + self.ALPHABET.index(char)
+        value = self._unshuffle(value)
+        while value >= self.size:
+            value = self._unshuffle(value)
+        return value
+
+
+class GameCodeAllocator:
+    """
+    Game codes of consecutive numbers of a database sequence, through the permutation. The process
+    reserves BLOCK_SIZE numbers at once, two queries per block and none per code.
+    """
+    BLOCK_SIZE = 100
+
+    def __init__(self, sequence_model, permutation: CodePermutation, block_size: int = BLOCK_SIZE):
+        self._sequence_model = sequence_model
+        self._permutation = permutation
+        self._block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def allocate(self) -> str:
+        with self._lock:
+            if self._next == self._end:
+                self._next, self._end = self._reserve()
+            number = self._next
+            self._next += 1
+        return self._permutation.encode(number)
+
+    def _reserve(self):
+        with transaction.atomic():
+            # The update locks the row, the value read after it is this process' block
+            if not self._sequence_model.objects.filter(pk=1).update(value=F("value") + self._block_size):
+                self._sequence_model.objects.get_or_create(pk=1)
+                self._sequence_model.objects.filter(pk=1).update(value=F("value") + self._block_size)
+            end = self._sequence_model.objects.values_list("value", flat=True).get(pk=1)
+        return end - self._block_size, end
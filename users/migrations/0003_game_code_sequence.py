@@ -0,0 +1,20 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_transaction_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameCodeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_start_time(apps, schema_editor):
+    GamePlayer = apps.get_model('users', 'GamePlayer')
+    PokerGame = apps.get_model('users', 'PokerGame')
+    GamePlayer.objects.update(
+        start_time=Subquery(PokerGame.objects.filter(pk=OuterRef('pokergame_id')).values('start_time')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_game_code_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The table of the players is kept, it becomes the GamePlayer model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='GamePlayer',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('pokergame', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.pokergame')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'users_pokergame_players',
+                        'unique_together': {('pokergame', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='pokergame',
+                    name='players',
+                    field=models.ManyToManyField(related_name='poker_games', through='users.GamePlayer', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='gameplayer',
+            name='start_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_start_time, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='gameplayer',
+            index=models.Index(fields=['user', '-start_time', '-pokergame'], name='gameplayer_user_history'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='transaction_user_history'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gameplayer',
+            name='start_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,5 +1,9 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .game_codes import CodePermutation, GameCodeAllocator
 
 # Player Profile Model
 class PlayerProfile(models.Model):
@@ -17,20 +21,34 @@ class Transaction(models.Model):
         ('deposit', 'Deposit'),
         ('withdraw', 'Withdraw'),
         ('bet', 'Bet'),
+        ('blind', 'Blind'),
+        ('win', 'Win'),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     transaction_type = models.CharField(max_length=50, choices=TRANSACTION_TYPES)
-    stripe_transaction_id = models.CharField(max_length=255)  # Ensure it aligns with Stripe data
+    stripe_transaction_id = models.CharField(max_length=255, blank=True, default='')  # Ensure it aligns with Stripe data
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Chip movements of the game, written by the bankroll ledger
+    player_id = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    game_id = models.CharField(max_length=64, blank=True, default='')
+    hand = models.IntegerField(null=True, blank=True)
+    units = models.BigIntegerField(default=0)  # Signed amount in cents, exact
+
+    class Meta:
+        indexes = [
+            # A user's history, newest first
+            models.Index(fields=["user", "-timestamp", "-id"], name="transaction_user_history"),
+        ]
 
     def __str__(self):
-        return f"{self.user.username} - {self.transaction_type} - ${self.amount}"
+        owner = self.user.username if self.user else self.player_id
+        return f"{owner} - {self.transaction_type} - ${self.amount}"
 
 # Poker Game Model
 class PokerGame(models.Model):
-    players = models.ManyToManyField(User, related_name="poker_games")
+    players = models.ManyToManyField(User, related_name="poker_games", through="GamePlayer")
     start_time = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField(null=True, blank=True)
     winner = models.ForeignKey(
@@ -40,21 +58,48 @@ class PokerGame(models.Model):
     game_log = models.TextField(null=True, blank=True)
     game_code = models.CharField(max_length=6, unique=True, null=True, blank=True)
 
+    CODE_ATTEMPTS = 10
+
     def generate_game_code(self):
-        """Generate a unique 6-character alphanumeric game code."""
-        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        while PokerGame.objects.filter(game_code=code).exists():  # Ensure uniqueness
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        self.game_code = code
+        """Set the next unique 6-character alphanumeric game code, without querying the games."""
+        self.game_code = game_codes.allocate()
 
     def save(self, *args, **kwargs):
         """Override save method to automatically generate the code before saving."""
-        if not self.game_code:
+        if self.game_code:
+            return super().save(*args, **kwargs)
+        for attempt in range(self.CODE_ATTEMPTS):
             self.generate_game_code()
-        super().save(*args, **kwargs)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Code already used by a game saved with a code of its own, the next one is free
+                self.game_code = None
+                if attempt == self.CODE_ATTEMPTS - 1:
+                    raise
 
     def __str__(self):
         return f"Game {self.id} - Pot: ${self.pot} - Code: {self.game_code}"
 
 
+# Players of a game, with the start of the game so a user's history is read from one index
+class GamePlayer(models.Model):
+    pokergame = models.ForeignKey(PokerGame, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    start_time = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "users_pokergame_players"
+        unique_together = [("pokergame", "user")]
+        indexes = [
+            models.Index(fields=["user", "-start_time", "-pokergame"], name="gameplayer_user_history"),
+        ]
+
+
+# Numbers of the game codes, a single row
+class GameCodeSequence(models.Model):
+    value = models.BigIntegerField(default=0)
+
 
+game_codes = GameCodeAllocator(GameCodeSequence, CodePermutation(settings.SECRET_KEY.encode()))
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from django.core.exceptions import BadRequest
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def keyset_page(queryset, time_field, key_field, cursor=None, size=50):
+    """
+    Page of the queryset, newest first, after the cursor of the previous page. The rows are found
+    from the cursor position in the (time_field, key_field) index instead of counted through with
+    an offset, a page costs the same at any depth.
+    """
+    if cursor:
+        try:
+            time_value, key_value = cursor.rsplit("_", 1)
+            time_value, key_value = datetime.fromisoformat(time_value), int(key_value)
+        except ValueError:
+            raise BadRequest("Invalid page cursor")
+        queryset = queryset.filter(
+            Q(**{f"{time_field}__lt": time_value}) | Q(**{time_field: time_value, f"{key_field}__lt": key_value})
+        )
+    rows = list(queryset.order_by(f"-{time_field}", f"-{key_field}")[:size + 1])
+    items, more = rows[:size], len(rows) > size
+    next_cursor = None
+    if more:
+        last = items[-1]
+        next_cursor = f"{_value(last, time_field).isoformat()}_{_value(last, key_field)}"
+    return KeysetPage(items, next_cursor)
+
+
+def _value(row, field):
+    for name in field.split("__"):
+        row = getattr(row, name)
+    return row
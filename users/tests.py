@@ -1,3 +1,139 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+from urllib.parse import unquote
+
+from django.contrib.auth.models import User
+from django.core.exceptions import BadRequest
+from django.test import TestCase, RequestFactory
+from django.utils import timezone
+
+from . import views
+from .game_codes import CodePermutation, GameCodeAllocator
+from .models import PokerGame, GameCodeSequence, GamePlayer, Transaction
 
 # Create your tests here.
+
+
+class CodePermutationTestCase(TestCase):
+    def test_codes_are_unique_and_reversible(self):
+        permutation = CodePermutation(b'key')
+        codes = [permutation.encode(number) for number in range(2000)]
+        self.assertEqual(len(codes), len(set(codes)))
+        for number, code in enumerate(codes):
+            self.assertEqual(6, len(code))
+            self.assertTrue(set(code) <= set(CodePermutation.ALPHABET))
+            self.assertEqual(number, permutation.decode(code))
+
+    def test_codes_depend_on_key(self):
+        self.assertNotEqual(CodePermutation(b'one').encode(0), CodePermutation(b'two').encode(0))
+
+    def test_out_of_range_number(self):
+        permutation = CodePermutation(b'key')
+        with self.assertRaises(ValueError):
+            permutation.encode(permutation.size)
+
+
+class GameCodeAllocatorTestCase(TestCase):
+    def test_blocks_reserved_once(self):
+        allocator = GameCodeAllocator(GameCodeSequence, CodePermutation(b'key'), block_size=10)
+        codes = [allocator.allocate()]
+        with self.assertNumQueries(0):
+            codes += [allocator.allocate() for _ in range(9)]
+        with self.assertNumQueries(4):
+            # Savepoint, update, select and release
+            codes += [allocator.allocate() for _ in range(10)]
+        other = GameCodeAllocator(GameCodeSequence, CodePermutation(b'key'), block_size=10)
+        codes += [other.allocate() for _ in range(10)]
+        self.assertEqual(30, len(set(codes)))
+        self.assertEqual(30, GameCodeSequence.objects.get(pk=1).value)
+
+
+class PokerGameCodeTestCase(TestCase):
+    def test_create_does_not_query_codes(self):
+        PokerGame.objects.create(pot=0)
+        with self.assertNumQueries(3):
+            # Savepoint, insert and release
+            game = PokerGame.objects.create(pot=0)
+        self.assertEqual(6, len(game.game_code))
+
+    def test_taken_code_skipped(self):
+        from . import models
+        taken = PokerGame.objects.create(pot=0)
+        next_code = models.game_codes._permutation.encode(models.game_codes._next)
+        PokerGame.objects.filter(pk=taken.pk).update(game_code=next_code)
+        game = PokerGame.objects.create(pot=0)
+        self.assertNotEqual(next_code, game.game_code)
+        self.assertEqual(2, PokerGame.objects.filter(game_code__in=[next_code, game.game_code]).count())
+
+
+@patch.object(views, 'HISTORY_PAGE_SIZE', 3)
+class HistoryViewsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice')
+        self.other = User.objects.create(username='bob')
+        self.factory = RequestFactory()
+
+    def get(self, view, cursor=None):
+        request = self.factory.get('/', {'before': cursor} if cursor else {})
+        request.user = self.user
+        return view(request)
+
+    def next_cursor(self, response):
+        return unquote(response.content.decode().split('?before=')[1].split('"')[0])
+
+    def test_game_history_pages(self):
+        start = timezone.now()
+        games = []
+        for k in range(7):
+            game = PokerGame.objects.create(pot=k, winner=self.other)
+            # Games 2 and 3 started at the same time
+            start_time = start + timedelta(minutes=min(k, 2) if k <= 3 else k)
+            PokerGame.objects.filter(pk=game.pk).update(start_time=start_time)
+            game.players.add(self.user, self.other, through_defaults={'start_time': start_time})
+            games.append(game)
+        PokerGame.objects.create(pot=100).players.add(self.other)
+
+        seen = []
+        cursor = None
+        while True:
+            with self.assertNumQueries(1):
+                response = self.get(views.game_history, cursor)
+            self.assertEqual(200, response.status_code)
+            page_ids = [int(line.split('Game ')[1].split('<')[0]) for line in response.content.decode().split('<strong>')[1:]]
+            seen += page_ids
+            if b'Older games' not in response.content:
+                break
+            cursor = self.next_cursor(response)
+        self.assertEqual([game.id for game in reversed(games)], seen)
+        self.assertIn(b'bob', response.content)
+
+    def test_seats_added_without_start_time_page(self):
+        games = [PokerGame.objects.create(pot=k) for k in range(4)]
+        for game in games:
+            game.players.add(self.user)
+        self.assertFalse(GamePlayer.objects.filter(start_time__isnull=True).exists())
+
+        first = self.get(views.game_history)
+        self.assertIn(b'Older games', first.content)
+        second = self.get(views.game_history, self.next_cursor(first))
+        self.assertEqual(200, second.status_code)
+
+    def test_transaction_history_pages(self):
+        for k in range(5):
+            Transaction.objects.create(user=self.user, amount=Decimal(k), transaction_type='deposit')
+        Transaction.objects.create(user=self.other, amount=Decimal(9), transaction_type='deposit')
+        Transaction.objects.update(timestamp=timezone.now())
+
+        first = self.get(views.transaction_history)
+        self.assertEqual(3, first.content.count(b'Type:'))
+        cursor = self.next_cursor(first)
+        with self.assertNumQueries(1):
+            second = self.get(views.transaction_history, cursor)
+        self.assertEqual(2, second.content.count(b'Type:'))
+        self.assertNotIn(b'Older transactions', second.content)
+        self.assertNotIn(b'9.00', first.content + second.content)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(BadRequest):
+            self.get(views.transaction_history, 'not-a-cursor')
@@ -4,7 +4,10 @@ from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from .forms import UserRegisterForm
 from django.contrib.auth.views import LogoutView
-from .models import PokerGame, Transaction
+from .models import PokerGame, Transaction, GamePlayer
+from .pagination import keyset_page
+
+HISTORY_PAGE_SIZE = 50
 
 #Registration View
 def register(request):
@@ -41,22 +44,30 @@ class CustomLogoutView(LogoutView):
 
 
 #Game History
+@login_required
 def game_history(request):
-    games = PokerGame.objects.filter(players=request.user).order_by("-start_time")
-    return render(request, "users/game_history.html", {"games": games})
+    # Read from the user's seats, in the order of their (user, start_time, game) index
+    seats = GamePlayer.objects.filter(user=request.user).select_related("pokergame__winner").only(
+        "start_time", "pokergame__start_time", "pokergame__end_time", "pokergame__pot",
+        "pokergame__game_code", "pokergame__winner__username",
+    )
+    page = keyset_page(seats, "start_time", "pokergame_id", request.GET.get("before"), HISTORY_PAGE_SIZE)
+    games = [seat.pokergame for seat in page.items]
+    return render(request, "users/game_history.html", {"games": games, "next_cursor": page.next_cursor})
 
 
 #Transaction History
+@login_required
 def transaction_history(request):
-    transactions = Transaction.objects.filter(user=request.user).order_by("-timestamp")
-    return render(request, "users/transaction_history.html", {"transactions": transactions})
+    transactions = Transaction.objects.filter(user=request.user).only("transaction_type", "amount", "stripe_transaction_id", "timestamp")
+    page = keyset_page(transactions, "timestamp", "id", request.GET.get("before"), HISTORY_PAGE_SIZE)
+    return render(request, "users/transaction_history.html", {"transactions": page.items, "next_cursor": page.next_cursor})
 
 @login_required
 def create_game(request):
     """Create a new game room and generate a unique code."""
     game = PokerGame.objects.create(pot=0.00)  # You can set other game attributes as needed
-    game.players.add(request.user)  # Add the current user to the game as the first player
-    game.save()
+    game.players.add(request.user, through_defaults={"start_time": game.start_time})  # Add the current user to the game as the first player
     return redirect('game_room', game_code=game.game_code)
     #Redirects to the game room page
 
@@ -68,7 +79,7 @@ def join_game(request):
         try:
             game = PokerGame.objects.get(game_code=game_code)
             if game.players.count() < 6:  # Assuming max 6 players
-                game.players.add(request.user)  # Add the user to the game
+                game.players.add(request.user, through_defaults={"start_time": game.start_time})  # Add the user to the game
                 game.save()
                 return redirect('game_room', game_code=game.game_code)  # Redirect to the game room
             else:
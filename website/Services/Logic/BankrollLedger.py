@@ -0,0 +1,71 @@
+# website/Services/Logic/BankrollLedger.py
+
+import asyncio
+import collections
+import logging
+from decimal import Decimal
+from typing import Optional, List, Tuple, Deque
+
+from channels.db import database_sync_to_async
+
+from .PokerGame import HandLedger
+
+# (game id, hand number, [(player id, auth user id, minor units, kind)])
+LedgerHand = Tuple[str, int, List[Tuple[str, Optional[int], int, str]]]
+
+
+class BankrollLedger:
+    """
+    Chip movements of the hands, as signed minor units in the users Transaction table. Hands are
+    queued when they end and written by a background task, every hand queued since the last
+    write in one bulk insert: the betting never waits for the database.
+    """
+    BATCH_SIZE = 1000
+
+    def __init__(self, batch_size: int = BATCH_SIZE, logger: Optional[logging.Logger] = None):
+        self._batch_size: int = batch_size
+        self._pending: Deque[LedgerHand] = collections.deque()
+        self._writer: Optional[asyncio.Task] = None
+        self._logger = logger or logging.getLogger(__name__)
+
+    def hand_ledger(self, game_id: str, hand: int = 0) -> HandLedger:
+        return HandLedger(self, game_id, hand)
+
+    def submit(self, game_id: str, hand: int, entries: List[Tuple[str, Optional[int], int, str]]):
+        self._pending.append((game_id, hand, entries))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write())
+
+    async def flush(self):
+        """Waits until the queued hands are written."""
+        while self._writer is not None and not self._writer.done():
+            await self._writer
+
+    async def _write(self):
+        while self._pending:
+            batch = []
+            while self._pending and len(batch) < self._batch_size:
+                batch.append(self._pending.popleft())
+            try:
+                await database_sync_to_async(self._insert)(batch)
+            except Exception as e:
+                # Chips already moved at the table, losing the records must not stop the games
+                self._logger.error(f"Failed writing the chip movements of {len(batch)} hands: {e}")
+
+    @staticmethod
+    def _insert(batch: List[LedgerHand]):
+        from users.models import Transaction
+
+        Transaction.objects.bulk_create([
+            Transaction(
+                user_id=user_id,
+                player_id=player_id,
+                game_id=game_id,
+                hand=hand,
+                units=units,
+                amount=Decimal(units) / HandLedger.MINOR_UNITS,
+                transaction_type=kind,
+            )
+            for game_id, hand, entries in batch
+            for player_id, user_id, units, kind in entries
+        ])
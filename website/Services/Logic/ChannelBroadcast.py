@@ -0,0 +1,129 @@
+# website/Services/Logic/ChannelBroadcast.py
+
+import asyncio
+import logging
+import time
+from typing import Optional, List, Dict, Any, Iterable
+
+from channels.exceptions import ChannelFull
+
+async def _redis_send_many(channel_layer, channels: List[str], message: Dict[str, Any]) -> int:
+    # The layer maps the channels to their shard and adds __asgi_channel__ as group_send does
+    connection_keys, key_messages, key_capacities = channel_layer._map_channel_keys_to_connection(channels, message)
+
+    async def send_shard(index: int, keys: List[str]) -> int:
+        # Two round trips per shard, the checks of the layer's send: expired messages are dropped
+        # and the channels counted first, then the message goes to the channels below capacity
+        connection = channel_layer.connection(index)
+        pipe = connection.pipeline(transaction=False)
+        for key in keys:
+            pipe.zremrangebyscore(key, min=0, max=int(time.time()) - int(channel_layer.expiry))
+            pipe.zcount(key, "-inf", "+inf")
+        counts = (await pipe.execute())[1::2]
+        open_keys = [key for key, count in zip(keys, counts) if count < key_capacities[key]]
+        if open_keys:
+            pipe = connection.pipeline(transaction=False)
+            for key in open_keys:
+                pipe.zadd(key, {key_messages[key]: time.time()})
+                pipe.expire(key, int(channel_layer.expiry))
+            await pipe.execute()
+        return len(keys) - len(open_keys)
+
+    over_capacity = await asyncio.gather(*(send_shard(index, keys) for index, keys in connection_keys.items()))
+    return sum(over_capacity)
+
+
+async def send_many(channel_layer, channels: List[str], message: Dict[str, Any]) -> int:
+    """
+    Sends a message to every channel in as few round trips as the channel layer allows,
+    full channels miss the message as with group_send. Returns the number of full channels.
+    """
+    if not channels:
+        return 0
+    layer_send_many = getattr(channel_layer, "send_many", None)
+    if layer_send_many is not None:
+        return await layer_send_many(channels, message)
+    if hasattr(channel_layer, "_map_channel_keys_to_connection") and hasattr(channel_layer, "connection"):
+        # channels_redis, one pipeline per shard instead of one per channel. These are private, the
+        # version is pinned in requirements.txt and other versions fall back to the layer's send
+        return await _redis_send_many(channel_layer, channels, message)
+
+    results = await asyncio.gather(*(channel_layer.send(channel, message) for channel in channels), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception) and not isinstance(result, ChannelFull):
+            raise result
+    return sum(1 for result in results if isinstance(result, ChannelFull))
+
+
+class BroadcastMetrics:
+    """Batch size and latency of the broadcasts."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.batches: int = 0
+        self.messages: int = 0
+        self.over_capacity: int = 0
+        self.max_batch: int = 0
+        self.seconds: float = 0.0
+        self.max_seconds: float = 0.0
+
+    def observe(self, size: int, seconds: float, over_capacity: int = 0):
+        self.batches += 1
+        self.messages += size
+        self.over_capacity += over_capacity
+        self.max_batch = max(self.max_batch, size)
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "messages": self.messages,
+            "over_capacity": self.over_capacity,
+            "avg_batch": self.messages / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "avg_latency_ms": 1000 * self.seconds / self.batches if self.batches else 0.0,
+            "max_latency_ms": 1000 * self.max_seconds,
+        }
+
+
+class ChannelBroadcaster:
+    """
+    Broadcasts the frames of a room to players served by other processes in one channel layer
+    batch, players with a local channel get the frame directly.
+    Metrics are logged every METRICS_LOG_INTERVAL seconds.
+    """
+    METRICS_LOG_INTERVAL = 60.0
+
+    def __init__(self, channel_layer, logger: Optional[logging.Logger] = None):
+        self._channel_layer = channel_layer
+        self._logger = logger or logging.getLogger(__name__)
+        self.metrics = BroadcastMetrics()
+        self._metrics_logged_at = time.monotonic()
+
+    async def send_frame(self, players: Iterable, text: str):
+        channels = []
+        local_players = []
+        for player in players:
+            reply_channel = getattr(player.channel, "reply_channel", None)
+            if reply_channel is None:
+                local_players.append(player)
+            elif player.connected:
+                channels.append(reply_channel)
+
+        start = time.perf_counter()
+        over_capacity = await send_many(self._channel_layer, channels, {"type": "game.frame", "text": text})
+        self._observe(len(channels), time.perf_counter() - start, over_capacity)
+        for player in local_players:
+            await player.send_raw(text)
+
+    def _observe(self, size: int, seconds: float, over_capacity: int):
+        self.metrics.observe(size, seconds, over_capacity)
+        if over_capacity:
+            self._logger.warning(f"Broadcast missed {over_capacity} of {size} full channels")
+        now = time.monotonic()
+        if now - self._metrics_logged_at >= self.METRICS_LOG_INTERVAL:
+            self._logger.info(f"Broadcast metrics: {self.metrics.snapshot()}")
+            self.metrics.reset()
+            self._metrics_logged_at = now
@@ -0,0 +1,171 @@
+# website/Services/Logic/ChannelRedis.py
+
+import asyncio
+import json
+import logging
+from typing import Optional, Any, Dict, List, Callable, Awaitable
+from uuid import uuid4
+
+from redis import asyncio as aioredis
+from redis import exceptions
+
+from .PokerGame import MessageFormatError, MessageTimeout
+from .Player_ClientChannelServer import PlayerServer, ChannelError
+
+
+def create_redis(url: str = "redis://127.0.0.1:6379/0", max_connections: int = 64) -> aioredis.Redis:
+    """
+    Client on a connection pool shared by every queue of the process. No socket timeout,
+    blocking pops wait on the server for as long as they ask.
+    """
+    return aioredis.Redis(connection_pool=aioredis.ConnectionPool.from_url(url, max_connections=max_connections))
+
+
+def _decode(response: bytes) -> Any:
+    try:
+        return json.loads(response)
+    except ValueError:
+        raise MessageFormatError(desc="Unable to decode the JSON message")
+
+
+class MessageQueue:
+    """
+    Redis list of JSON messages, pushed on the left and popped on the right.
+    The list expires `expire` seconds after the last push.
+    """
+    def __init__(self, redis: aioredis.Redis, queue_name: str, expire: int = 300):
+        self._redis: aioredis.Redis = redis
+        self._queue_name: str = queue_name
+        self._expire: int = expire
+
+    @property
+    def name(self) -> str:
+        return self._queue_name
+
+    async def push(self, message: Any):
+        await self.push_raw(json.dumps(message, separators=(",", ":")))
+
+    async def push_raw(self, text: str):
+        """Pushes a message already encoded as JSON."""
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.lpush(self._queue_name, text)
+            pipe.expire(self._queue_name, self._expire)
+            await pipe.execute()
+        except exceptions.RedisError as e:
+            raise ChannelError(str(e))
+
+    async def pop(self, timeout_epoch: Optional[float] = None) -> Any:
+        """Waits on the server for the next message until timeout_epoch, on the event loop clock."""
+        timeout = 0
+        if timeout_epoch is not None:
+            timeout = timeout_epoch - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                raise MessageTimeout("Timed out")
+        try:
+            response = await self._redis.brpop([self._queue_name], timeout=timeout)
+        except exceptions.RedisError as e:
+            raise ChannelError(str(e))
+        if response is None:
+            raise MessageTimeout("Timed out")
+        return _decode(response[1])
+
+
+class ChannelRedis:
+    """
+    Channel of a PlayerServer whose websocket is served by another process, through two Redis queues.
+    """
+    def __init__(self, redis: aioredis.Redis, channel_in: str, channel_out: str):
+        self.queue_in = MessageQueue(redis, channel_in)
+        self.queue_out = MessageQueue(redis, channel_out)
+
+    async def send_json(self, message: Any):
+        await self.queue_out.push(message)
+
+    async def send(self, text_data: Optional[str] = None):
+        await self.queue_out.push_raw(text_data)
+
+    async def recv_message(self, timeout_epoch: Optional[float] = None) -> Any:
+        return await self.queue_in.pop(timeout_epoch)
+
+    def close(self):
+        pass
+
+
+class RedisChannelListener:
+    """
+    Waits for the incoming messages of many queues with one blocking pop on all of them, instead
+    of one connection per queue. A push to the listener's control key wakes the pop up when queues
+    are added or removed. The queues are rotated on every pop, a busy queue cannot starve the others.
+    """
+    def __init__(self, redis: aioredis.Redis, logger: Optional[logging.Logger] = None):
+        self._redis: aioredis.Redis = redis
+        self._control_key: str = f"poker:listener:{uuid4().hex}"
+        self._handlers: Dict[str, Callable[[Any], Awaitable[None]]] = {}
+        self._keys: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+        self._logger = logger or logging.getLogger(__name__)
+
+    async def subscribe(self, queue_name: str, handler: Callable[[Any], Awaitable[None]]):
+        self._handlers[queue_name] = handler
+        self._keys.append(queue_name)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        else:
+            await self._wake()
+
+    async def unsubscribe(self, queue_name: str):
+        if self._handlers.pop(queue_name, None) is not None:
+            self._keys.remove(queue_name)
+            await self._wake()
+
+    async def subscribe_player(self, player: PlayerServer, channel: ChannelRedis):
+        """Delivers the bets and pongs of the player's incoming queue."""
+        async def deliver(message: Any):
+            message_type = message.get("message_type")
+            if message_type == "bet":
+                await player.receive_bet(message)
+            elif message_type == "pong":
+                await player.handle_pong()
+            elif message_type == "disconnect":
+                await self.unsubscribe(channel.queue_in.name)
+                await player.disconnect()
+            else:
+                self._logger.warning(f"Unhandled message type {message_type} from player {player.id}")
+
+        await self.subscribe(channel.queue_in.name, deliver)
+
+    async def close(self):
+        self._handlers.clear()
+        self._keys.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _wake(self):
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.lpush(self._control_key, 1)
+        pipe.expire(self._control_key, 60)
+        await pipe.execute()
+
+    async def _run(self):
+        while self._keys:
+            try:
+                key, data = await self._redis.brpop([self._control_key, *self._keys], timeout=0)
+            except exceptions.RedisError as e:
+                self._logger.error(f"Listener pop failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            key = key.decode()
+            if key == self._control_key:
+                # Queues changed, the next pop waits on the new ones
+                continue
+            handler = self._handlers.get(key)
+            if handler is None:
+                continue
+            self._keys.remove(key)
+            self._keys.append(key)
+            try:
+                await handler(_decode(data))
+            except Exception as e:
+                self._logger.exception(f"Failed handling message from {key}: {e}")
@@ -0,0 +1,76 @@
+# website/Services/Logic/Equity.py
+
+import itertools
+import random
+from typing import Optional, List, Dict
+
+from .PokerGame import Card, Hand, HoldemHandEvaluator
+
+
+class EquityCalculator:
+    """
+    Win/tie probabilities of Hold'em hands against each other for a partial board.
+    Remaining boards are enumerated exactly when at most EXACT_MAX_MISSING cards are
+    missing, otherwise SAMPLES boards are drawn at random.
+    """
+    BOARD_SIZE = 5
+    EXACT_MAX_MISSING = 2
+    SAMPLES = 3000
+
+    def __init__(self, evaluator: Optional[HoldemHandEvaluator] = None, samples: int = SAMPLES, rng: Optional[random.Random] = None):
+        self._evaluator: HoldemHandEvaluator = evaluator or HoldemHandEvaluator()
+        self._samples: int = samples
+        self._rng: random.Random = rng or random.Random()
+
+    def calculate(self, players_cards: Dict[str, List[Card]], board: List[Card]) -> Dict[str, Dict[str, float]]:
+        return self.calculate_values(
+            {player_id: [int(card) for card in cards] for player_id, cards in players_cards.items()},
+            [int(card) for card in board]
+        )
+
+    def calculate_values(self, players_values: Dict[str, List[int]], board_values: List[int]) -> Dict[str, Dict[str, float]]:
+        if len(players_values) < 2:
+            raise ValueError("At least two players are needed")
+
+        dead = Hand(mask=0)
+        for values in [board_values, *players_values.values()]:
+            dead = dead | Hand(mask=sum(1 << value for value in values))
+        stub = [int(card) for card in Card.deck(2) if card not in dead]
+
+        missing = self.BOARD_SIZE - len(board_values)
+        if missing <= 0:
+            runouts = [()]
+        elif missing <= self.EXACT_MAX_MISSING:
+            runouts = itertools.combinations(stub, missing)
+        else:
+            runouts = (self._rng.sample(stub, missing) for _ in range(self._samples))
+
+        player_ids = list(players_values)
+        known = [players_values[player_id] + board_values for player_id in player_ids]
+        wins = [0] * len(player_ids)
+        ties = [0.0] * len(player_ids)
+        equity = [0.0] * len(player_ids)
+        strength = self._evaluator.strength
+        boards = 0
+
+        for runout in runouts:
+            boards += 1
+            strengths = [strength(values + list(runout)) for values in known]
+            best = max(strengths)
+            winners = [i for i, s in enumerate(strengths) if s == best]
+            if len(winners) == 1:
+                wins[winners[0]] += 1
+                equity[winners[0]] += 1.0
+            else:
+                for i in winners:
+                    ties[i] += 1
+                    equity[i] += 1.0 / len(winners)
+
+        return {
+            player_id: {
+                "win": wins[i] / boards,
+                "tie": ties[i] / boards,
+                "equity": equity[i] / boards,
+            }
+            for i, player_id in enumerate(player_ids)
+        }
@@ -0,0 +1,67 @@
+# website/Services/Logic/EvaluatorExecutor.py
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Dict
+
+from .PokerGame import HoldemHandEvaluator
+from .Equity import EquityCalculator
+
+# Per worker process instances, created by _init_worker
+_evaluator: Optional[HoldemHandEvaluator] = None
+_equity_calculator: Optional[EquityCalculator] = None
+
+
+def _init_worker(equity_samples: int):
+    global _evaluator, _equity_calculator
+    _evaluator = HoldemHandEvaluator()
+    _equity_calculator = EquityCalculator(evaluator=_evaluator, samples=equity_samples)
+
+
+def _evaluate_hands(hands: Dict[str, List[int]], board: List[int]) -> Dict[str, tuple]:
+    return {player_id: _evaluator.evaluate(values + board) for player_id, values in hands.items()}
+
+
+def _calculate_equity(hands: Dict[str, List[int]], board: List[int]) -> Dict[str, Dict[str, float]]:
+    return _equity_calculator.calculate_values(hands, board)
+
+
+class EvaluatorExecutor:
+    """
+    Runs hand evaluation and equity calculations in a process pool, so a table's
+    showdown never holds the event loop serving every other table.
+    Each call carries all the players' hands of a table and costs a single round trip.
+
+    The pool's processes outlive its owner unless it is shut down, and game workers each run
+    a pool of their own: size them with processes_per_worker.
+    """
+    def __init__(self, max_workers: Optional[int] = None, equity_samples: int = EquityCalculator.SAMPLES, logger: Optional[logging.Logger] = None):
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(equity_samples,)
+        )
+        self._logger = logger or logging.getLogger(__name__)
+
+    @staticmethod
+    def processes_per_worker(game_workers: int) -> int:
+        """
+        Pool size of each game worker: the CPU count divided among `game_workers`, at least 1.
+        With no game workers the pool gets the full CPU count.
+        """
+        return max(1, (os.cpu_count() or 1) // max(1, game_workers))
+
+    async def evaluate(self, hands: Dict[str, List[int]], board: List[int]) -> Dict[str, tuple]:
+        """Returns HoldemHandEvaluator.evaluate results by player id."""
+        return await asyncio.get_running_loop().run_in_executor(self._pool, _evaluate_hands, hands, board)
+
+    async def equity(self, hands: Dict[str, List[int]], board: List[int]) -> Dict[str, Dict[str, float]]:
+        return await asyncio.get_running_loop().run_in_executor(self._pool, _calculate_equity, hands, board)
+
+    def shutdown(self, wait: bool = True):
+        self._logger.info("Shutting down the evaluator executor.")
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,126 @@
+# website/Services/Logic/GameEventStream.py
+
+import asyncio
+import collections
+import json
+import logging
+from typing import Optional, List, Dict, Tuple, Any, Deque
+
+from redis import asyncio as aioredis
+from redis import exceptions
+
+from .PokerGame import GameSubscriber
+
+
+class GameEventStream(GameSubscriber):
+    """
+    Appends the game events of a room to its Redis stream. Events are buffered and written by
+    a background task in one pipeline per batch, the game never waits for Redis.
+    """
+    def __init__(self, event_log: 'GameEventLog', room_id: str):
+        self._event_log = event_log
+        self._room_id = room_id
+        self._pending: Deque[Tuple[str, Dict[str, str]]] = collections.deque()
+        self._writer: Optional[asyncio.Task] = None
+
+    async def game_event(self, event, event_data):
+        key = self._event_log.stream_key(self._room_id)
+        self._pending.append((key, {"event": event, "data": json.dumps(event_data, separators=(",", ":"))}))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write())
+
+    async def flush(self):
+        """Waits until the buffered events are written."""
+        while self._writer is not None and not self._writer.done():
+            await self._writer
+
+    async def _write(self):
+        while self._pending:
+            batch = list(self._pending)
+            self._pending.clear()
+            await self._event_log.append(batch)
+
+
+class GameEventLog:
+    """
+    Per room Redis streams of the game events, capped to about `maxlen` events each.
+    Front ends read the rooms' streams through consumer groups and replay them from the
+    last event id a reconnecting client has seen.
+
+    The events targeted at a player are in the room's stream too, in order with the others,
+    they are only read for their target.
+    """
+    KEY_PREFIX = "poker:room"
+    MAXLEN = 1000
+
+    def __init__(self, redis: aioredis.Redis, maxlen: int = MAXLEN, logger: Optional[logging.Logger] = None):
+        self._redis: aioredis.Redis = redis
+        self._maxlen: int = maxlen
+        self._logger = logger or logging.getLogger(__name__)
+
+    def stream_key(self, room_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{room_id}:events"
+
+    def subscriber(self, room_id: str) -> GameEventStream:
+        return GameEventStream(self, room_id)
+
+    async def append(self, entries: List[Tuple[str, Dict[str, str]]]):
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key, fields in entries:
+                pipe.xadd(key, fields, maxlen=self._maxlen, approximate=True)
+            await pipe.execute()
+        except exceptions.RedisError as e:
+            # The event log is not the game, the events are lost but the hand goes on
+            self._logger.error(f"Failed appending {len(entries)} game events: {e}")
+
+    async def ensure_group(self, room_id: str, group: str, start_id: str = "$"):
+        try:
+            await self._redis.xgroup_create(self.stream_key(room_id), group, id=start_id, mkstream=True)
+        except exceptions.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read_group(self, room_ids: List[str], group: str, consumer: str, player_id: Optional[str] = None, count: int = 100, block: Optional[int] = None) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        New events of the rooms for a consumer of the group, as (room id, event id, event) tuples,
+        without the events targeted at other players than player_id. Waits up to `block`
+        milliseconds when there are none. The events returned must be acknowledged.
+        """
+        keys = {self.stream_key(room_id): room_id for room_id in room_ids}
+        response = await self._redis.xreadgroup(group, consumer, {key: ">" for key in keys}, count=count, block=block)
+        events = []
+        for key, entries in response or []:
+            room_id = keys[_text(key)]
+            skipped = []
+            for event_id, fields in entries:
+                event = self._decode(fields)
+                if event.get("target", player_id) == player_id:
+                    events.append((room_id, _text(event_id), event))
+                else:
+                    skipped.append(_text(event_id))
+            # Nobody in this consumer is going to deliver them
+            await self.ack(room_id, group, *skipped)
+        return events
+
+    async def ack(self, room_id: str, group: str, *event_ids: str):
+        if event_ids:
+            await self._redis.xack(self.stream_key(room_id), group, *event_ids)
+
+    async def replay(self, room_id: str, last_event_id: str = "-", player_id: Optional[str] = None, count: int = MAXLEN) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Events of the room after last_event_id as (event id, event) tuples, without the events
+        targeted at other players than player_id.
+        """
+        start = "-" if last_event_id == "-" else f"({last_event_id}"
+        entries = await self._redis.xrange(self.stream_key(room_id), min=start, count=count)
+        events = [(_text(event_id), self._decode(fields)) for event_id, fields in entries]
+        return [(event_id, event) for event_id, event in events if event.get("target", player_id) == player_id]
+
+    @staticmethod
+    def _decode(fields: Dict[Any, Any]) -> Dict[str, Any]:
+        return json.loads(fields[b"data"] if b"data" in fields else fields["data"])
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
@@ -0,0 +1,209 @@
+# website/Services/Logic/GameSimulator.py
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Dict, Callable, Any
+
+from .PokerGame import Player, GameSubscriber, GamePacing, HoldemPokerGameFactory
+
+
+def random_strategy(rng: random.Random, fold_rate: float = 0.15, raise_rate: float = 0.25) -> Callable[[Dict[str, Any]], float]:
+    """Folds, calls or raises at random, never folds when checking is free."""
+    def decide(action: Dict[str, Any]) -> float:
+        min_bet, max_bet = action["min_bet"], action["max_bet"]
+        draw = rng.random()
+        if draw < fold_rate and min_bet > 0:
+            return -1
+        if draw < fold_rate + raise_rate and max_bet > min_bet:
+            return rng.randint(int(min_bet), int(max_bet))
+        return min_bet
+    return decide
+
+
+class BotPlayer(Player):
+    """
+    Player answering bet requests in memory, the PlayerServer message interface without a channel.
+    """
+    connected = False
+
+    def __init__(self, id: str, name: str, money: float, strategy: Callable[[Dict[str, Any]], float]):
+        super().__init__(id=id, name=name, money=money)
+        self._strategy = strategy
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self.errors: List[str] = []
+
+    def reset_money(self, money: float):
+        self._money = money
+
+    def act(self, action: Dict[str, Any]):
+        self._inbox.put_nowait({"message_type": "bet", "bet": self._strategy(action), "seq": action["seq"]})
+
+    async def recv_message(self, timeout_epoch: Optional[float] = None, seq: Optional[int] = None) -> Any:
+        return self._inbox.get_nowait()
+
+    async def send_message(self, message: Any):
+        if message.get("message_type") == "error":
+            self.errors.append(message.get("error"))
+
+
+class SimulationTable(GameSubscriber):
+    """
+    Routes the bet requests of a game to the bots and checks chips and pots on every update.
+    """
+    MAX_VIOLATION_SAMPLES = 20
+
+    def __init__(self, bots: List[BotPlayer]):
+        self._bots: Dict[str, BotPlayer] = {bot.id: bot for bot in bots}
+        self._total_chips: float = 0.0
+        self.violations: List[str] = []
+        self.violations_count: int = 0
+
+    def start_hand(self):
+        self._total_chips = self.chips()
+
+    def chips(self) -> float:
+        return sum(bot.money for bot in self._bots.values())
+
+    def check_hand(self, hand: int):
+        if self.chips() != self._total_chips:
+            self._violation(f"Hand {hand}: {self._total_chips} chips before, {self.chips()} after")
+
+    def _violation(self, description: str):
+        self.violations_count += 1
+        if len(self.violations) < self.MAX_VIOLATION_SAMPLES:
+            self.violations.append(description)
+
+    async def game_event(self, event, event_data):
+        if event == "player-action" and event_data["action"] == "bet":
+            self._bots[event_data["player"]["id"]].act(event_data)
+        elif event == "pots-update":
+            self._check_pots(event_data["pots"])
+        elif event == "winner-designation":
+            pot = event_data["pot"]
+            if not set(pot["winner_ids"]) <= set(pot["player_ids"]):
+                self._violation(f"Winners {pot['winner_ids']} not in pot {pot['player_ids']}")
+            if pot["money_split"] * len(pot["winner_ids"]) > pot["money"]:
+                self._violation(f"Pot of {pot['money']} split {pot['money_split']} to {len(pot['winner_ids'])} winners")
+
+    def _check_pots(self, pots: List[Dict[str, Any]]):
+        for pot in pots:
+            if pot["money"] <= 0 or not pot["player_ids"]:
+                self._violation(f"Invalid pot {pot}")
+        # Between streets every bet is in a pot
+        on_table = sum(pot["money"] for pot in pots)
+        if on_table + self.chips() != self._total_chips:
+            self._violation(f"Pots hold {on_table}, players {self.chips()}, {self._total_chips} chips expected")
+
+
+class _ErrorCounter(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+class GameSimulator:
+    """
+    Plays hands of HoldemPokerGame between bots with no pacing, for regression and capacity testing.
+    Bots busting out of the table get their starting stack back before the next hand.
+    """
+    def __init__(self, players: int = 6, money: float = 1000, big_blind: float = 50, small_blind: float = 25, seed: Optional[int] = None):
+        self._money = money
+        self._rng = random.Random(seed)
+        self._bots = [
+            BotPlayer(f"bot-{k}", f"Bot {k}", money, random_strategy(self._rng))
+            for k in range(players)
+        ]
+        self._table = SimulationTable(self._bots)
+        self._logger = logging.getLogger(f"{__name__}.game")
+        self._logger.setLevel(logging.WARNING)
+        self._logger.propagate = False
+        self._errors = _ErrorCounter()
+        self._logger.addHandler(self._errors)
+        self._big_blind = big_blind
+        self._game_factory = HoldemPokerGameFactory(
+            big_blind=big_blind,
+            small_blind=small_blind,
+            logger=self._logger,
+            game_subscribers=[self._table],
+            pacing=GamePacing.profile("simulation")
+        )
+
+    async def play(self, hands: int) -> Dict[str, Any]:
+        dealer_key = -1
+        bet_errors = 0
+        for hand in range(hands):
+            seated = [bot for bot in self._bots if bot.money >= self._big_blind]
+            if len(seated) < 2:
+                for bot in self._bots:
+                    bot.reset_money(self._money)
+                seated = self._bots
+
+            dealer_key = (dealer_key + 1) % len(seated)
+            self._table.start_hand()
+            game = self._game_factory.create_game(seated, hand=hand)
+            await game.play_hand(seated[dealer_key].id)
+            self._table.check_hand(hand)
+
+        for bot in self._bots:
+            bet_errors += len(bot.errors)
+            bot.errors.clear()
+
+        return {
+            "hands": hands,
+            "violations": self._table.violations_count,
+            "violation_samples": list(self._table.violations),
+            "bet_errors": bet_errors,
+            "game_errors": self._errors.count,
+        }
+
+
+def _simulate(hands: int, players: int, seed: Optional[int]) -> Dict[str, Any]:
+    random.seed(seed)
+    return asyncio.run(GameSimulator(players=players, seed=seed).play(hands))
+
+
+def run_simulation(hands: int, players: int = 6, workers: Optional[int] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+    """Splits the hands across a process pool and merges the reports of every worker."""
+    workers = workers or os.cpu_count() or 1
+    chunks = [hands // workers + (1 if k < hands % workers else 0) for k in range(workers)]
+    seeds = [None if seed is None else seed + k for k in range(workers)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        reports = list(pool.map(_simulate, [c for c in chunks if c], [players] * workers, seeds))
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "hands": sum(r["hands"] for r in reports),
+        "seconds": elapsed,
+        "violations": sum(r["violations"] for r in reports),
+        "violation_samples": [sample for r in reports for sample in r["violation_samples"]],
+        "bet_errors": sum(r["bet_errors"] for r in reports),
+        "game_errors": sum(r["game_errors"] for r in reports),
+    }
+    report["hands_per_second"] = report["hands"] / elapsed if elapsed else 0.0
+    return report
+
+
+if __name__ == "__main__":
+    #python -m website.Services.Logic.GameSimulator --hands 100000
+    parser = argparse.ArgumentParser(description="Plays Hold'em hands between bots and checks the game invariants.")
+    parser.add_argument("--hands", type=int, default=10000)
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    result = run_simulation(args.hands, players=args.players, workers=args.workers, seed=args.seed)
+    print(f"{result['hands']} hands in {result['seconds']:.2f}s ({result['hands_per_second']:.0f} hands/s)")
+    print(f"Invariant violations: {result['violations']}, rejected bets: {result['bet_errors']}, game errors: {result['game_errors']}")
+    for sample in result["violation_samples"]:
+        print(f"  {sample}")
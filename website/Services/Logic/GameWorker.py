@@ -0,0 +1,280 @@
+# website/Services/Logic/GameWorker.py
+
+import asyncio
+import logging
+from importlib import import_module
+from typing import Optional, List, Dict, Any, Set
+
+from channels.layers import get_channel_layer
+
+from .HashRing import ConsistentHashRing
+from .Game_RoomServer import GameServer, GameRoom
+from .Player_ClientChannelServer import PlayerServer
+from .TimerWheel import TimerWheel
+
+# Group of the workers and the web consumers, worker membership changes are sent to it
+RING_GROUP = "poker-ring"
+# Group of the workers only
+WORKERS_GROUP = "poker-workers"
+
+_worker_ring: Optional[ConsistentHashRing] = None
+
+
+def worker_name(k: int) -> str:
+    return f"poker-worker-{k}"
+
+
+def get_worker_ring() -> ConsistentHashRing:
+    """Room owners as seen by the web consumers of this process."""
+    global _worker_ring
+    if _worker_ring is None:
+        from django.conf import settings
+        _worker_ring = ConsistentHashRing(worker_name(k) for k in range(settings.POKER_GAME_WORKERS))
+    return _worker_ring
+
+
+def set_worker_ring(workers: List[str]):
+    global _worker_ring
+    if _worker_ring is None or sorted(_worker_ring.nodes) != sorted(workers):
+        _worker_ring = ConsistentHashRing(workers)
+
+
+class RemoteChannel:
+    """
+    Channel of a PlayerServer whose websocket is served by another process,
+    messages reach the player's consumer through the channel layer.
+    """
+    def __init__(self, channel_layer, reply_channel: str):
+        self._channel_layer = channel_layer
+        self.reply_channel = reply_channel
+
+    async def send_json(self, message):
+        await self._channel_layer.send(self.reply_channel, {"type": "game.message", "message": message})
+
+    async def send(self, text_data=None):
+        await self._channel_layer.send(self.reply_channel, {"type": "game.frame", "text": text_data})
+
+
+class GameWorker:
+    """
+    Runs the rooms of a GameServer that hash to this worker on the ring of all workers.
+    The web consumers send the players' messages to the room owner over the channel layer.
+
+    When a worker joins, the ring changes and rooms move to their new owner once no game
+    is being played in them. Until every worker has handed its rooms over, a message reaching
+    a worker that does not have the room is forwarded to the room's previous owner, and from
+    there back to its owner if the room is not there either.
+    """
+    MIGRATION_CHECK_INTERVAL = 1.0
+    MAX_HOPS = 3
+
+    def __init__(self, name: str, workers: List[str], game_server: GameServer, channel_layer=None, logger: Optional[logging.Logger] = None):
+        self.name = name
+        self._game_server = game_server
+        self._ring = ConsistentHashRing(workers)
+        self._previous_ring: Optional[ConsistentHashRing] = None
+        # Workers of the previous ring which may still have rooms this worker owns
+        self._draining_workers: Set[str] = set()
+        self._channel_layer = channel_layer or get_channel_layer()
+        self._migrating: Set[str] = set()
+        self._migration_timer = None
+        self._running = True
+        self._logger = logger or logging.getLogger(__name__)
+
+        self._room_handlers = {
+            "player.join": self._player_join,
+            "player.bet": self._player_bet,
+            "player.pong": self._player_pong,
+            "player.start": self._player_start,
+            "player.leave": self._player_leave,
+            "room.adopt": self._room_adopt,
+            "spectator.join": self._spectator_join,
+            "spectator.leave": self._spectator_leave,
+        }
+
+    async def run(self):
+        others = [worker for worker in self._ring.nodes if worker != self.name]
+        if others:
+            self._set_previous_ring(ConsistentHashRing(others))
+        await self._channel_layer.group_add(RING_GROUP, self.name)
+        await self._channel_layer.group_add(WORKERS_GROUP, self.name)
+        # Announces this worker, the others hand over the rooms it now owns
+        await self._channel_layer.group_send(RING_GROUP, {"type": "ring.update", "workers": self._ring.nodes})
+        self._logger.info(f"Worker {self.name} running, workers: {self._ring.nodes}")
+        while self._running:
+            message = await self._channel_layer.receive(self.name)
+            try:
+                await self.dispatch(message)
+            except Exception as e:
+                self._logger.exception(f"Worker {self.name} failed handling {message.get('type')}: {e}")
+
+    def stop(self):
+        self._running = False
+
+    async def dispatch(self, message: Dict[str, Any]):
+        if message["type"] == "ring.update":
+            await self._ring_update(message["workers"])
+            return
+        if message["type"] == "worker.drained":
+            self._worker_drained(message["worker"])
+            return
+        handler = self._room_handlers.get(message["type"])
+        if handler is None:
+            self._logger.warning(f"Worker {self.name} ignoring message {message['type']}")
+            return
+
+        target = self._route(message)
+        if target == self.name:
+            await handler(message)
+        else:
+            await self._channel_layer.send(target, {**message, "hops": message.get("hops", 0) + 1, "forwarded": True})
+
+    def _route(self, message: Dict[str, Any]) -> str:
+        room_id = message["room_id"]
+        if self._game_server.get_room(room_id) is not None or message.get("hops", 0) >= self.MAX_HOPS:
+            return self.name
+        owner = self._ring.get(room_id)
+        if owner != self.name:
+            return owner
+        if not message.get("forwarded") and self._previous_ring is not None:
+            # The room may still be on its previous owner, playing a hand
+            return self._previous_ring.get(room_id) or self.name
+        return self.name
+
+    def _set_previous_ring(self, ring: ConsistentHashRing):
+        self._previous_ring = ring
+        self._draining_workers = set(ring.nodes) - {self.name}
+
+    def _worker_drained(self, worker: str):
+        self._draining_workers.discard(worker)
+        if not self._draining_workers and self._previous_ring is not None:
+            self._logger.info(f"Worker {self.name}: every room is on its owner")
+            self._previous_ring = None
+
+    async def _ring_update(self, workers: List[str]):
+        if sorted(workers) != sorted(self._ring.nodes):
+            self._logger.info(f"Worker {self.name} ring update: {workers}")
+            self._set_previous_ring(self._ring)
+            self._ring = ConsistentHashRing(workers)
+            self._migrating.update(room.id for room in self._game_server.rooms if self._ring.get(room.id) != self.name)
+        await self._migrate_idle_rooms()
+
+    async def _migrate_idle_rooms(self):
+        self._migration_timer = None
+        for room_id in list(self._migrating):
+            room = self._game_server.get_room(room_id)
+            owner = self._ring.get(room_id)
+            if room is None or owner == self.name:
+                self._migrating.discard(room_id)
+            elif not room.active:
+                self._migrating.discard(room_id)
+                await self._hand_over(room, owner)
+
+        if not self._migrating:
+            await self._channel_layer.group_send(WORKERS_GROUP, {"type": "worker.drained", "worker": self.name})
+        elif self._migration_timer is None:
+            self._migration_timer = TimerWheel.shared().call_later(
+                self.MIGRATION_CHECK_INTERVAL,
+                lambda: asyncio.get_running_loop().create_task(self._migrate_idle_rooms())
+            )
+
+    async def _hand_over(self, room: GameRoom, owner: str):
+        spectators = room.spectators.channels()
+        self._game_server.release_room(room)
+        await self._channel_layer.send(owner, {
+            "type": "room.adopt",
+            "room_id": room.id,
+            "private": room.private,
+            "hands_played": room.hands_played,
+            "players": [
+                {"id": player.id, "name": player.name, "money": player.money, "reply_channel": player.channel.reply_channel, "user_id": player.user_id, "session_key": player.session_key}
+                for player in room.players.values()
+            ],
+            "ready_players": list(room.start_votes),
+            "spectators": [
+                {"id": spectator_id, "reply_channel": channel.reply_channel}
+                for spectator_id, channel in spectators.items()
+            ],
+            "forwarded": True,
+        })
+        self._logger.info(f"Room {room.id} handed over to {owner}")
+
+    def _create_player(self, player: Dict[str, Any]) -> PlayerServer:
+        return PlayerServer(
+            id=player["id"],
+            name=player["name"],
+            money=player["money"],
+            channel=RemoteChannel(self._channel_layer, player["reply_channel"]),
+            logger=self._logger,
+            user_id=player.get("user_id"),
+            session_key=player.get("session_key")
+        )
+
+    async def _room_adopt(self, message: Dict[str, Any]):
+        room = self._game_server.get_room(message["room_id"])
+        if room is None:
+            room = self._game_server.room_factory.create_room(id=message["room_id"], private=message["private"])
+            room.hands_played = message.get("hands_played", 0)
+            self._game_server.adopt_room(room)
+        for player in message["players"]:
+            await room.join(self._create_player(player))
+        room.start_votes.update(player_id for player_id in message["ready_players"] if player_id in room.players)
+        for spectator in message.get("spectators", []):
+            room.watch(spectator["id"], RemoteChannel(self._channel_layer, spectator["reply_channel"]))
+
+    async def _spectator_join(self, message: Dict[str, Any]):
+        room = self._game_server.get_room(message["room_id"])
+        spectator = message["spectator"]
+        if room is None:
+            await RemoteChannel(self._channel_layer, spectator["reply_channel"]).send_json({"message_type": "error", "error": "Room not found."})
+            return
+        room.watch(spectator["id"], RemoteChannel(self._channel_layer, spectator["reply_channel"]))
+
+    async def _spectator_leave(self, message: Dict[str, Any]):
+        room = self._game_server.get_room(message["room_id"])
+        if room is not None:
+            room.stop_watching(message["spectator_id"])
+
+    async def _player_join(self, message: Dict[str, Any]):
+        await self._game_server._join_private_room(self._create_player(message["player"]), message["room_id"])
+
+    def _get_player(self, message: Dict[str, Any]) -> Optional[PlayerServer]:
+        room = self._game_server.get_room(message["room_id"])
+        player = room.players.get(message["player_id"]) if room is not None else None
+        if player is None:
+            self._logger.warning(f"Worker {self.name}: unknown player {message['player_id']} in room {message['room_id']}")
+        return player
+
+    async def _player_bet(self, message: Dict[str, Any]):
+        player = self._get_player(message)
+        if player is not None:
+            await player.receive_bet(message["message"])
+
+    async def _player_pong(self, message: Dict[str, Any]):
+        player = self._get_player(message)
+        if player is not None:
+            await player.handle_pong()
+
+    async def _player_start(self, message: Dict[str, Any]):
+        room = self._game_server.get_room(message["room_id"])
+        if room is not None:
+            await room.player_ready_for_start(message["player_id"])
+
+    async def _player_leave(self, message: Dict[str, Any]):
+        # The room's inactivity sweep removes the disconnected player
+        player = self._get_player(message)
+        if player is not None:
+            await player.disconnect()
+            await self._save_money(player)
+
+    async def _save_money(self, player: PlayerServer):
+        # The player's consumer is gone, the worker stores the chips the player leaves with
+        if player.session_key is None:
+            return
+        from django.conf import settings
+        session = import_module(settings.SESSION_ENGINE).SessionStore(player.session_key)
+        try:
+            await session.aset("player_money", player.money)
+            await session.asave()
+        except Exception as e:
+            self._logger.error(f"Worker {self.name} failed saving the money of player {player.id}: {e}")
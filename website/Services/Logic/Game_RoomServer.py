@@ -1,11 +1,16 @@
 # website/Services/logic/Game_RoomServer.py
 import logging
 import asyncio
-from typing import List, Dict, Optional
+import json
+from typing import List, Dict, Optional, Callable, Set
 from uuid import uuid4
 from channels.generic.websocket import AsyncConsumer
 from .Player_ClientChannelServer import PlayerServer
-from .PokerGame import GameFactory, GameSubscriber, GameError, Player, HoldemPokerGameFactory
+from .ChannelBroadcast import ChannelBroadcaster, send_many
+from .GameEventStream import GameEventLog
+from .HandHistory import HandHistoryWriter
+from .SpectatorFeed import SpectatorFeed
+from .PokerGame import GameFactory, GameSubscriber, GameError, Player, HoldemPokerGameFactory, GamePacing
 from .PokerGame import PokerGame, EndGameException, GameError
 
 logger = logging.getLogger(__name__)
@@ -15,7 +20,10 @@ class FullGameRoomException(Exception):
     pass
 
 class GameRoom(GameSubscriber):
-    def __init__(self, id: str, game_factory: GameFactory, logger: Optional[logging.Logger] = None):
+    INACTIVITY_TIMEOUT = 120  # seconds
+    INACTIVITY_CHECK_INTERVAL = 30
+
+    def __init__(self, id: str, game_factory: GameFactory, logger: Optional[logging.Logger] = None, broadcaster: Optional[ChannelBroadcaster] = None, event_log: Optional[GameEventLog] = None, hand_history: Optional[HandHistoryWriter] = None):
         self.id = id
         self.private = False
         self.active = False
@@ -23,20 +31,45 @@ class GameRoom(GameSubscriber):
         self._room_size = 10
         self._logger = logger or logging.getLogger(__name__)
         self.players: Dict[str, PlayerServer] = {}
+        self.spectators = SpectatorFeed(logger=self._logger)  # Public frames only, not seated
         self.start_votes = set()  # Track which players have pressed "Start Game"
+        self.pacing: Optional[GamePacing] = None  # Table profile, the game factory default if None
+        self.hands_played = 0  # Numbers the room's hands in the bankroll ledger
+        self._inactivity_timer: Optional[asyncio.TimerHandle] = None
+        self._broadcaster = broadcaster
+        # Subscribed to the room's games besides the room itself
+        self._game_subscribers: List[GameSubscriber] = []
+        if event_log is not None:
+            self._game_subscribers.append(event_log.subscriber(id))
+        if hand_history is not None:
+            self._game_subscribers.append(hand_history.recorder(self._user_id))
+        self.on_players_change: Optional[Callable[['GameRoom'], None]] = None  # Set by the RoomRegistry
 
     async def deactivate(self):
         self.active = False
         self._logger.info(f"Room {self.id} is deactivating.")
+        if self._inactivity_timer is not None:
+            self._inactivity_timer.cancel()
+            self._inactivity_timer = None
         await self.broadcast_game_over()
         for player in self.players.values():
             await player.disconnect()
 
+    def release(self):
+        """Stops the room's timers without disconnecting its players, when the room moves to another server."""
+        if self._inactivity_timer is not None:
+            self._inactivity_timer.cancel()
+            self._inactivity_timer = None
+        self.on_players_change = None
+        self.spectators.close()
+
     async def join(self, player: PlayerServer):
         if len(self.players) >= self._room_size:
             raise FullGameRoomException("Room is full")
         self.players[player.id] = player
         self._logger.info(f"Player {player.id} joined room {self.id}")
+        self._players_changed()
+        self._schedule_inactivity_check()
         await self.broadcast_room_update()
         # Removed automatic game start here. Now requires players to press "Start Game".
         # if len(self.players) >= 2 and not self.active:
@@ -44,12 +77,25 @@ class GameRoom(GameSubscriber):
         #     task = asyncio.create_task(self.activate())
         #     self._logger.debug(f"activate() task created for room {self.id}: {task}")
 
+    def watch(self, spectator_id: str, channel):
+        """Sends the room's public frames to a spectator, starting with the current room update."""
+        self.spectators.add(spectator_id, channel, snapshot=json.dumps(self._room_update_message(), separators=(",", ":")))
+        self._logger.info(f"Spectator {spectator_id} watching room {self.id}")
+
+    def stop_watching(self, spectator_id: str):
+        self.spectators.remove(spectator_id)
+
+    def _user_id(self, player_id: str) -> Optional[int]:
+        player = self.players.get(player_id)
+        return player.user_id if player is not None else None
+
     async def leave(self, player_id: str):
         if player_id in self.players:
             del self.players[player_id]
             if player_id in self.start_votes:
                 self.start_votes.remove(player_id)
             self._logger.info(f"Player {player_id} left room {self.id}")
+            self._players_changed()
             await self.broadcast_room_update()
 
     async def player_ready_for_start(self, player_id: str):
@@ -82,13 +128,18 @@ class GameRoom(GameSubscriber):
                 dealer_id = list(self.players.keys())[dealer_key]
                 self._logger.info(f"Dealer for this hand is {dealer_id}")
 
-                game = self._game_factory.create_game(list(self.players.values()))
+                game = self._game_factory.create_game(list(self.players.values()), pacing=self.pacing, hand=self.hands_played)
+                self.hands_played += 1
                 self._logger.debug(f"Game instance created: {type(game)} with ID {game._id}")
                 game.event_dispatcher.subscribe(self)
+                for subscriber in self._game_subscribers:
+                    game.event_dispatcher.subscribe(subscriber)
                 self._logger.info("Starting to play hand.")
                 await game.play_hand(dealer_id)
                 self._logger.info("Hand completed.")
                 game.event_dispatcher.unsubscribe(self)
+                for subscriber in self._game_subscribers:
+                    game.event_dispatcher.unsubscribe(subscriber)
 
         except GameError as e:
             self._logger.error(f"Game error in room {self.id}: {e}")
@@ -99,26 +150,51 @@ class GameRoom(GameSubscriber):
             self.active = False
             # Reset start votes after a round/game ends
             self.start_votes.clear()
+            self._players_changed()
             await self.broadcast_game_over()
 
-    async def remove_inactive_players(self):
-        current_time = asyncio.get_event_loop().time()
-        inactivity_threshold = 120  # seconds
-        inactive_players = [
+    @property
+    def free_seats(self) -> int:
+        return self._room_size - len(self.players)
+
+    def _players_changed(self):
+        if self.on_players_change is not None:
+            self.on_players_change(self)
+
+    def _inactive_player_ids(self) -> List[str]:
+        current_time = asyncio.get_running_loop().time()
+        return [
             player_id for player_id, player in self.players.items()
-            if (current_time - player.last_active) > inactivity_threshold or not player.connected
+            if (current_time - player.last_active) > self.INACTIVITY_TIMEOUT or not player.connected
         ]
-        for player_id in inactive_players:
+
+    def _schedule_inactivity_check(self):
+        # On the event loop, not the TimerWheel: the wheel only turns while timers are pending,
+        # a check every 30 s would keep it ticking for as long as a room is open
+        if self._inactivity_timer is None:
+            self._inactivity_timer = asyncio.get_running_loop().call_later(self.INACTIVITY_CHECK_INTERVAL, self._check_inactivity)
+
+    def _check_inactivity(self):
+        # Event loop callback. Playing rooms sweep their players before every hand
+        self._inactivity_timer = None
+        if not self.players:
+            return
+        if not self.active and self._inactive_player_ids():
+            asyncio.get_running_loop().create_task(self.remove_inactive_players())
+        self._schedule_inactivity_check()
+
+    async def remove_inactive_players(self):
+        for player_id in self._inactive_player_ids():
             self._logger.info(f"Removing inactive player {player_id} from room {self.id}")
             await self.leave(player_id)
 
-    async def broadcast_room_update(self):
+    def _room_update_message(self):
         # Indicate if the "Start Game" button should be shown:
         # Show the button if there are at least 2 players and game not active
         can_start = (len(self.players) >= 2 and not self.active)
         ready_players = list(self.start_votes)
 
-        message = {
+        return {
             "message_type": "room-update",
             "event": "update",
             "player_ids": list(self.players.keys()),
@@ -126,7 +202,9 @@ class GameRoom(GameSubscriber):
             "can_start": can_start,
             "ready_players": ready_players
         }
-        await self.broadcast(message)
+
+    async def broadcast_room_update(self):
+        await self.broadcast(self._room_update_message())
 
     async def broadcast_game_over(self):
         message = {
@@ -136,13 +214,22 @@ class GameRoom(GameSubscriber):
         await self.broadcast(message)
 
     async def broadcast(self, message):
+        # Encoded once, every player and spectator gets the same frame
         try:
-            await asyncio.gather(*(p.send_message(message) for p in self.players.values()), return_exceptions=True)
+            text = json.dumps(message, separators=(",", ":"))
+            self.spectators.publish(text)
+            if self._broadcaster is not None:
+                await self._broadcaster.send_frame(self.players.values(), text)
+            else:
+                # Only queues the frame, each player's writer sends it
+                kind = PlayerServer.snapshot_kind(message)
+                for player in self.players.values():
+                    await player.send_raw(text, kind)
         except Exception as e:
             self._logger.error(f"Error in broadcast: {e}")
 
     async def game_event(self, event, event_data):
-        # Handle game events and send messages to players
+        # Handle game events and send messages to players, targeted events are encoded per player
         event_message = {"message_type": "game-update", **event_data}
         if "target" in event_data:
             player_id = event_data["target"]
@@ -154,15 +241,23 @@ class GameRoom(GameSubscriber):
 
 
 class GameRoomFactory:
-    def __init__(self, game_factory: GameFactory, room_size: int = 10, logger: Optional[logging.Logger] = None):
+    def __init__(self, game_factory: GameFactory, room_size: int = 10, logger: Optional[logging.Logger] = None, broadcaster: Optional[ChannelBroadcaster] = None, event_log: Optional[GameEventLog] = None, hand_history: Optional[HandHistoryWriter] = None):
         self._game_factory = game_factory
         self._room_size = room_size
         self._logger = logger or logging.getLogger(__name__)
+        self._broadcaster = broadcaster
+        self._event_log = event_log
+        self._hand_history = hand_history
+
+    @property
+    def room_size(self) -> int:
+        return self._room_size
 
-    def create_room(self, id: str, private: bool = False, logger: Optional[logging.Logger] = None) -> GameRoom:
+    def create_room(self, id: str, private: bool = False, logger: Optional[logging.Logger] = None, pacing: Optional[GamePacing] = None) -> GameRoom:
         room_logger = logger or self._logger
-        room = GameRoom(id=id, game_factory=self._game_factory, logger=room_logger)
+        room = GameRoom(id=id, game_factory=self._game_factory, logger=room_logger, broadcaster=self._broadcaster, event_log=self._event_log, hand_history=self._hand_history)
         room.private = private
+        room.pacing = pacing
         room._room_size = self._room_size
         return room
 
@@ -173,15 +268,96 @@ class ConnectedPlayer:
         self.room_id = room_id
 
 
+class RoomRegistry:
+    """
+    Rooms of the game server by id, with the public rooms indexed by free seats so a
+    new player fills the fullest table first. Joins lock one of STRIPES locks, picked
+    by room id, so joins to different rooms do not wait for each other.
+    Rooms left empty and not playing are removed.
+    """
+    STRIPES = 64
+
+    def __init__(self, room_size: int, logger: Optional[logging.Logger] = None):
+        self._rooms: Dict[str, GameRoom] = {}
+        # Free seats -> public rooms with that many free seats, in joining order
+        self._free_seats_index: List[Dict[str, GameRoom]] = [{} for _ in range(room_size + 1)]
+        self._room_free_seats: Dict[str, int] = {}
+        self._locks = [asyncio.Lock() for _ in range(self.STRIPES)]
+        self._logger = logger or logging.getLogger(__name__)
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def __iter__(self):
+        return iter(list(self._rooms.values()))
+
+    def get(self, room_id: str) -> Optional[GameRoom]:
+        return self._rooms.get(room_id)
+
+    def lock(self, room_id: str) -> asyncio.Lock:
+        return self._locks[hash(room_id) % self.STRIPES]
+
+    def add(self, room: GameRoom):
+        # Registered before its first player joins, so concurrent joins can find it
+        self._rooms[room.id] = room
+        room.on_players_change = self.update
+        self._index(room)
+
+    def remove(self, room: GameRoom):
+        if self._rooms.get(room.id) is not room:
+            return
+        del self._rooms[room.id]
+        room.on_players_change = None
+        self._unindex(room)
+        self._logger.info(f"Room {room.id} removed from the registry")
+
+    def update(self, room: GameRoom):
+        if not room.players and not room.active:
+            self.remove(room)
+            return
+        self._unindex(room)
+        self._index(room)
+
+    def _index(self, room: GameRoom):
+        if not room.private and 0 < room.free_seats < len(self._free_seats_index):
+            self._free_seats_index[room.free_seats][room.id] = room
+            self._room_free_seats[room.id] = room.free_seats
+
+    def _unindex(self, room: GameRoom):
+        free_seats = self._room_free_seats.pop(room.id, None)
+        if free_seats is not None:
+            del self._free_seats_index[free_seats][room.id]
+
+    def fullest_public_room(self) -> Optional[GameRoom]:
+        for rooms in self._free_seats_index:
+            for room in rooms.values():
+                return room
+        return None
+
+
 class GameServer:
     def __init__(self, room_factory: GameRoomFactory, logger: Optional[logging.Logger] = None):
         self.room_factory = room_factory
         self.logger = logger or logging.getLogger(__name__)
-        self._rooms: List[GameRoom] = []
-        self._lobby_lock = asyncio.Lock()
+        self._rooms = RoomRegistry(room_size=room_factory.room_size, logger=self.logger)
         self.player_queue = asyncio.Queue()
+        self._joins: Set[asyncio.Task] = set()  # Queued players joining their room
         self._running = True
 
+    def get_room(self, room_id: str) -> Optional[GameRoom]:
+        return self._rooms.get(room_id)
+
+    @property
+    def rooms(self) -> List[GameRoom]:
+        return list(self._rooms)
+
+    def adopt_room(self, room: GameRoom):
+        self._rooms.add(room)
+
+    def release_room(self, room: GameRoom):
+        self._rooms.remove(room)
+        room.release()
+
     async def new_players(self):
         while self._running:
             connected_player = await self.player_queue.get()
@@ -192,24 +368,28 @@ class GameServer:
         self.player_queue.put_nowait(connected_player)
 
     async def _join_room(self, connected_player: ConnectedPlayer) -> GameRoom:
-        async with self._lobby_lock:
-            if connected_player.room_id:
-                room = await self._join_private_room(connected_player.player, connected_player.room_id)
-            else:
-                room = await self._join_any_public_room(connected_player.player)
-            return room
+        if connected_player.room_id:
+            return await self._join_private_room(connected_player.player, connected_player.room_id)
+        return await self._join_any_public_room(connected_player.player)
 
     async def _join_private_room(self, player: PlayerServer, room_id: str) -> GameRoom:
-        room = next((r for r in self._rooms if r.id == room_id), None)
-        if not room:
-            room = self.room_factory.create_room(id=room_id, private=True)
-            self._rooms.append(room)
-        await room.join(player)
-        return room
+        async with self._rooms.lock(room_id):
+            room = self._rooms.get(room_id)
+            if not room:
+                room = self.room_factory.create_room(id=room_id, private=True)
+                self._rooms.add(room)
+            await room.join(player)
+            return room
 
     async def _join_any_public_room(self, player: PlayerServer) -> GameRoom:
-        for room in self._rooms:
-            if not room.private and len(room.players) < room._room_size:
+        while True:
+            room = self._rooms.fullest_public_room()
+            if room is None:
+                break
+            async with self._rooms.lock(room.id):
+                # The room may have filled up or been reaped while waiting for the lock
+                if self._rooms.get(room.id) is not room:
+                    continue
                 try:
                     await room.join(player)
                     return room
@@ -217,25 +397,36 @@ class GameServer:
                     continue
         room_id = str(uuid4())
         room = self.room_factory.create_room(id=room_id, private=False)
+        self._rooms.add(room)
         await room.join(player)
-        self._rooms.append(room)
         return room
 
     async def start(self):
+        """
+        Seats the players queued by add_new_player. Each join is a task of its own, joins of
+        different rooms only wait for their room's lock.
+        """
         self.logger.info("Game server running")
         async for connected_player in self.new_players():
             self.logger.info(f"Player {connected_player.player.id} connected")
-            try:
-                room = await self._join_room(connected_player)
-                self.logger.info(f"Player {connected_player.player.id} joined room {room.id}")
-            except Exception as e:
-                self.logger.exception(f"Bad connection: {str(e)}")
+            task = asyncio.get_running_loop().create_task(self._join_queued(connected_player))
+            self._joins.add(task)
+            task.add_done_callback(self._joins.discard)
+
+    async def _join_queued(self, connected_player: ConnectedPlayer):
+        try:
+            room = await self._join_room(connected_player)
+            self.logger.info(f"Player {connected_player.player.id} joined room {room.id}")
+        except Exception as e:
+            self.logger.exception(f"Bad connection: {str(e)}")
 
     async def stop(self):
         self._running = False
         self.logger.info("Game server is shutting down.")
         while not self.player_queue.empty():
             await asyncio.sleep(0.1)
+        if self._joins:
+            await asyncio.gather(*self._joins)
         for room in self._rooms:
             await room.deactivate()
         self.logger.info("Game server has been shut down.")
@@ -307,14 +498,10 @@ class GameRoomConsumer(AsyncConsumer):
             self._logger.debug(f"Received pong from player {player_id}")
 
     async def broadcast(self, message):
-        for channel_name in self.player_channels.values():
-            await self.channel_layer.send(
-                channel_name,
-                {
-                    "type": "game_message",
-                    "message": message,
-                }
-            )
+        await send_many(self.channel_layer, list(self.player_channels.values()), {
+            "type": "game_message",
+            "message": message,
+        })
 
     async def broadcast_room_update(self):
         message = {
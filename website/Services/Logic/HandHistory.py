@@ -0,0 +1,155 @@
+# website/Services/Logic/HandHistory.py
+
+import asyncio
+import collections
+import json
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional, List, Dict, Callable, Deque
+
+from channels.db import database_sync_to_async
+
+from .PokerGame import GameSubscriber
+
+
+class FinishedHand:
+    def __init__(self, log: str, pot: float, user_ids: List[int], winner_user_id: Optional[int], end_time: datetime):
+        self.log = log
+        self.pot = pot
+        self.user_ids = user_ids
+        self.winner_user_id = winner_user_id
+        self.end_time = end_time
+
+
+class HandHistoryRecorder(GameSubscriber):
+    """
+    Hand history of a room as JSON lines, one per game event, handed to the writer when the
+    hand is over. The events of a hand share its game id, it is kept once in the first line.
+
+    user_id returns the auth user of a seated player, if any: only their hands are linked to them.
+    """
+    def __init__(self, writer: 'HandHistoryWriter', user_id: Callable[[str], Optional[int]]):
+        self._writer = writer
+        self._user_id = user_id
+        self._game_id: Optional[str] = None
+        self._lines: List[str] = []
+        self._pot: float = 0.0
+        self._user_ids: Dict[str, int] = {}
+        self._winner_id: Optional[str] = None
+
+    async def game_event(self, event, event_data):
+        if event == "new-game":
+            self._start(event_data)
+        elif self._game_id is None:
+            return
+        else:
+            event_data = {key: value for key, value in event_data.items() if key != "game_id"}
+            self._lines.append(json.dumps(event_data, separators=(",", ":")))
+        if event == "winner-designation":
+            pot = event_data["pot"]
+            self._pot += pot["money"]
+            if self._winner_id is None and pot["winner_ids"]:
+                # Pots are designated from the main one
+                self._winner_id = pot["winner_ids"][0]
+        elif event == "game-over":
+            self._finish()
+
+    def _start(self, event_data):
+        self._game_id = event_data["game_id"]
+        self._lines = [json.dumps(event_data, separators=(",", ":"))]
+        self._pot = 0.0
+        self._winner_id = None
+        self._user_ids = {}
+        for player in event_data["players"]:
+            user_id = self._user_id(player["id"])
+            if user_id is not None:
+                self._user_ids[player["id"]] = user_id
+
+    def _finish(self):
+        self._writer.submit(FinishedHand(
+            log="\n".join(self._lines),
+            pot=self._pot,
+            user_ids=sorted(set(self._user_ids.values())),
+            winner_user_id=self._user_ids.get(self._winner_id),
+            end_time=datetime.now(timezone.utc),
+        ))
+        self._game_id = None
+        self._lines = []
+
+
+class HandHistoryWriter:
+    """
+    Writes the finished hands to the users PokerGame table from a background task, once
+    `batch_size` hands are waiting or `max_delay` seconds after the first of them. A batch takes
+    one insert for the games and one for all of their players.
+    """
+    BATCH_SIZE = 100
+    MAX_DELAY = 5.0
+
+    def __init__(self, batch_size: int = BATCH_SIZE, max_delay: float = MAX_DELAY, logger: Optional[logging.Logger] = None):
+        self._batch_size: int = batch_size
+        self._max_delay: float = max_delay
+        self._pending: Deque[FinishedHand] = collections.deque()
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._flushing: bool = False
+        self._writer: Optional[asyncio.Task] = None
+        self._logger = logger or logging.getLogger(__name__)
+
+    def recorder(self, user_id: Callable[[str], Optional[int]]) -> HandHistoryRecorder:
+        return HandHistoryRecorder(self, user_id)
+
+    def submit(self, hand: FinishedHand):
+        self._pending.append(hand)
+        if self._writer is None or self._writer.done():
+            self._batch_ready = asyncio.Event()
+            self._writer = asyncio.get_running_loop().create_task(self._write())
+        if len(self._pending) >= self._batch_size:
+            self._batch_ready.set()
+
+    async def flush(self):
+        """Writes the waiting hands now."""
+        self._flushing = True
+        try:
+            while self._writer is not None and not self._writer.done():
+                self._batch_ready.set()
+                await self._writer
+        finally:
+            self._flushing = False
+
+    async def _write(self):
+        while self._pending:
+            if len(self._pending) < self._batch_size and not self._flushing:
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), self._max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._batch_ready.clear()
+            batch = []
+            while self._pending and len(batch) < self._batch_size:
+                batch.append(self._pending.popleft())
+            try:
+                await database_sync_to_async(self._insert)(batch)
+            except Exception as e:
+                self._logger.error(f"Failed writing {len(batch)} hand histories: {e}")
+
+    @staticmethod
+    def _insert(batch: List[FinishedHand]):
+        from django.db import transaction
+        from users.models import PokerGame, GamePlayer
+
+        with transaction.atomic():
+            games = PokerGame.objects.bulk_create([
+                PokerGame(
+                    pot=Decimal(str(round(hand.pot, 2))),
+                    game_log=hand.log,
+                    winner_id=hand.winner_user_id,
+                    end_time=hand.end_time,
+                )
+                for hand in batch
+            ])
+            GamePlayer.objects.bulk_create([
+                GamePlayer(pokergame_id=game.id, user_id=user_id, start_time=game.start_time)
+                for game, hand in zip(games, batch)
+                for user_id in hand.user_ids
+            ])
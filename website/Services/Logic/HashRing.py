@@ -0,0 +1,54 @@
+# website/Services/Logic/HashRing.py
+
+import bisect
+import hashlib
+from typing import Optional, List, Iterable
+
+
+class ConsistentHashRing:
+    """
+    Maps keys to nodes so that adding or removing a node only moves the keys of that node.
+    Each node is placed REPLICAS times on the ring. Hashes are md5 based, every process
+    builds the same ring from the same nodes.
+    """
+    REPLICAS = 100
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = REPLICAS):
+        self._replicas: int = replicas
+        self._nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._nodes)
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        self._nodes.append(node)
+        for replica in range(self._replicas):
+            point = self._hash(f"{node}#{replica}")
+            k = bisect.bisect(self._points, point)
+            self._points.insert(k, point)
+            self._owners.insert(k, node)
+
+    def remove(self, node: str):
+        if node not in self._nodes:
+            return
+        self._nodes.remove(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def get(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        k = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[k]
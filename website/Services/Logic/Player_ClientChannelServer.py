@@ -2,82 +2,172 @@
 
 import logging
 import asyncio
-from typing import Optional, Any
-from .PokerGame import Player
-
-class ChannelError(Exception):
-    pass
-
-class MessageTimeout(Exception):
-    pass
-
-class MessageFormatError(Exception):
-    def __init__(self, attribute=None, desc=None, expected=None, found=None):
-        message = "Invalid message received."
-        if attribute:
-            message += f" Invalid message attribute {attribute}."
-            if expected is not None and found is not None:
-                message += f" '{expected}' expected, found '{found}'."
-        if desc:
-            message += " " + desc
-        super().__init__(message)
-
-    @staticmethod
-    def validate_message_type(message, expected):
-        if "message_type" not in message:
-            raise MessageFormatError(attribute="message_type", desc="Attribute is missing")
-        elif message["message_type"] == "error":
-            if "error" in message:
-                raise MessageFormatError(desc=f"Error received from the remote host: '{message['error']}'")
-            else:
-                raise MessageFormatError(desc="Unknown error received from the remote host")
-        if message["message_type"] != expected:
-            raise MessageFormatError(attribute="message_type", expected=expected, found=message["message_type"])
+import collections
+from typing import Optional, Any, Set
+from .PokerGame import Player, MessageFormatError, MessageTimeout, ChannelError
+from .TimerWheel import TimerWheel
 
 class PlayerServer(Player):
-    def __init__(self, id: str, name: str, money: float, channel=None, logger=None):
+    # Actions kept while the game is not waiting for this player, the oldest are dropped first
+    INBOX_SIZE = 8
+    # Messages waiting for the player's socket, the game never waits for a congested socket
+    OUTBOX_SIZE = 64
+    # Table snapshots, a newer one makes the queued ones useless
+    SNAPSHOT_KINDS = ("room-update", "pots-update")
+    # On a full outbox, drops the snapshots made useless or disconnects the player if there are none
+    OVERFLOW_COALESCE = "coalesce"
+    OVERFLOW_DISCONNECT = "disconnect"
+
+    def __init__(self, id: str, name: str, money: float, channel=None, logger=None, timer_wheel: Optional[TimerWheel] = None, overflow_policy: str = OVERFLOW_COALESCE, user_id: Optional[int] = None, session_key: Optional[str] = None):
         super().__init__(id=id, name=name, money=money)
+        self.user_id: Optional[int] = user_id  # Auth user of a logged in player
+        self.session_key: Optional[str] = session_key  # Session storing the chips of a player served by a worker
         self._channel = channel
         self._connected = True
         self._logger = logger or logging.getLogger(__name__)
+        self._timer_wheel: Optional[TimerWheel] = timer_wheel
+        self._inbox: collections.deque = collections.deque(maxlen=self.INBOX_SIZE)
+        self._waiter: Optional[asyncio.Future] = None
+        self._outbox: collections.deque = collections.deque()
+        self._writer: Optional[asyncio.Task] = None
+        self._overflow_policy: str = overflow_policy
         self.last_active = asyncio.get_event_loop().time()  # Initialize last active time
 
     @property
     def connected(self) -> bool:
         return self._connected
 
+    @property
+    def channel(self):
+        return self._channel
+
+    @classmethod
+    def snapshot_kind(cls, message: Any) -> Optional[str]:
+        kind = message.get("message_type")
+        if kind == "game-update":
+            kind = message.get("event")
+        return kind if kind in cls.SNAPSHOT_KINDS else None
+
     async def send_message(self, message: Any):
+        self._enqueue(self.snapshot_kind(message), message, None)
+
+    async def send_raw(self, text: str, kind: Optional[str] = None):
+        """Sends a message already encoded as JSON, as a websocket text frame. kind is its snapshot kind, if any."""
+        self._enqueue(kind, None, text)
+
+    async def flush(self):
+        """Waits until the queued messages are sent."""
+        while self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+
+    def _enqueue(self, kind: Optional[str], message: Any, text: Optional[str]):
         if not self._connected or self._channel is None:
             self._logger.error(f"Cannot send message, player {self.id} not connected or channel missing.")
             return
 
-        try:
-            await self._channel.send_json(message)
-            self._logger.debug(f"Message sent to player {self.id}: {message}")
-        except Exception as e:
-            self._logger.error(f"Failed to send message to player {self.id}: {e}")
-            self._connected = False
+        if len(self._outbox) >= self.OUTBOX_SIZE:
+            if self._overflow_policy == self.OVERFLOW_COALESCE:
+                self._coalesce(kind)
+            if len(self._outbox) >= self.OUTBOX_SIZE:
+                self._congested()
+                return
+        self._outbox.append((kind, message, text))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write())
 
-    async def recv_message(self, timeout_epoch: Optional[float] = None) -> Any:
-        if not self._connected or self._channel is None:
+    def _coalesce(self, kind: Optional[str]):
+        # Keeps the newest snapshot of each kind, counting the one being queued
+        newer: Set[str] = {kind} if kind is not None else set()
+        kept = collections.deque()
+        for entry in reversed(self._outbox):
+            if entry[0] is None or entry[0] not in newer:
+                kept.appendleft(entry)
+                if entry[0] is not None:
+                    newer.add(entry[0])
+        self._outbox = kept
+
+    def _congested(self):
+        self._logger.warning(f"Player {self.id} disconnected, {len(self._outbox)} messages waiting for the socket")
+        self._outbox.clear()
+        self._connected = False
+        # Wakes up the game if it is waiting for this player
+        self._push({"message_type": "disconnect"})
+
+    async def _write(self):
+        while self._outbox:
+            kind, message, text = self._outbox.popleft()
+            try:
+                if text is None:
+                    await self._channel.send_json(message)
+                    if self._logger.isEnabledFor(logging.DEBUG):
+                        self._logger.debug(f"Message sent to player {self.id}: {message}")
+                else:
+                    await self._channel.send(text_data=text)
+            except Exception as e:
+                self._logger.error(f"Failed to send message to player {self.id}: {e}")
+                self._outbox.clear()
+                self._connected = False
+                # Wakes up the game if it is waiting for this player
+                self._push({"message_type": "disconnect"})
+
+    def _push(self, message: Any):
+        self._inbox.append(message)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _expire(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_exception(MessageTimeout("Receiving message timed out."))
+
+    async def receive_bet(self, message: Any):
+        """Queues a bet received by the consumer until the game asks this player for it."""
+        self.last_active = asyncio.get_event_loop().time()
+        if not isinstance(message.get("seq"), int) or "bet" not in message:
+            self._logger.warning(f"Ignoring malformed bet from player {self.id}: {message}")
+            return
+        self._push(message)
+
+    async def handle_pong(self):
+        self.last_active = asyncio.get_event_loop().time()
+
+    async def recv_message(self, timeout_epoch: Optional[float] = None, seq: Optional[int] = None) -> Any:
+        """
+        Waits for the next queued message until timeout_epoch, on the event loop clock.
+        With a seq, messages answering earlier requests are dropped.
+        """
+        if (not self._connected or self._channel is None) and not self._inbox:
             raise ChannelError("Not connected")
+        # The deadline is a timer wheel entry, not a timer of its own
+        timer = None
+        if timeout_epoch is not None:
+            timer_wheel = self._timer_wheel or TimerWheel.shared()
+            timer = timer_wheel.call_at(timeout_epoch, self._expire)
         try:
-            if timeout_epoch is not None:
-                timeout = max(0, timeout_epoch - asyncio.get_event_loop().time())
-                message = await asyncio.wait_for(self._channel.receive_json(), timeout=timeout)
-            else:
-                message = await self._channel.receive_json()
-            self._logger.debug(f"Message received from player {self.id}: {message}")
-            # Update last_active time whenever a message is received
-            self.last_active = asyncio.get_event_loop().time()
-            return message
-        except asyncio.TimeoutError:
+            while True:
+                while self._inbox:
+                    message = self._inbox.popleft()
+                    if seq is None or message.get("seq") == seq or message.get("message_type") == "disconnect":
+                        if self._logger.isEnabledFor(logging.DEBUG):
+                            self._logger.debug(f"Message received from player {self.id}: {message}")
+                        return message
+                    self._logger.debug(f"Dropping stale message {message.get('seq')} from player {self.id}, expecting {seq}")
+                self._waiter = asyncio.get_running_loop().create_future()
+                try:
+                    await self._waiter
+                finally:
+                    self._waiter = None
+        except MessageTimeout:
             self._logger.error(f"Receiving message timed out for player {self.id}")
-            raise MessageTimeout("Receiving message timed out.")
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
 
     async def disconnect(self):
         if self._connected:
             if self._channel is not None:
                 await self.send_message({"message_type": "disconnect"})
             self._connected = False
+            # Wakes up the game if it is waiting for this player
+            self._push({"message_type": "disconnect"})
             self._logger.info(f"Player {self.id} disconnected.")
@@ -4,6 +4,8 @@ import uuid
 import time
 import random
 import collections
+import itertools
+import math
 import asyncio
 import logging
 from typing import Optional, List, Dict, Set, Generator, Any
@@ -39,30 +41,62 @@ class Card:
         3: "Hearts",
     }
 
-    def __init__(self, rank: int, suit: int):
+    __slots__ = ("_value", "rank", "suit", "mask")
+
+    # Interned instances indexed by card value, built once at import
+    _cards: Dict[int, "Card"] = {}
+    _decks: Dict[int, tuple] = {}
+
+    def __new__(cls, rank: int, suit: int):
         if rank not in Card.RANKS:
             raise ValueError("Invalid card rank")
         if suit not in Card.SUITS:
             raise ValueError("Invalid card suit")
-        self._value = (rank << 2) + suit
+        value = (rank << 2) + suit
+        try:
+            return Card._cards[value]
+        except KeyError:
+            card = super().__new__(cls)
+            card._value = value
+            card.rank = rank
+            card.suit = suit
+            card.mask = 1 << value
+            Card._cards[value] = card
+            return card
 
-    @property
-    def rank(self) -> int:
-        return self._value >> 2
+    @staticmethod
+    def from_value(value: int) -> "Card":
+        return Card._cards[value]
 
-    @property
-    def suit(self) -> int:
-        return self._value & 3
+    @staticmethod
+    def deck(lowest_rank: int) -> tuple:
+        try:
+            return Card._decks[lowest_rank]
+        except KeyError:
+            cards = tuple(Card(rank, suit) for rank in range(lowest_rank, 15) for suit in range(0, 4))
+            Card._decks[lowest_rank] = cards
+            return cards
 
     def __lt__(self, other):
-        return int(self) < int(other)
+        return self._value < int(other)
 
     def __eq__(self, other):
-        return int(self) == int(other)
+        if self is other:
+            return True
+        try:
+            return self._value == int(other)
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self):
+        return self._value
 
     def __int__(self):
         return self._value
 
+    def __reduce__(self):
+        return Card, (self.rank, self.suit)
+
     def dto(self):
         return {
             "rank": self.rank,
@@ -72,12 +106,74 @@ class Card:
         }
 
 
+# Interns the full deck
+Card.deck(2)
+
+
+class Hand:
+    """
+    Set of cards stored as a 64-bit mask (bit n set for the card of value n).
+    Iterating yields the interned cards from the highest to the lowest.
+    """
+    __slots__ = ("_mask",)
+
+    def __init__(self, cards=(), mask: int = 0):
+        for card in cards:
+            mask |= card.mask
+        self._mask: int = mask
+
+    @property
+    def mask(self) -> int:
+        return self._mask
+
+    def values(self) -> List[int]:
+        values = []
+        mask = self._mask
+        while mask:
+            value = mask.bit_length() - 1
+            values.append(value)
+            mask ^= 1 << value
+        return values
+
+    def add(self, cards) -> "Hand":
+        mask = self._mask
+        for card in cards:
+            mask |= card.mask
+        return Hand(mask=mask)
+
+    def __or__(self, other: "Hand") -> "Hand":
+        return Hand(mask=self._mask | other._mask)
+
+    def __contains__(self, card) -> bool:
+        return bool(self._mask & card.mask)
+
+    def __iter__(self):
+        return (Card._cards[value] for value in self.values())
+
+    def __len__(self):
+        return bin(self._mask).count("1")
+
+    def __eq__(self, other):
+        return isinstance(other, Hand) and self._mask == other._mask
+
+    def __hash__(self):
+        return hash(self._mask)
+
+    def __int__(self):
+        return self._mask
+
+
 class Deck:
     def __init__(self, lowest_rank: int):
-        self._cards: List[Card] = [Card(rank, suit) for rank in range(lowest_rank, 15) for suit in range(0, 4)]
+        self._cards: List[Card] = list(Card.deck(lowest_rank))
         self._discard: List[Card] = []
+        self._dealt: int = 0
         random.shuffle(self._cards)
 
+    @property
+    def dealt(self) -> Hand:
+        return Hand(mask=self._dealt)
+
     def pop_cards(self, num_cards=1) -> List[Card]:
         new_cards = []
         if len(self._cards) < num_cards:
@@ -85,7 +181,10 @@ class Deck:
             self._cards = self._discard
             self._discard = []
             random.shuffle(self._cards)
-        return new_cards + [self._cards.pop() for _ in range(num_cards - len(new_cards))]
+        cards = new_cards + [self._cards.pop() for _ in range(num_cards - len(new_cards))]
+        for card in cards:
+            self._dealt |= card.mask
+        return cards
 
     def push_cards(self, discard: List[Card]):
         self._discard += discard
@@ -100,6 +199,8 @@ class DeckFactory:
 
 
 class Player:
+    user_id: Optional[int] = None  # Auth user of the player, if any
+
     def __init__(self, id: str, name: str, money: float):
         self._id: str = id
         self._name: str = name
@@ -140,10 +241,76 @@ class Player:
         return f"player {self._id}"
 
 
-class MessageFormatError(Exception):
+class HandLedger:
+    """
+    Moves the chips of a game's players and records every movement of the hand in minor units
+    (cents). The movements are handed to the bankroll ledger when the hand ends, without it they
+    are only moved. hand is the number of the hand in its room.
+    """
+    MINOR_UNITS = 100
+
+    def __init__(self, ledger=None, game_id: Optional[str] = None, hand: int = 0):
+        self._ledger = ledger
+        self._game_id: Optional[str] = game_id
+        self._hand: int = hand
+        self._entries: List[tuple] = []
+
+    @classmethod
+    def to_minor_units(cls, money: float) -> int:
+        return int(round(money * cls.MINOR_UNITS))
+
+    def take(self, player: Player, money: float, kind: str):
+        player.take_money(money)
+        self._record(player, -money, kind)
+
+    def give(self, player: Player, money: float, kind: str):
+        player.add_money(money)
+        self._record(player, money, kind)
+
+    def _record(self, player: Player, money: float, kind: str):
+        units = self.to_minor_units(money)
+        if units and self._ledger is not None:
+            self._entries.append((player.id, player.user_id, units, kind))
+
+    def commit(self):
+        """Hands the movements of the hand to the ledger, never waits for it."""
+        if self._entries:
+            self._ledger.submit(self._game_id, self._hand, self._entries)
+            self._entries = []
+
+
+class MessageTimeout(Exception):
+    pass
+
+
+class ChannelError(Exception):
     pass
 
 
+class MessageFormatError(Exception):
+    def __init__(self, attribute=None, desc=None, expected=None, found=None):
+        message = "Invalid message received."
+        if attribute:
+            message += f" Invalid message attribute {attribute}."
+            if expected is not None and found is not None:
+                message += f" '{expected}' expected, found '{found}'."
+        if desc:
+            message += " " + desc
+        super().__init__(message)
+
+    @staticmethod
+    def validate_message_type(message, expected):
+        if "message_type" not in message:
+            raise MessageFormatError(attribute="message_type", desc="Attribute is missing")
+        elif message["message_type"] == "error":
+            if "error" in message:
+                raise MessageFormatError(desc=f"Error received from the remote host: '{message['error']}'")
+            else:
+                raise MessageFormatError(desc="Unknown error received from the remote host")
+        if message["message_type"] != expected:
+            raise MessageFormatError(attribute="message_type", expected=expected, found=message["message_type"])
+
+
 class Cards:
     def __init__(self, cards: List[Card], lowest_rank=2):
         self._sorted = sorted(cards, key=int, reverse=True)
@@ -191,9 +358,10 @@ class Cards:
 
     def full_house(self):
         trips_list = self._x_sorted_list(3)
-        pair_list = self._x_sorted_list(2)
+        # A second trips makes the pair
+        pair_list = sorted(trips_list[1:] + self._x_sorted_list(2), key=lambda cards: cards[0].rank, reverse=True)
         try:
-            return self._merge_with_cards(trips_list[0] + pair_list[0])[0:5]
+            return self._merge_with_cards(trips_list[0] + pair_list[0][0:2])[0:5]
         except IndexError:
             return None
 
@@ -243,7 +411,8 @@ class Cards:
         return self._sorted[0:5]
 
     def _merge_with_cards(self, score_cards: List[Card]):
-        return score_cards + [card for card in self._sorted if card not in score_cards]
+        score_mask = Hand(score_cards).mask
+        return score_cards + [card for card in self._sorted if not score_mask & card.mask]
 
 
 class Score:
@@ -330,8 +499,14 @@ class HoldemPokerScore(Score):
     QUADS = 7
     STRAIGHT_FLUSH = 8
 
+    def __init__(self, category: int, cards: List[Card], strength: Optional[int] = None):
+        super().__init__(category, cards)
+        self._strength: Optional[int] = strength
+
     @property
     def strength(self):
+        if self._strength is not None:
+            return self._strength
         strength = self.category
         for offset in range(5):
             strength <<= 4
@@ -339,6 +514,7 @@ class HoldemPokerScore(Score):
                 strength += self.cards[offset].rank
             except IndexError:
                 pass
+        self._strength = strength
         return strength
 
     def cmp(self, other):
@@ -350,6 +526,117 @@ class HoldemPokerScore(Score):
             return 0
 
 
+def _straight_high(rank_mask: int) -> int:
+    for top in range(14, 5, -1):
+        run = 0b11111 << (top - 6)
+        if rank_mask & run == run:
+            return top
+    wheel = 0b1000000001111
+    return 5 if rank_mask & wheel == wheel else 0
+
+
+class HoldemHandEvaluator:
+    """
+    Table driven evaluator working on integer card values (rank << 2 | suit).
+    Ranks are folded into 13-bit masks (bit 0 is a deuce), so straights, flushes and
+    rank ordering are plain lookups into tables built once at import time.
+    """
+    # Ranks present in a mask, highest first
+    RANKS_DESC: List[tuple] = [
+        tuple(rank for rank in range(14, 1, -1) if mask & (1 << (rank - 2)))
+        for mask in range(1 << 13)
+    ]
+    # Highest straight contained in a mask (5 for the wheel), 0 if there is none
+    STRAIGHT_HIGH: List[int] = [_straight_high(mask) for mask in range(1 << 13)]
+
+    def evaluate(self, values) -> tuple:
+        """
+        Returns (category, ranks, flush_suit) for the given card values, where ranks are the
+        ranks of the scoring cards in display order and flush_suit is the suit the scoring
+        cards have to be taken from (None if the category is not suit dependent).
+        """
+        suit_masks = [0, 0, 0, 0]
+        counts = [0] * 15
+        for value in values:
+            rank = value >> 2
+            suit_masks[value & 3] |= 1 << (rank - 2)
+            counts[rank] += 1
+
+        flush_suit = None
+        flush_ranks = None
+        for suit in (3, 2, 1, 0):
+            suit_ranks = self.RANKS_DESC[suit_masks[suit]]
+            if len(suit_ranks) >= 5:
+                high = self.STRAIGHT_HIGH[suit_masks[suit]]
+                if high:
+                    return HoldemPokerScore.STRAIGHT_FLUSH, self._straight_ranks(high), suit
+                if flush_ranks is None or suit_ranks[:5] > flush_ranks:
+                    flush_suit, flush_ranks = suit, suit_ranks[:5]
+
+        rank_mask = suit_masks[0] | suit_masks[1] | suit_masks[2] | suit_masks[3]
+        ranks_desc = self.RANKS_DESC[rank_mask]
+        quads, trips, pairs = [], [], []
+        for rank in ranks_desc:
+            count = counts[rank]
+            if count == 4:
+                quads.append(rank)
+            elif count == 3:
+                trips.append(rank)
+            elif count == 2:
+                pairs.append(rank)
+
+        if quads:
+            ranks = [quads[0]] * 4
+            return HoldemPokerScore.QUADS, self._with_kickers(ranks, ranks_desc, counts), None
+        if trips and (pairs or len(trips) > 1):
+            # A second trips makes the pair
+            pair = max(trips[1:2] + pairs[:1])
+            return HoldemPokerScore.FULL_HOUSE, (trips[0],) * 3 + (pair,) * 2, None
+        if flush_ranks is not None:
+            return HoldemPokerScore.FLUSH, flush_ranks, flush_suit
+        high = self.STRAIGHT_HIGH[rank_mask]
+        if high:
+            return HoldemPokerScore.STRAIGHT, self._straight_ranks(high), None
+        if trips:
+            return HoldemPokerScore.TRIPS, self._with_kickers([trips[0]] * 3, ranks_desc, counts), None
+        if len(pairs) >= 2:
+            ranks = [pairs[0]] * 2 + [pairs[1]] * 2
+            return HoldemPokerScore.TWO_PAIR, self._with_kickers(ranks, ranks_desc, counts), None
+        if pairs:
+            return HoldemPokerScore.PAIR, self._with_kickers([pairs[0]] * 2, ranks_desc, counts), None
+        return HoldemPokerScore.NO_PAIR, ranks_desc[:5], None
+
+    def strength(self, values) -> int:
+        category, ranks, _ = self.evaluate(values)
+        return self.ranking_key(category, ranks)
+
+    @staticmethod
+    def ranking_key(category: int, ranks) -> int:
+        # Same packing as HoldemPokerScore.strength
+        strength = category
+        for offset in range(5):
+            strength <<= 4
+            if offset < len(ranks):
+                strength += ranks[offset]
+        return strength
+
+    @staticmethod
+    def _straight_ranks(high: int) -> tuple:
+        if high == 5:
+            return 5, 4, 3, 2, 14
+        return tuple(range(high, high - 5, -1))
+
+    @staticmethod
+    def _with_kickers(ranks: List[int], ranks_desc: tuple, counts: List[int]) -> tuple:
+        for rank in ranks_desc:
+            if len(ranks) >= 5:
+                break
+            if rank in ranks:
+                continue
+            ranks += [rank] * min(counts[rank], 5 - len(ranks))
+        return tuple(ranks)
+
+
 class ScoreDetector:
     def get_score(self, cards: List[Card]):
         raise NotImplementedError
@@ -382,55 +669,97 @@ class TraditionalPokerScoreDetector(ScoreDetector):
 
 
 class HoldemPokerScoreDetector(ScoreDetector):
-    def get_score(self, cards):
-        cards_obj = Cards(cards, 2)
-        score_functions = [
-            (HoldemPokerScore.STRAIGHT_FLUSH,   cards_obj.straight_flush),
-            (HoldemPokerScore.QUADS,            cards_obj.quads),
-            (HoldemPokerScore.FULL_HOUSE,       cards_obj.full_house),
-            (HoldemPokerScore.FLUSH,            cards_obj.flush),
-            (HoldemPokerScore.STRAIGHT,         cards_obj.straight),
-            (HoldemPokerScore.TRIPS,            cards_obj.trips),
-            (HoldemPokerScore.TWO_PAIR,         cards_obj.two_pair),
-            (HoldemPokerScore.PAIR,             cards_obj.pair),
-            (HoldemPokerScore.NO_PAIR,          cards_obj.no_pair),
-        ]
+    def __init__(self, evaluator: Optional[HoldemHandEvaluator] = None):
+        self._evaluator: HoldemHandEvaluator = evaluator or HoldemHandEvaluator()
 
-        for score_category, score_function in score_functions:
-            s = score_function()
-            if s:
-                return HoldemPokerScore(score_category, s)
+    def get_score(self, cards):
+        hand = cards if isinstance(cards, Hand) else Hand(cards)
+        if not hand.mask:
+            raise RuntimeError("Unable to detect the score")
+        return self.build_score(hand, self._evaluator.evaluate(hand.values()))
+
+    def build_score(self, hand: Hand, evaluation: tuple) -> HoldemPokerScore:
+        category, ranks, suit = evaluation
+        return HoldemPokerScore(
+            category,
+            self._score_cards(list(hand), ranks, suit),
+            HoldemHandEvaluator.ranking_key(category, ranks)
+        )
 
-        raise RuntimeError("Unable to detect the score")
+    @staticmethod
+    def _score_cards(available: List[Card], ranks, suit: Optional[int]) -> List[Card]:
+        # Same card picking as the Cards cascade: highest suit first within a rank
+        score_cards = []
+        for rank in ranks:
+            for i, card in enumerate(available):
+                if card.rank == rank and (suit is None or card.suit == suit):
+                    score_cards.append(available.pop(i))
+                    break
+        return score_cards
 
 
 class GamePlayers:
+    """
+    Seats of a hand. Active players are linked in a ring by seat position, folding or
+    removing a player unlinks its seat, so rotations never scan the folded seats.
+    The player lists are cached until the next fold, remove or reset, never modify them.
+    """
     def __init__(self, players: List[Player]):
         self._players: Dict[str, Player] = {player.id: player for player in players}
         self._player_ids: List[str] = [player.id for player in players]
+        self._positions: Dict[str, int] = {player_id: k for k, player_id in enumerate(self._player_ids)}
         self._folder_ids: Set[str] = set()
         self._dead_player_ids: Set[str] = set()
+        self._link_active()
+
+    def _link_active(self):
+        active_ids = [player_id for player_id in self._player_ids if player_id not in self._folder_ids]
+        self._next_ids: Dict[str, str] = {player_id: active_ids[(k + 1) % len(active_ids)] for k, player_id in enumerate(active_ids)}
+        self._prev_ids: Dict[str, str] = {player_id: active_ids[k - 1] for k, player_id in enumerate(active_ids)}
+        self._active: List[Player] = [self._players[player_id] for player_id in active_ids]
+        self._all: Optional[List[Player]] = None
 
     def fold(self, player_id: str):
-        if player_id not in self._player_ids:
+        if player_id not in self._players:
             raise ValueError("Unknown player id")
+        if player_id in self._folder_ids:
+            return
         self._folder_ids.add(player_id)
+        next_id = self._next_ids.pop(player_id)
+        prev_id = self._prev_ids.pop(player_id)
+        if next_id != player_id:
+            self._next_ids[prev_id] = next_id
+            self._prev_ids[next_id] = prev_id
+        self._active = [player for player in self._active if player.id != player_id]
 
     def remove(self, player_id: str):
         self.fold(player_id)
         self._dead_player_ids.add(player_id)
+        self._all = None
 
     def reset(self):
         self._folder_ids = set(self._dead_player_ids)
+        self._link_active()
+
+    def _first_active_from(self, player_id: str, reverse=False) -> Optional[str]:
+        if player_id not in self._folder_ids:
+            return player_id
+        step = -1 if reverse else 1
+        start_item = self._positions[player_id]
+        for i in range(1, len(self._player_ids)):
+            next_id = self._player_ids[(start_item + i * step) % len(self._player_ids)]
+            if next_id not in self._folder_ids:
+                return next_id
+        return None
 
     def round(self, start_player_id: str, reverse=False) -> Generator[Player, None, None]:
-        start_item = self._player_ids.index(start_player_id)
-        step_multiplier = -1 if reverse else 1
-        for i in range(len(self._player_ids)):
-            next_item = (start_item + (i * step_multiplier)) % len(self._player_ids)
-            player_id = self._player_ids[next_item]
-            if player_id not in self._folder_ids:
-                yield self._players[player_id]
+        if start_player_id not in self._players:
+            raise ValueError("Unknown player id")
+        player_id = self._first_active_from(start_player_id, reverse)
+        links = self._prev_ids if reverse else self._next_ids
+        for _ in range(len(self._active)):
+            yield self._players[player_id]
+            player_id = links[player_id]
 
     def get(self, player_id: str) -> Player:
         try:
@@ -439,32 +768,29 @@ class GamePlayers:
             raise ValueError("Unknown player id")
 
     def get_next(self, dealer_id: str) -> Optional[Player]:
-        if dealer_id not in self._player_ids:
+        if dealer_id not in self._players:
             raise ValueError("Unknown player id")
         if dealer_id in self._folder_ids:
             raise ValueError("Inactive player")
-        start_item = self._player_ids.index(dealer_id)
-        for i in range(len(self._player_ids) - 1):
-            next_index = (start_item + i + 1) % len(self._player_ids)
-            next_id = self._player_ids[next_index]
-            if next_id not in self._folder_ids:
-                return self._players[next_id]
-        return None
+        next_id = self._next_ids[dealer_id]
+        return None if next_id == dealer_id else self._players[next_id]
 
     def is_active(self, player_id: str) -> bool:
-        if player_id not in self._player_ids:
+        if player_id not in self._players:
             raise ValueError("Unknown player id")
         return player_id not in self._folder_ids
 
     def count_active(self) -> int:
-        return len(self._player_ids) - len(self._folder_ids)
+        return len(self._active)
 
     def count_active_with_money(self) -> int:
-        return len([player for player in self.active if player.money > 0])
+        return len([player for player in self._active if player.money > 0])
 
     @property
     def all(self) -> List[Player]:
-        return [self._players[player_id] for player_id in self._player_ids if player_id not in self._dead_player_ids]
+        if self._all is None:
+            self._all = [self._players[player_id] for player_id in self._player_ids if player_id not in self._dead_player_ids]
+        return self._all
 
     @property
     def folders(self) -> List[Player]:
@@ -476,14 +802,19 @@ class GamePlayers:
 
     @property
     def active(self) -> List[Player]:
-        return [self._players[player_id] for player_id in self._player_ids if player_id not in self._folder_ids]
+        return self._active
 
 
 class GameScores:
     def __init__(self, score_detector: ScoreDetector):
         self._score_detector: ScoreDetector = score_detector
         self._players_cards: Dict[str, List[Card]] = {}
+        self._players_hands: Dict[str, Hand] = {}
         self._shared_cards: List[Card] = []
+        self._shared_hand: Hand = Hand()
+        self._scores_cache: Dict[tuple, Score] = {}
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
 
     @property
     def shared_cards(self):
@@ -492,21 +823,48 @@ class GameScores:
     def player_cards(self, player_id: str):
         return self._players_cards[player_id]
 
+    def player_hand(self, player_id: str) -> Hand:
+        return self._players_hands[player_id] | self._shared_hand
+
     def player_score(self, player_id: str):
-        return self._score_detector.get_score(self._players_cards[player_id] + self._shared_cards)
+        key = (player_id, len(self._shared_cards))
+        try:
+            score = self._scores_cache[key]
+        except KeyError:
+            score = self._score_detector.get_score(self.player_hand(player_id))
+            self._scores_cache[key] = score
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+        return score
+
+    def preload_scores(self, scores: Dict[str, Score]):
+        # Scores computed elsewhere for the current shared cards
+        for player_id, score in scores.items():
+            self._scores_cache[(player_id, len(self._shared_cards))] = score
 
     def assign_cards(self, player_id: str, cards: List[Card]):
         self._players_cards[player_id] = cards
+        self._players_hands[player_id] = Hand(cards)
+        self._scores_cache = {key: score for key, score in self._scores_cache.items() if key[0] != player_id}
 
     def add_shared_cards(self, cards):
         self._shared_cards += cards
+        self._shared_hand = self._shared_hand.add(cards)
+        self._scores_cache.clear()
 
 
 class GamePots:
+    """
+    Main pot and side pots of a hand. Each pot is capped at the total contribution of
+    an active player: pots below the contributions still moving are final and kept as
+    they are, only the pots above them are rebuilt when a round's bets are folded in.
+    """
     class GamePot:
-        def __init__(self):
+        def __init__(self, cap: float = 0.0):
             self._money = 0.0
             self._players: List[Player] = []
+            self._cap: float = cap
 
         def add_money(self, money: float):
             self._money += money
@@ -514,6 +872,9 @@ class GamePots:
         def add_player(self, player: Player):
             self._players.append(player)
 
+        def remove_player(self, player: Player):
+            self._players.remove(player)
+
         @property
         def money(self) -> float:
             return self._money
@@ -522,10 +883,17 @@ class GamePots:
         def players(self) -> List[Player]:
             return self._players
 
+        @property
+        def cap(self) -> float:
+            return self._cap
+
     def __init__(self, game_players: GamePlayers):
         self._game_players = game_players
-        self._pots = []
-        self._bets = {player.id: 0.0 for player in game_players.all}
+        self._pots: List[GamePots.GamePot] = []
+        # Players removed during the hand keep their contribution in the pots
+        self._players: List[Player] = game_players.all
+        self._bets: Dict[str, float] = {player.id: 0.0 for player in self._players}
+        self._active_ids: Set[str] = {player.id for player in self._players}
 
     def __len__(self):
         return len(self._pots)
@@ -537,29 +905,50 @@ class GamePots:
         return iter(self._pots)
 
     def add_bets(self, bets: Dict[str, float]):
-        for player in self._game_players.all:
-            self._bets[player.id] += bets.get(player.id, 0.0)
-
-        bets = dict(self._bets)
-        players = sorted(self._game_players.all, key=lambda player: bets[player.id])
-        self._pots = []
+        active_ids = {player.id for player in self._players if self._game_players.is_active(player.id)}
+        gone_ids = self._active_ids - active_ids
+        self._active_ids = active_ids
+
+        # Lowest contribution that moves: pots capped below it are final
+        moving_ids = gone_ids.union(player_id for player_id, bet in bets.items() if bet and player_id in self._bets)
+        floor = min((self._bets[player_id] for player_id in moving_ids), default=math.inf)
+        for player_id, bet in bets.items():
+            if player_id in self._bets:
+                self._bets[player_id] += bet
+
+        final_pots = 0
+        while final_pots < len(self._pots) and self._pots[final_pots].cap < floor:
+            pot = self._pots[final_pots]
+            for player in [player for player in pot.players if player.id in gone_ids]:
+                pot.remove_player(player)
+            final_pots += 1
+        del self._pots[final_pots:]
+
+        self._build_pots(self._pots[-1].cap if self._pots else 0.0)
+
+    def _build_pots(self, base: float):
+        players = sorted(
+            (player for player in self._players if self._bets[player.id] > base),
+            key=lambda player: self._bets[player.id]
+        )
+        level = base
         spare_money = 0.0
 
         for i, player in enumerate(players):
-            if not self._game_players.is_active(player.id):
-                spare_money += bets[player.id]
-                bets[player.id] = 0.0
-            elif bets[player.id] > 0.0:
-                pot_bet = bets[player.id]
-                current_pot = GamePots.GamePot()
-                current_pot.add_money(spare_money)
-                spare_money = 0.0
-                for j in range(i, len(players)):
-                    if self._game_players.is_active(players[j].id):
-                        current_pot.add_player(players[j])
-                    current_pot.add_money(pot_bet)
-                    bets[players[j].id] -= pot_bet
-                self._pots.append(current_pot)
+            bet = self._bets[player.id]
+            if player.id not in self._active_ids:
+                spare_money += bet - level
+                continue
+            if bet == level:
+                continue
+            current_pot = GamePots.GamePot(cap=bet)
+            current_pot.add_money(spare_money + (bet - level) * (len(players) - i))
+            spare_money = 0.0
+            for other in players[i:]:
+                if other.id in self._active_ids:
+                    current_pot.add_player(other)
+            self._pots.append(current_pot)
+            level = bet
 
         if spare_money:
             raise ValueError("Invalid bets")
@@ -580,8 +969,13 @@ class GameEventDispatcher:
     async def raise_event(self, event, event_data):
         event_data["event"] = event
         event_data["game_id"] = self._game_id
-        self._logger.debug(f"GAME: {self._game_id} EVENT: {event}\n{event_data}")
-        await asyncio.gather(*(subscriber.game_event(event, event_data) for subscriber in self._subscribers))
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f"GAME: {self._game_id} EVENT: {event}\n{event_data}")
+        if len(self._subscribers) == 1:
+            # Spares a task per event for the common single subscriber case
+            await self._subscribers[0].game_event(event, event_data)
+        else:
+            await asyncio.gather(*(subscriber.game_event(event, event_data) for subscriber in self._subscribers))
 
     async def cards_assignment_event(self, player: Player, cards: List[Card], score: Score):
         await self.raise_event(
@@ -629,11 +1023,12 @@ class GameEventDispatcher:
             }
         )
 
-    async def bet_action_event(self, player: Player, min_bet: float, max_bet: float, bets: Dict[str, float], timeout: int, timeout_epoch: float):
+    async def bet_action_event(self, player: Player, min_bet: float, max_bet: float, bets: Dict[str, float], timeout: int, timeout_epoch: float, seq: int):
         await self.raise_event(
             "player-action",
             {
                 "action": "bet",
+                "seq": seq,
                 "player": player.dto(),
                 "min_bet": min_bet,
                 "max_bet": max_bet,
@@ -711,22 +1106,23 @@ class GameWinnersDetector:
 
 
 class GameBetRounder:
-    def __init__(self, game_players: GamePlayers):
+    def __init__(self, game_players: GamePlayers, hand_ledger: Optional[HandLedger] = None):
         self._game_players: GamePlayers = game_players
+        self._hand_ledger: HandLedger = hand_ledger or HandLedger()
 
-    def _get_max_bet(self, dealer: Player, bets: Dict[str, float]) -> float:
-        try:
-            highest_stake = max(
-                player.money + bets[player.id]
-                for player in self._game_players.round(dealer.id)
-                if player is not dealer
-            )
-        except ValueError:
-            return 0.0
-        return min(highest_stake - bets[dealer.id], dealer.money)
+    @staticmethod
+    def _get_stake_ranking(players: List[Player], bets: Dict[str, float]) -> List[Player]:
+        # Money plus bet of a player does not change while betting, it is ranked once per round
+        return sorted(players, key=lambda player: player.money + bets[player.id], reverse=True)
+
+    def _get_max_bet(self, dealer: Player, bets: Dict[str, float], stake_ranking: List[Player]) -> float:
+        for player in stake_ranking:
+            if player is not dealer and self._game_players.is_active(player.id):
+                return min(player.money + bets[player.id] - bets[dealer.id], dealer.money)
+        return 0.0
 
-    def _get_min_bet(self, dealer: Player, bets: Dict[str, float]) -> float:
-        return min(max(bets.values()) - bets[dealer.id], dealer.money)
+    def _get_min_bet(self, dealer: Player, bets: Dict[str, float], highest_bet: float) -> float:
+        return min(highest_bet - bets[dealer.id], dealer.money)
 
     async def bet_round(self, dealer_id: str, bets: Dict[str, float], get_bet_function, on_bet_function=None) -> Optional[Player]:
         players_round = list(self._game_players.round(dealer_id))
@@ -740,11 +1136,14 @@ class GameBetRounder:
             if bets[player.id] < 0 or (k > 0 and bets[player.id] < bets[players_round[k - 1].id]):
                 raise ValueError("Invalid bets dictionary")
 
+        stake_ranking = self._get_stake_ranking(players_round, bets)
+        highest_bet = max(bets.values())
+
         best_player = None
         while dealer is not None and dealer != best_player:
             next_player = self._game_players.get_next(dealer.id)
-            max_bet = self._get_max_bet(dealer, bets)
-            min_bet = self._get_min_bet(dealer, bets)
+            max_bet = self._get_max_bet(dealer, bets, stake_ranking)
+            min_bet = self._get_min_bet(dealer, bets, highest_bet)
 
             if max_bet == 0.0:
                 bet = 0.0
@@ -758,8 +1157,9 @@ class GameBetRounder:
             else:
                 if bet < min_bet or bet > max_bet:
                     raise ValueError("Invalid bet")
-                dealer.take_money(bet)
+                self._hand_ledger.take(dealer, bet, "bet")
                 bets[dealer.id] += bet
+                highest_bet = max(highest_bet, bets[dealer.id])
                 if best_player is None or bet > min_bet:
                     best_player = dealer
 
@@ -770,41 +1170,101 @@ class GameBetRounder:
         return best_player
 
 
+class GamePacing:
+    """
+    Delays between the steps of a hand, so that people at the table can follow it.
+    Delays are skipped when nobody is watching: no connected player left at the table.
+    """
+    AFTER_CARDS_ASSIGNMENT = "after-cards-assignment"
+    AFTER_BET_ROUND = "after-bet-round"
+    AFTER_SHARED_CARDS = "after-shared-cards"
+    AFTER_SHOWDOWN = "after-showdown"
+    AFTER_WINNER_DESIGNATION = "after-winner-designation"
+
+    PROFILES = {
+        "normal": {
+            AFTER_CARDS_ASSIGNMENT: 1,
+            AFTER_BET_ROUND: 1,
+            AFTER_SHARED_CARDS: 1,
+            AFTER_SHOWDOWN: 2,
+            AFTER_WINNER_DESIGNATION: 5,
+        },
+        "turbo": {
+            AFTER_CARDS_ASSIGNMENT: 0.5,
+            AFTER_BET_ROUND: 0.5,
+            AFTER_SHARED_CARDS: 0.5,
+            AFTER_SHOWDOWN: 1,
+            AFTER_WINNER_DESIGNATION: 2,
+        },
+        "simulation": {},
+    }
+
+    def __init__(self, delays: Dict[str, float], skip_unattended: bool = True):
+        self._delays: Dict[str, float] = delays
+        self._skip_unattended: bool = skip_unattended
+
+    @staticmethod
+    def profile(name: str) -> "GamePacing":
+        try:
+            return GamePacing(dict(GamePacing.PROFILES[name]))
+        except KeyError:
+            raise ValueError(f"Unknown pacing profile {name}")
+
+    @staticmethod
+    def is_watched(game_players: GamePlayers) -> bool:
+        # Players without a connection (bots, simulations) never watch
+        return any(getattr(player, "connected", False) for player in game_players.all)
+
+    async def wait(self, step: str, game_players: GamePlayers):
+        delay = self._delays.get(step, 0)
+        if delay <= 0:
+            return
+        if self._skip_unattended and not self.is_watched(game_players):
+            return
+        await asyncio.sleep(delay)
+
+
 class GameBetHandler:
-    def __init__(self, game_players: GamePlayers, bet_rounder: GameBetRounder, event_dispatcher: GameEventDispatcher, bet_timeout: int, timeout_tolerance: int, wait_after_round: int):
+    # Bet requests are numbered across every game, a player's answer must echo the number
+    _action_seqs = itertools.count(1)
+
+    def __init__(self, game_players: GamePlayers, bet_rounder: GameBetRounder, event_dispatcher: GameEventDispatcher, bet_timeout: int, timeout_tolerance: int, pacing: GamePacing):
         self._game_players: GamePlayers = game_players
         self._bet_rounder: GameBetRounder = bet_rounder
         self._event_dispatcher: GameEventDispatcher = event_dispatcher
         self._bet_timeout: int = bet_timeout
         self._timeout_tolerance: int = timeout_tolerance
-        self._wait_after_round: int = wait_after_round
+        self._pacing: GamePacing = pacing
 
     def any_bet(self, bets: Dict[str, float]) -> bool:
         return any(bets[k] > 0 for k in bets)
 
     async def bet_round(self, dealer_id: str, bets: Dict[str, float], pots: GamePots):
         best_player = await self._bet_rounder.bet_round(dealer_id, bets, self.get_bet, self.on_bet)
-        await asyncio.sleep(self._wait_after_round)
+        await self._pacing.wait(GamePacing.AFTER_BET_ROUND, self._game_players)
         if self.any_bet(bets):
             pots.add_bets(bets)
             await self._event_dispatcher.pots_update_event(self._game_players.active, pots)
         return best_player
 
     async def get_bet(self, player, min_bet: float, max_bet: float, bets: Dict[str, float]) -> Optional[int]:
-        timeout_epoch = time.time() + self._bet_timeout
+        seq = next(self._action_seqs)
+        # The deadline is on the event loop clock, the wall clock date is for the clients only
+        deadline = asyncio.get_running_loop().time() + self._bet_timeout + self._timeout_tolerance
         await self._event_dispatcher.bet_action_event(
             player=player,
             min_bet=min_bet,
             max_bet=max_bet,
             bets=bets,
             timeout=self._bet_timeout,
-            timeout_epoch=timeout_epoch
+            timeout_epoch=time.time() + self._bet_timeout,
+            seq=seq
         )
-        return await self.receive_bet(player, min_bet, max_bet, timeout_epoch)
+        return await self.receive_bet(player, min_bet, max_bet, deadline, seq)
 
-    async def receive_bet(self, player, min_bet, max_bet, timeout_epoch) -> Optional[int]:
+    async def receive_bet(self, player, min_bet, max_bet, timeout_epoch, seq: Optional[int] = None) -> Optional[int]:
         try:
-            message = await player.recv_message(timeout_epoch=timeout_epoch)
+            message = await player.recv_message(timeout_epoch=timeout_epoch, seq=seq)
             MessageFormatError.validate_message_type(message, "bet")
 
             if "bet" not in message:
@@ -818,9 +1278,12 @@ class GameBetHandler:
                 if bet != -1 and (bet < min_bet or bet > max_bet):
                     raise MessageFormatError(attribute="bet", desc=f"Bet out of range. min: {min_bet} max: {max_bet}, actual: {bet}")
                 return bet
-        except (MessageFormatError, asyncio.TimeoutError) as e:
+        except (MessageFormatError, MessageTimeout, asyncio.TimeoutError) as e:
             await player.send_message({"message_type": "error", "error": str(e)})
             return None
+        except ChannelError:
+            # Nobody is left to tell, the player is dead
+            return None
 
     async def on_bet(self, player: Player, bet: float, min_bet: float, max_bet: float, bets: Dict[str, float]):
         def get_bet_type(bet):
@@ -846,24 +1309,22 @@ class GameBetHandler:
 
 
 class GameFactory:
-    def create_game(self, players: List[Player]):
+    def create_game(self, players: List[Player], pacing: Optional[GamePacing] = None, hand: int = 0):
         raise NotImplementedError
 
 
 class PokerGame:
     TIMEOUT_TOLERANCE = 2
     BET_TIMEOUT = 30
-    WAIT_AFTER_CARDS_ASSIGNMENT = 1
-    WAIT_AFTER_BET_ROUND = 1
-    WAIT_AFTER_SHOWDOWN = 2
-    WAIT_AFTER_WINNER_DESIGNATION = 5
 
-    def __init__(self, id: str, game_players: GamePlayers, event_dispatcher: GameEventDispatcher, deck_factory: DeckFactory, score_detector: ScoreDetector):
+    def __init__(self, id: str, game_players: GamePlayers, event_dispatcher: GameEventDispatcher, deck_factory: DeckFactory, score_detector: ScoreDetector, pacing: Optional[GamePacing] = None, ledger=None, hand: int = 0):
         self._id: str = id
         self._game_players: GamePlayers = game_players
         self._event_dispatcher: GameEventDispatcher = event_dispatcher
         self._deck_factory: DeckFactory = deck_factory
         self._score_detector: ScoreDetector = score_detector
+        self._pacing: GamePacing = pacing or GamePacing.profile("normal")
+        self._hand_ledger: HandLedger = HandLedger(ledger, id, hand)
         self._bet_handler: GameBetHandler = self._create_bet_handler()
         self._winners_detector: GameWinnersDetector = self._create_winners_detector()
 
@@ -877,11 +1338,11 @@ class PokerGame:
     def _create_bet_handler(self) -> GameBetHandler:
         return GameBetHandler(
             game_players=self._game_players,
-            bet_rounder=GameBetRounder(self._game_players),
+            bet_rounder=GameBetRounder(self._game_players, self._hand_ledger),
             event_dispatcher=self._event_dispatcher,
             bet_timeout=self.BET_TIMEOUT,
             timeout_tolerance=self.TIMEOUT_TOLERANCE,
-            wait_after_round=self.WAIT_AFTER_BET_ROUND
+            pacing=self._pacing
         )
 
     def _create_winners_detector(self) -> GameWinnersDetector:
@@ -898,7 +1359,7 @@ class PokerGame:
             p_cards = deck.pop_cards(number_of_cards)
             scores.assign_cards(player.id, p_cards)
             await self._send_player_score(player, scores)
-        await asyncio.sleep(self.WAIT_AFTER_CARDS_ASSIGNMENT)
+        await self._pacing.wait(GamePacing.AFTER_CARDS_ASSIGNMENT, self._game_players)
 
     async def _send_player_score(self, player: Player, scores: GameScores):
         await self._event_dispatcher.cards_assignment_event(
@@ -915,12 +1376,15 @@ class PokerGame:
         for i, pot in enumerate(reversed(pots)):
             winners = self._winners_detector.get_winners(pot.players, scores)
             try:
-                money_split = round(pot.money / len(winners))
+                money_split, odd_chips = divmod(pot.money, len(winners))
             except ZeroDivisionError:
                 raise GameError("No players left")
             else:
-                for winner in winners:
-                    winner.add_money(money_split)
+                # Chips that cannot be split go to the first winner, so no money is created or lost
+                for k, winner in enumerate(winners):
+                    winnings = money_split + odd_chips if k == 0 else money_split
+                    if winnings > 0:
+                        self._hand_ledger.give(winner, winnings, "win")
 
                 await self._event_dispatcher.winner_designation_event(
                     players=self._game_players.active,
@@ -929,11 +1393,11 @@ class PokerGame:
                     money_split=money_split,
                     upcoming_pots=pots[(i + 1):]
                 )
-                await asyncio.sleep(self.WAIT_AFTER_WINNER_DESIGNATION)
+                await self._pacing.wait(GamePacing.AFTER_WINNER_DESIGNATION, self._game_players)
 
     async def _showdown(self, scores: GameScores):
         await self._event_dispatcher.showdown_event(self._game_players.active, scores)
-        await asyncio.sleep(self.WAIT_AFTER_SHOWDOWN)
+        await self._pacing.wait(GamePacing.AFTER_SHOWDOWN, self._game_players)
 
 
 class HoldemPokerGameEventDispatcher(GameEventDispatcher):
@@ -961,22 +1425,63 @@ class HoldemPokerGameEventDispatcher(GameEventDispatcher):
             },
         )
 
+    async def equity_event(self, equities: Dict[str, Dict[str, float]], shared_cards):
+        await self.raise_event(
+            "equity",
+            {
+                "players": equities,
+                "shared_cards": [card.dto() for card in shared_cards],
+            },
+        )
+
 
 class HoldemPokerGame(PokerGame):
     TIMEOUT_TOLERANCE = 2
     BET_TIMEOUT = 30
-    WAIT_AFTER_FLOP_TURN_RIVER = 1
 
-    def __init__(self, big_blind, small_blind, logger: Optional[logging.Logger] = None, *args, **kwargs):
+    def __init__(self, big_blind, small_blind, logger: Optional[logging.Logger] = None, *args, equity_calculator=None, evaluator_executor=None, **kwargs):
         super().__init__(*args, **kwargs)
         self._big_blind = big_blind
         self._small_blind = small_blind
         self._logger = logger or logging.getLogger(__name__)
+        self._equity_calculator = equity_calculator
+        self._evaluator_executor = evaluator_executor
+
+    async def _evaluate_scores(self, scores: GameScores):
+        # Scores every active hand in one executor call, the winners detection and
+        # the showdown event then read them from the scores cache
+        if self._evaluator_executor is None or self._game_players.count_active() < 2:
+            return
+        hands = {player.id: scores.player_hand(player.id) for player in self._game_players.active}
+        evaluations = await self._evaluator_executor.evaluate(
+            {player_id: hand.values() for player_id, hand in hands.items()}, []
+        )
+        scores.preload_scores({
+            player_id: self._score_detector.build_score(hands[player_id], evaluation)
+            for player_id, evaluation in evaluations.items()
+        })
+
+    async def _send_equity(self, scores: GameScores):
+        # Only once nobody can bet anymore (all-in), and while there are cards to come
+        if self._equity_calculator is None or len(scores.shared_cards) >= 5:
+            return
+        players = self._game_players.active
+        if len(players) < 2 or self._game_players.count_active_with_money() > 1:
+            return
+        players_cards = {player.id: scores.player_cards(player.id) for player in players}
+        if self._evaluator_executor is not None:
+            equities = await self._evaluator_executor.equity(
+                {player_id: [int(card) for card in cards] for player_id, cards in players_cards.items()},
+                [int(card) for card in scores.shared_cards]
+            )
+        else:
+            equities = await asyncio.to_thread(self._equity_calculator.calculate, players_cards, list(scores.shared_cards))
+        await self._event_dispatcher.equity_event(equities, scores.shared_cards)
 
     async def _add_shared_cards(self, new_shared_cards, scores):
         await self._event_dispatcher.shared_cards_event(new_shared_cards)
         scores.add_shared_cards(new_shared_cards)
-        await asyncio.sleep(self.WAIT_AFTER_FLOP_TURN_RIVER)
+        await self._pacing.wait(GamePacing.AFTER_SHARED_CARDS, self._game_players)
 
     async def _collect_blinds(self, dealer_id):
         for player in self._game_players.active:
@@ -991,7 +1496,7 @@ class HoldemPokerGame(PokerGame):
         bets = {}
 
         sb_player = active_players[-2]
-        sb_player.take_money(self._small_blind)
+        self._hand_ledger.take(sb_player, self._small_blind, "blind")
         bets[sb_player.id] = self._small_blind
         await self._event_dispatcher.bet_event(
             player=sb_player,
@@ -1001,7 +1506,7 @@ class HoldemPokerGame(PokerGame):
         )
 
         bb_player = active_players[-1]
-        bb_player.take_money(self._big_blind)
+        self._hand_ledger.take(bb_player, self._big_blind, "blind")
         bets[bb_player.id] = self._big_blind
         await self._event_dispatcher.bet_event(
             player=bb_player,
@@ -1042,6 +1547,8 @@ class HoldemPokerGame(PokerGame):
 
             await self._bet_handler.bet_round(dealer_id, bets, pots)
             self._logger.info("Pre-flop betting round completed.")
+            self._game_over_detection()
+            await self._send_equity(scores)
 
 
             # Flop
@@ -1050,12 +1557,16 @@ class HoldemPokerGame(PokerGame):
 
             await self._bet_handler.bet_round(dealer_id, {}, pots)
             self._logger.info("Flop betting round completed.")
+            self._game_over_detection()
+            await self._send_equity(scores)
 
             # Turn
             await self._add_shared_cards(deck.pop_cards(1), scores)
             self._logger.info("Turn card added.")
             await self._bet_handler.bet_round(dealer_id, {}, pots)
             self._logger.info("Turn betting round completed.")
+            self._game_over_detection()
+            await self._send_equity(scores)
 
             # River
             await self._add_shared_cards(deck.pop_cards(1), scores)
@@ -1065,6 +1576,7 @@ class HoldemPokerGame(PokerGame):
 
 
             # Showdown
+            await self._evaluate_scores(scores)
             if self._game_players.count_active() > 1:
                 await self._showdown(scores)
                 self._logger.info("Showdown completed.")
@@ -1079,19 +1591,24 @@ class HoldemPokerGame(PokerGame):
         except Exception as e:
             self._logger.exception(f"Error during play_hand: {e}")
         finally:
+            self._hand_ledger.commit()
             await self._event_dispatcher.game_over_event()
             self._logger.info(f"Game {self._id} hand completed.")
 
 
 
 class HoldemPokerGameFactory(GameFactory):
-    def __init__(self, big_blind: float, small_blind: float, logger, game_subscribers: Optional[List['GameSubscriber']] = None):
+    def __init__(self, big_blind: float, small_blind: float, logger, game_subscribers: Optional[List['GameSubscriber']] = None, equity_calculator=None, evaluator_executor=None, pacing: Optional[GamePacing] = None, ledger=None):
         self._big_blind = big_blind
         self._small_blind = small_blind
         self._logger = logger
         self._game_subscribers = game_subscribers or []
+        self._equity_calculator = equity_calculator
+        self._evaluator_executor = evaluator_executor
+        self._pacing = pacing or GamePacing.profile("normal")
+        self._ledger = ledger
 
-    def create_game(self, players: List[Player]):
+    def create_game(self, players: List[Player], pacing: Optional[GamePacing] = None, hand: int = 0):
         game_id = str(uuid.uuid4())
         event_dispatcher = HoldemPokerGameEventDispatcher(
             game_id=game_id, logger=self._logger
@@ -1108,5 +1625,10 @@ class HoldemPokerGameFactory(GameFactory):
             game_players=GamePlayers(players),
             event_dispatcher=event_dispatcher,
             deck_factory=DeckFactory(2),
-            score_detector=HoldemPokerScoreDetector()
+            score_detector=HoldemPokerScoreDetector(),
+            pacing=pacing or self._pacing,
+            equity_calculator=self._equity_calculator,
+            evaluator_executor=self._evaluator_executor,
+            ledger=self._ledger,
+            hand=hand
         )
\ No newline at end of file
@@ -0,0 +1,105 @@
+# website/Services/Logic/SpectatorFeed.py
+
+import asyncio
+import collections
+import logging
+from typing import Optional, Dict, Deque
+
+
+class Spectator:
+    def __init__(self, id: str, channel, position: int):
+        self.id = id
+        self.channel = channel
+        self.position: int = position  # Sequence number of the next frame to send
+        self.writer: Optional[asyncio.Task] = None
+
+
+class SpectatorFeed:
+    """
+    Public frames of a room, encoded once and kept in a buffer of BUFFER_SIZE frames shared by
+    every spectator. Each spectator is served by its own task from its position in the buffer,
+    the table only appends to the buffer. A spectator falling behind the oldest buffered frame
+    is dropped.
+    """
+    BUFFER_SIZE = 256
+
+    def __init__(self, buffer_size: int = BUFFER_SIZE, logger: Optional[logging.Logger] = None):
+        self._frames: Deque[str] = collections.deque(maxlen=buffer_size)
+        self._next_position: int = 0
+        self._spectators: Dict[str, Spectator] = {}
+        self._published: Optional[asyncio.Future] = None
+        self._logger = logger or logging.getLogger(__name__)
+
+    def __len__(self) -> int:
+        return len(self._spectators)
+
+    def __contains__(self, spectator_id: str) -> bool:
+        return spectator_id in self._spectators
+
+    def channels(self) -> Dict[str, object]:
+        return {spectator.id: spectator.channel for spectator in self._spectators.values()}
+
+    @property
+    def _first_position(self) -> int:
+        return self._next_position - len(self._frames)
+
+    def publish(self, text: str):
+        if not self._spectators:
+            return
+        self._frames.append(text)
+        self._next_position += 1
+        # One future wakes every idle spectator
+        if self._published is not None and not self._published.done():
+            self._published.set_result(None)
+        self._published = None
+
+    def add(self, spectator_id: str, channel, snapshot: Optional[str] = None):
+        """Serves the frames published from now on, after the snapshot of the room if any."""
+        self.remove(spectator_id)
+        spectator = Spectator(spectator_id, channel, self._next_position)
+        self._spectators[spectator_id] = spectator
+        spectator.writer = asyncio.get_running_loop().create_task(self._serve(spectator, snapshot))
+
+    def remove(self, spectator_id: str):
+        spectator = self._spectators.pop(spectator_id, None)
+        if spectator is not None and spectator.writer is not None and spectator.writer is not asyncio.current_task():
+            spectator.writer.cancel()
+        if not self._spectators:
+            self._frames.clear()
+
+    def close(self):
+        for spectator_id in list(self._spectators):
+            self.remove(spectator_id)
+
+    async def _wait_published(self):
+        if self._published is None:
+            self._published = asyncio.get_running_loop().create_future()
+        await asyncio.shield(self._published)
+
+    async def _serve(self, spectator: Spectator, snapshot: Optional[str]):
+        try:
+            if snapshot is not None:
+                await spectator.channel.send(text_data=snapshot)
+            while self._spectators.get(spectator.id) is spectator:
+                if spectator.position < self._first_position:
+                    self._logger.info(f"Spectator {spectator.id} dropped, {self._first_position - spectator.position} frames behind")
+                    await self._drop(spectator)
+                    return
+                if spectator.position == self._next_position:
+                    await self._wait_published()
+                    continue
+                text = self._frames[spectator.position - self._first_position]
+                spectator.position += 1
+                await spectator.channel.send(text_data=text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._logger.error(f"Failed sending to spectator {spectator.id}: {e}")
+            self.remove(spectator.id)
+
+    async def _drop(self, spectator: Spectator):
+        self.remove(spectator.id)
+        try:
+            await spectator.channel.send_json({"message_type": "error", "error": "Connection too slow to follow the table."})
+        except Exception:
+            pass
@@ -0,0 +1,133 @@
+# website/Services/Logic/TimerWheel.py
+
+import asyncio
+import logging
+import math
+import weakref
+from typing import Optional, List, Set, Callable
+
+
+class TimerHandle:
+    __slots__ = ("when", "_tick", "_callback", "_args", "_bucket")
+
+    def __init__(self, when: float, tick: int, callback: Callable, args: tuple):
+        self.when: float = when
+        self._tick: int = tick
+        self._callback: Callable = callback
+        self._args: tuple = args
+        self._bucket: Optional[Set['TimerHandle']] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._callback is None
+
+    def cancel(self):
+        if self._bucket is not None:
+            self._bucket.discard(self)
+            self._bucket = None
+        self._callback = None
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel on the event loop clock, shared by every table of the server.
+    Level 0 holds the timers due within `slots` ticks, each level above covers `slots` times
+    the range of the one below and cascades its timers down as the wheel turns.
+    A single task turns the wheel, only while timers are pending.
+    """
+    TICK = 0.05
+    SLOTS = 64
+    LEVELS = 3
+
+    _shared = weakref.WeakKeyDictionary()
+
+    def __init__(self, tick: float = TICK, slots: int = SLOTS, levels: int = LEVELS, logger: Optional[logging.Logger] = None):
+        self._tick: float = tick
+        self._slots: int = slots
+        self._wheels: List[List[Set[TimerHandle]]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._origin: Optional[float] = None
+        self._ticks: int = 0
+        self._runner: Optional[asyncio.Task] = None
+        self._logger = logger or logging.getLogger(__name__)
+
+    @classmethod
+    def shared(cls) -> "TimerWheel":
+        """The wheel of the running event loop."""
+        loop = asyncio.get_running_loop()
+        wheel = cls._shared.get(loop)
+        if wheel is None:
+            wheel = cls._shared[loop] = cls()
+        return wheel
+
+    def time(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def call_at(self, when: float, callback: Callable, *args) -> TimerHandle:
+        loop = asyncio.get_running_loop()
+        idle = self._runner is None or self._runner.done()
+        if idle:
+            # Nothing pending, the wheel restarts from the current time
+            self._origin = loop.time()
+            self._ticks = 0
+        tick = max(self._ticks + 1, math.ceil((when - self._origin) / self._tick))
+        handle = TimerHandle(when, tick, callback, args)
+        self._insert(handle)
+        if idle:
+            self._runner = loop.create_task(self._run())
+        return handle
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        return self.call_at(self.time() + delay, callback, *args)
+
+    def _insert(self, handle: TimerHandle):
+        delta = handle._tick - self._ticks
+        span = self._slots
+        level = 0
+        while delta >= span and level < len(self._wheels) - 1:
+            span *= self._slots
+            level += 1
+        slot = (handle._tick // (span // self._slots)) % self._slots
+        bucket = self._wheels[level][slot]
+        bucket.add(handle)
+        handle._bucket = bucket
+
+    def _advance(self):
+        self._ticks += 1
+        span = 1
+        for level in range(1, len(self._wheels)):
+            span *= self._slots
+            if self._ticks % span:
+                break
+            bucket = self._wheels[level][(self._ticks // span) % self._slots]
+            handles = list(bucket)
+            bucket.clear()
+            for handle in handles:
+                self._insert(handle)
+
+        bucket = self._wheels[0][self._ticks % self._slots]
+        due = [handle for handle in bucket if handle._tick <= self._ticks]
+        for handle in due:
+            bucket.discard(handle)
+            handle._bucket = None
+            callback, args = handle._callback, handle._args
+            handle._callback = None
+            if callback is None:
+                continue
+            try:
+                callback(*args)
+            except Exception as e:
+                self._logger.exception(f"Timer callback failed: {e}")
+
+    def pending(self) -> int:
+        return sum(len(bucket) for wheel in self._wheels for bucket in wheel)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Cancelled timers leave their bucket, an empty wheel stops turning
+            if not any(bucket for wheel in self._wheels for bucket in wheel):
+                return
+            await asyncio.sleep(max(0.0, self._origin + (self._ticks + 1) * self._tick - loop.time()))
+            now_ticks = math.floor((loop.time() - self._origin) / self._tick)
+            while self._ticks < now_ticks:
+                self._advance()
@@ -1,14 +1,24 @@
 # website/Services/texasholdem_poker_service.py
 
+import argparse
 import logging
 import asyncio
+import multiprocessing
 import os
 import sys
 import signal
 from daphne.server import Server
 from .Logic.PokerGame import HoldemPokerGameFactory
+from .Logic.Equity import EquityCalculator
+from .Logic.EvaluatorExecutor import EvaluatorExecutor
 from .Logic.Game_RoomServer import GameRoomFactory, GameServer
 from .Logic.Game_server_instance import set_game_server_instance
+from .Logic.GameWorker import GameWorker, worker_name
+from .Logic.ChannelBroadcast import ChannelBroadcaster
+from .Logic.ChannelRedis import create_redis
+from .Logic.GameEventStream import GameEventLog
+from .Logic.BankrollLedger import BankrollLedger
+from .Logic.HandHistory import HandHistoryWriter
 from typing import Optional
 
 # Configure the logger
@@ -21,14 +31,33 @@ formatter = logging.Formatter('[%(asctime)s] %(levelname)s:%(name)s:%(message)s'
 handler.setFormatter(formatter)
 logger.addHandler(handler)
 
-def initialize_game_server() -> Optional[GameServer]:
+def initialize_game_server(broadcaster: Optional[ChannelBroadcaster] = None, evaluator_executor: Optional[EvaluatorExecutor] = None) -> Optional[GameServer]:
     """
     Initializes the GameServer and sets the global game_server_instance.
+    The evaluator executor is owned by the caller, which shuts it down.
     """
     try:
+        from django.conf import settings
         # Create the game factory and room factory
-        game_factory = HoldemPokerGameFactory(big_blind=50, small_blind=25, logger=logger)
-        game_room_factory = GameRoomFactory(game_factory=game_factory, room_size=10, logger=logger)
+        game_factory = HoldemPokerGameFactory(
+            big_blind=50,
+            small_blind=25,
+            logger=logger,
+            equity_calculator=EquityCalculator(),
+            evaluator_executor=evaluator_executor,
+            ledger=BankrollLedger(logger=logger) if settings.POKER_LEDGER else None
+        )
+        event_log = None
+        if settings.POKER_EVENT_LOG_REDIS:
+            event_log = GameEventLog(create_redis(settings.POKER_EVENT_LOG_REDIS), logger=logger)
+        hand_history = None
+        if settings.POKER_HAND_HISTORY:
+            hand_history = HandHistoryWriter(
+                batch_size=settings.POKER_HAND_HISTORY_BATCH_SIZE,
+                max_delay=settings.POKER_HAND_HISTORY_MAX_DELAY,
+                logger=logger
+            )
+        game_room_factory = GameRoomFactory(game_factory=game_factory, room_size=10, logger=logger, broadcaster=broadcaster, event_log=event_log, hand_history=hand_history)
         game_server = GameServer(room_factory=game_room_factory, logger=logger)
 
         set_game_server_instance(game_server)
@@ -51,15 +80,81 @@ async def start_daphne_server(application, host: str = "127.0.0.1", port: int =
     logger.info(f"Starting Daphne server on {host}:{port}")
     await asyncio.to_thread(server.run)
 
-async def main():
+def setup_django(workers: int):
     # Ensure DJANGO_SETTINGS_MODULE is set before anything else
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'addiction.settings')  # Replace 'addiction' if your project has a different name
+    os.environ['POKER_GAME_WORKERS'] = str(workers)
 
     # Initialize Django
     import django
     django.setup()
     logger.info("Django setup completed.")
 
+async def run_game_worker(k: int, workers: int):
+    """
+    Runs the rooms owned by the k-th of the game workers.
+    """
+    from channels.layers import get_channel_layer
+    # The workers share the CPUs, each with an evaluator pool of its own
+    evaluator_executor = EvaluatorExecutor(max_workers=EvaluatorExecutor.processes_per_worker(workers), logger=logger)
+    try:
+        # The players' websockets are served by the web process, room frames go out in one channel layer batch
+        game_server = initialize_game_server(broadcaster=ChannelBroadcaster(get_channel_layer(), logger=logger), evaluator_executor=evaluator_executor)
+        if game_server is None:
+            logger.error(f"Game worker {k} not initialized. Exiting.")
+            sys.exit(1)
+        worker = GameWorker(worker_name(k), [worker_name(i) for i in range(workers)], game_server, logger=logger)
+        await worker.run()
+    finally:
+        evaluator_executor.shutdown()
+
+def game_worker_process(k: int, workers: int):
+    # Terminated by the web process, the evaluator pool is shut down on the way out
+    signal.signal(signal.SIGTERM, shutdown)
+    setup_django(workers)
+    asyncio.run(run_game_worker(k, workers))
+
+def start_channel_hub():
+    """
+    Starts the process keeping the channel layer messages when the local channel layer is shared.
+    """
+    from django.conf import settings
+    from website.layers import serve_hub
+    config = dict(settings.CHANNEL_LAYERS['default'].get('CONFIG', {}))
+    path = config.pop('socket', None)
+    if path is None:
+        return None
+    process = multiprocessing.get_context("spawn").Process(target=serve_hub, args=(path,), kwargs=config, name="channel-hub", daemon=True)
+    process.start()
+    logger.info(f"Channel layer hub started on {path}.")
+    return process
+
+def start_game_workers(workers: int) -> list:
+    """
+    Starts the game workers in their own processes, the web process only routes the players' messages.
+    The workers are not daemons, which may not start the evaluator pool: stop_game_workers ends them.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for k in range(workers):
+        process = context.Process(target=game_worker_process, args=(k, workers), name=worker_name(k))
+        process.start()
+        processes.append(process)
+    logger.info(f"Started {workers} game workers.")
+    return processes
+
+def stop_game_workers(processes: list, timeout: float = 10):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+    logger.info(f"Stopped {len(processes)} game workers.")
+
+async def main(workers: int = 0):
+    setup_django(workers)
+
     # Import the ASGI application after Django setup
     try:
         from addiction.asgi import application  # Replace 'addiction' with your project name if different
@@ -67,18 +162,31 @@ async def main():
         logger.exception(f"Failed to import ASGI application: {e}")
         sys.exit(1)
 
-    # Initialize the game server
-    game_server = initialize_game_server()
-    if game_server:
-        # Start the game server in the background
-        asyncio.create_task(game_server.start())
-        logger.info("Game server started as a background task.")
-    else:
-        logger.error("Game server not initialized. Exiting.")
-        sys.exit(1)
+    start_channel_hub()
+    if workers > 0:
+        processes = start_game_workers(workers)
+        try:
+            await start_daphne_server(application, host="127.0.0.1", port=8000)
+        finally:
+            stop_game_workers(processes)
+        return
+
+    evaluator_executor = EvaluatorExecutor(logger=logger)
+    try:
+        # Initialize the game server
+        game_server = initialize_game_server(evaluator_executor=evaluator_executor)
+        if game_server:
+            # Start the game server in the background
+            asyncio.create_task(game_server.start())
+            logger.info("Game server started as a background task.")
+        else:
+            logger.error("Game server not initialized. Exiting.")
+            sys.exit(1)
 
-    # Start Daphne server
-    await start_daphne_server(application, host="127.0.0.1", port=8000)
+        # Start Daphne server
+        await start_daphne_server(application, host="127.0.0.1", port=8000)
+    finally:
+        evaluator_executor.shutdown()
 
 def shutdown(signal_num, frame):
     """
@@ -92,8 +200,16 @@ if __name__ == "__main__":
     signal.signal(signal.SIGINT, shutdown)
     signal.signal(signal.SIGTERM, shutdown)
 
+    parser = argparse.ArgumentParser(description="Texas Hold'em poker server.")
+    parser.add_argument("--workers", type=int, default=0, help="game worker processes, 0 runs the game in the web process")
+    parser.add_argument("--worker", type=int, default=None, help="only runs this game worker, e.g. added to a running server with --workers N+1")
+    args = parser.parse_args()
+
     try:
-        asyncio.run(main())
+        if args.worker is not None:
+            game_worker_process(args.worker, args.workers)
+        else:
+            asyncio.run(main(args.workers))
     except KeyboardInterrupt:
         logger.info("Server stopped by user via KeyboardInterrupt.")
     except Exception as e:
@@ -3,15 +3,22 @@
 import uuid
 import logging
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
-from channels.db import database_sync_to_async
+from django.conf import settings
 from website.Services.Logic.Player_ClientChannelServer import PlayerServer
 from website.Services.Logic.Game_RoomServer import GameRoomFactory
 from website.Services.Logic.Game_server_instance import get_game_server_instance
+from website.Services.Logic.GameWorker import RING_GROUP, get_worker_ring, set_worker_ring
 
 logger = logging.getLogger(__name__)
 
 class PokerGameConsumer(AsyncJsonWebsocketConsumer):
     rooms = {}
+    # Messages handled by the room owner when the game runs in worker processes
+    WORKER_MESSAGES = {
+        "pong": "player.pong",
+        "bet": "player.bet",
+        "start-game": "player.start",
+    }
 
     async def connect(self):
         logger.info("WebSocket connection initiated.")
@@ -26,10 +33,29 @@ class PokerGameConsumer(AsyncJsonWebsocketConsumer):
         self.player_name = None
         self.player_money = None
         self.room_group_name = None
+        self.spectated_room_id = None
+
+        if self.worker_mode:
+            # Keeps the room owners up to date when a worker joins
+            await self.channel_layer.group_add(RING_GROUP, self.channel_name)
+
+    @property
+    def worker_mode(self) -> bool:
+        return settings.POKER_GAME_WORKERS > 0
+
+    async def send_to_worker(self, message_type, **message):
+        owner = get_worker_ring().get(self.room_id)
+        await self.channel_layer.send(owner, {"type": message_type, "room_id": self.room_id, **message})
 
     async def disconnect(self, close_code):
         player_id = self.player_id if self.player_id else 'Unknown'
         logger.info(f"WebSocket disconnect initiated for player {player_id} with close code {close_code}")
+        if self.spectated_room_id:
+            await self.stop_spectating()
+        if self.worker_mode:
+            await self.channel_layer.group_discard(RING_GROUP, self.channel_name)
+            if self.room_id and self.player_id:
+                await self.send_to_worker("player.leave", player_id=self.player_id)
         if self.room_id:
             self.room_group_name = f"game_room_{self.room_id}"
             await self.remove_player_from_room()
@@ -37,6 +63,10 @@ class PokerGameConsumer(AsyncJsonWebsocketConsumer):
             logger.debug(f"Player {player_id} removed from group {self.room_group_name}")
             if self.player_server:
                 await self.player_server.disconnect()
+                if self.session.session_key:
+                    # The player leaves the table with its chips, the session writer stores them
+                    self.session['player_money'] = self.player_server.money
+                    await self.session.asave()
                 logger.info(f"Player {player_id} disconnected and removed from GameServer.")
 
             await self.channel_layer.group_send(
@@ -54,6 +84,10 @@ class PokerGameConsumer(AsyncJsonWebsocketConsumer):
 
         if message_type == 'join':
             await self.handle_join(content)
+        elif message_type == 'spectate' and not self.player_id:
+            await self.handle_spectate(content)
+        elif self.worker_mode and self.player_id and message_type in self.WORKER_MESSAGES:
+            await self.send_to_worker(self.WORKER_MESSAGES[message_type], player_id=self.player_id, message=content)
         elif message_type == 'pong' and self.player_server:
             await self.player_server.handle_pong()
         elif message_type == 'bet' and self.player_server:
@@ -63,9 +97,9 @@ class PokerGameConsumer(AsyncJsonWebsocketConsumer):
         else:
             logger.warning(f"Unhandled message type: {message_type}")
 
-    @database_sync_to_async
-    def get_session_value(self, key, default=None):
-        return self.session.get(key, default)
+    async def get_session_value(self, key, default=None):
+        # The whole session is loaded once per connection, from the session cache when it is there
+        return await self.session.aget(key, default)
 
     async def handle_join(self, content):
         name = content.get("name")
@@ -88,6 +122,20 @@ class PokerGameConsumer(AsyncJsonWebsocketConsumer):
 
         self.player_id = await self.get_session_value('player_id', str(uuid.uuid4()))
         self.player_money = await self.get_session_value('player_money', 1000.0)
+        user = self.scope.get('user')
+        user_id = user.id if user is not None and user.is_authenticated else None
+
+        if self.worker_mode:
+            await self.send_to_worker("player.join", player={
+                "id": self.player_id,
+                "name": self.player_name,
+                "money": self.player_money,
+                "reply_channel": self.channel_name,
+                "user_id": user_id,
+                "session_key": self.session.session_key,
+            })
+            await self.join_success()
+            return
 
         game_server_instance = get_game_server_instance()
         if game_server_instance is None:
@@ -101,16 +149,19 @@ class PokerGameConsumer(AsyncJsonWebsocketConsumer):
             id=self.player_id,
             name=self.player_name,
             money=self.player_money,
-            logger=logger
+            logger=logger,
+            user_id=user_id
         )
+        # Joined right away, not through the game server's queue: the player is seated once
         if self.room_id:
             self.game_room_server = await game_server_instance._join_private_room(self.player_server, self.room_id)
         else:
             self.game_room_server = await game_server_instance._join_any_public_room(self.player_server)
-
-        game_server_instance.add_new_player(self.player_server, room_id=self.room_id)
         logger.info(f"Player {self.player_id} added to GameServer.")
 
+        await self.join_success()
+
+    async def join_success(self):
         await self.add_player_to_room()
 
         await self.send_json({
@@ -123,16 +174,51 @@ class PokerGameConsumer(AsyncJsonWebsocketConsumer):
 
         await self.send_room_update()
 
+    async def handle_spectate(self, content):
+        room_id = content.get("room_id")
+        if not room_id:
+            await self.send_json({"message_type": "error", "error": "Missing room_id."})
+            return
+        if self.spectated_room_id:
+            await self.stop_spectating()
+
+        # Spectators get the public frames of the room, they take no seat
+        self.spectated_room_id = room_id
+        if self.worker_mode:
+            owner = get_worker_ring().get(room_id)
+            await self.channel_layer.send(owner, {
+                "type": "spectator.join",
+                "room_id": room_id,
+                "spectator": {"id": self.channel_name, "reply_channel": self.channel_name},
+            })
+            return
+
+        game_server_instance = get_game_server_instance()
+        room = game_server_instance.get_room(room_id) if game_server_instance else None
+        if room is None:
+            self.spectated_room_id = None
+            await self.send_json({"message_type": "error", "error": "Room not found."})
+            return
+        room.watch(self.channel_name, self)
+
+    async def stop_spectating(self):
+        room_id, self.spectated_room_id = self.spectated_room_id, None
+        if self.worker_mode:
+            owner = get_worker_ring().get(room_id)
+            await self.channel_layer.send(owner, {"type": "spectator.leave", "room_id": room_id, "spectator_id": self.channel_name})
+            return
+        game_server_instance = get_game_server_instance()
+        room = game_server_instance.get_room(room_id) if game_server_instance else None
+        if room is not None:
+            room.stop_watching(self.channel_name)
+
     async def handle_start_game(self):
         # Mark player as ready for the game to start
         game_server_instance = get_game_server_instance()
         if game_server_instance is None:
             return
 
-        print(game_server_instance)
-        print("Game server rooms", game_server_instance._rooms)
-
-        room = next((r for r in game_server_instance._rooms if r.id == self.room_id), None)
+        room = game_server_instance.get_room(self.room_id)
         if room:
             await room.player_ready_for_start(self.player_id)
         else:
@@ -186,9 +272,19 @@ class PokerGameConsumer(AsyncJsonWebsocketConsumer):
     async def player_joined(self, event):
         pass
 
+    async def game_message(self, event):
+        await self.send_message(event["message"])
+
+    async def game_frame(self, event):
+        await self.send(text_data=event["text"])
+
+    async def ring_update(self, event):
+        set_worker_ring(event["workers"])
+
     async def send_message(self, message):
         try:
             await self.send_json(message)
-            logger.debug(f"Sent message to player {self.player_id}: {message}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Sent message to player {self.player_id}: {message}")
         except Exception as e:
             logger.error(f"Error sending message to player {self.player_id}: {str(e)}")
@@ -0,0 +1,370 @@
+# website/layers.py
+
+import asyncio
+import collections
+import itertools
+import logging
+import os
+import random
+import string
+import struct
+import time
+import weakref
+from typing import Optional, List, Dict, Deque, Tuple, Any
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+logger = logging.getLogger(__name__)
+
+
+class LocalChannelLayer(BaseChannelLayer):
+    """
+    Channel layer keeping the messages in the process, with the capacity and expiry of channels_redis:
+    a channel holds at most `capacity` messages (ChannelFull beyond), messages are dropped after
+    `expiry` seconds and group memberships after `group_expiry` seconds. The sends sweep the channels
+    nobody receives from anymore and the stale memberships, at most once every `expiry` seconds.
+
+    group_send puts the same message in every channel of the group, the consumers must not modify
+    the messages they receive.
+
+    With a `socket` path, the messages are kept by a LocalChannelHub process serving the layer to
+    every process of the machine over that unix socket.
+    """
+    extensions = ["groups", "flush"]
+
+    def __init__(self, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None, socket: Optional[str] = None, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.group_expiry = group_expiry
+        self.socket = socket
+        self._queues: Dict[str, Deque[Tuple[float, Dict[str, Any]]]] = {}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+        self._groups: Dict[str, Dict[str, float]] = {}
+        self._swept_at: float = time.time()
+        self._hub_connections = weakref.WeakKeyDictionary()
+
+    async def send(self, channel: str, message: Dict[str, Any]):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        if self.socket:
+            return await self._hub_call("send", channel, message)
+        now = time.time()
+        self._sweep(now)
+        self._put(channel, message, now)
+
+    async def send_many(self, channels: List[str], message: Dict[str, Any]) -> int:
+        """Sends the message to every channel, returns the number of full channels which missed it."""
+        assert isinstance(message, dict), "message is not a dict"
+        for channel in channels:
+            self.require_valid_channel_name(channel)
+        if self.socket:
+            return await self._hub_call("send_many", channels, message)
+        now = time.time()
+        self._sweep(now)
+        return self._put_many(channels, message, now)
+
+    async def receive(self, channel: str) -> Dict[str, Any]:
+        self.require_valid_channel_name(channel)
+        if self.socket:
+            return await self._hub_call("receive", channel)
+
+        loop = asyncio.get_running_loop()
+        while True:
+            queue = self._queues.get(channel)
+            if queue and self._drop_expired(channel, queue, time.time()):
+                _, message = queue.popleft()
+                if not queue:
+                    del self._queues[channel]
+                return message
+
+            waiter = loop.create_future()
+            waiters = self._waiters.setdefault(channel, collections.deque())
+            waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Woken for a message it will not take, another receiver gets it
+                    self._wake(channel)
+                raise
+            finally:
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters and self._waiters.get(channel) is waiters:
+                    del self._waiters[channel]
+
+    async def new_channel(self, prefix: str = "specific") -> str:
+        return "%s.local!%s" % (prefix, "".join(random.choice(string.ascii_letters) for _ in range(12)))
+
+    async def flush(self):
+        if self.socket:
+            return await self._hub_call("flush")
+        self._queues = {}
+        self._groups = {}
+
+    async def close(self):
+        for connection in list(self._hub_connections.values()):
+            connection.close()
+
+    async def group_add(self, group: str, channel: str):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        if self.socket:
+            return await self._hub_call("group_add", group, channel)
+        self._groups.setdefault(group, {})[channel] = time.time()
+
+    async def group_discard(self, group: str, channel: str):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        if self.socket:
+            return await self._hub_call("group_discard", group, channel)
+        channels = self._groups.get(group)
+        if channels is not None:
+            channels.pop(channel, None)
+            if not channels:
+                del self._groups[group]
+
+    async def group_send(self, group: str, message: Dict[str, Any]):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        if self.socket:
+            return await self._hub_call("group_send", group, message)
+
+        now = time.time()
+        self._sweep(now)
+        channels = self._groups.get(group)
+        if not channels:
+            return
+        joined_after = now - self.group_expiry
+        for channel, joined in list(channels.items()):
+            if joined < joined_after:
+                del channels[channel]
+        if not channels:
+            del self._groups[group]
+            return
+        over_capacity = self._put_many(list(channels), message, now)
+        if over_capacity:
+            logger.debug(f"{over_capacity} of {len(channels)} channels full in group {group}")
+
+    def _sweep(self, now: float):
+        # Queues of closed consumers and groups nobody sends to are only dropped here
+        if now - self._swept_at < self.expiry:
+            return
+        self._swept_at = now
+        for channel, queue in list(self._queues.items()):
+            self._drop_expired(channel, queue, now)
+        joined_after = now - self.group_expiry
+        for group, channels in list(self._groups.items()):
+            for channel, joined in list(channels.items()):
+                if joined < joined_after:
+                    del channels[channel]
+            if not channels:
+                del self._groups[group]
+
+    def _put_many(self, channels: List[str], message: Dict[str, Any], now: float) -> int:
+        # As channels_redis, full channels miss the message
+        over_capacity = 0
+        for channel in channels:
+            try:
+                self._put(channel, message, now)
+            except ChannelFull:
+                over_capacity += 1
+        return over_capacity
+
+    def _put(self, channel: str, message: Dict[str, Any], now: float):
+        queue = self._queues.get(channel)
+        if queue is None:
+            queue = self._queues[channel] = collections.deque()
+        elif len(queue) >= self.get_capacity(channel):
+            self._drop_expired(channel, queue, now)
+            if len(queue) >= self.get_capacity(channel):
+                raise ChannelFull(channel)
+        queue.append((now + self.expiry, message))
+        self._wake(channel)
+
+    def _drop_expired(self, channel: str, queue: Deque[Tuple[float, Dict[str, Any]]], now: float) -> bool:
+        while queue and queue[0][0] < now:
+            queue.popleft()
+        if not queue:
+            self._queues.pop(channel, None)
+        return bool(queue)
+
+    def _wake(self, channel: str):
+        for waiter in self._waiters.get(channel, ()):
+            if waiter.done():
+                continue
+            loop = waiter.get_loop()
+            if loop is asyncio.get_running_loop():
+                waiter.set_result(None)
+            else:
+                # Consumers served by Daphne's loop and game rooms on another one share the layer
+                loop.call_soon_threadsafe(_set_waiter, waiter)
+            return
+
+    async def _hub_call(self, operation: str, *args):
+        loop = asyncio.get_running_loop()
+        connection = self._hub_connections.get(loop)
+        if connection is None or connection.closed:
+            connection = self._hub_connections[loop] = _HubConnection(self.socket)
+        return await connection.call(operation, *args)
+
+
+def _set_waiter(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+_FRAME_HEADER = struct.Struct(">I")
+
+
+def _pack(payload) -> bytes:
+    import msgpack
+    data = msgpack.packb(payload, use_bin_type=True)
+    return _FRAME_HEADER.pack(len(data)) + data
+
+
+async def _read(reader: asyncio.StreamReader):
+    import msgpack
+    size, = _FRAME_HEADER.unpack(await reader.readexactly(_FRAME_HEADER.size))
+    return msgpack.unpackb(await reader.readexactly(size), raw=False)
+
+
+class _HubConnection:
+    """
+    Connection of an event loop to the LocalChannelHub, requests are pipelined and answered by id.
+    """
+    CONNECT_TIMEOUT = 10.0
+
+    def __init__(self, path: str):
+        self._path = path
+        self._requests: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connecting: Optional[asyncio.Task] = None
+        self.closed = False
+
+    async def _connect(self):
+        deadline = time.monotonic() + self.CONNECT_TIMEOUT
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self._path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                # The hub may still be starting
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+        asyncio.get_running_loop().create_task(self._listen(reader))
+
+    async def call(self, operation: str, *args):
+        if self._writer is None:
+            if self._connecting is None:
+                self._connecting = asyncio.get_running_loop().create_task(self._connect())
+            try:
+                await asyncio.shield(self._connecting)
+            except OSError:
+                # The next call opens a new connection
+                self.closed = True
+                raise
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request_id] = future
+        self._writer.write(_pack([request_id, operation, *args]))
+        try:
+            await self._writer.drain()
+            return await future
+        except asyncio.CancelledError:
+            if not self.closed and not future.done():
+                self._writer.write(_pack([next(self._ids), "cancel", request_id]))
+            raise
+        finally:
+            self._requests.pop(request_id, None)
+
+    async def _listen(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                request_id, error, result = await _read(reader)
+                future = self._requests.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if error == "ChannelFull":
+                    future.set_exception(ChannelFull(result))
+                elif error:
+                    future.set_exception(RuntimeError(f"Channel layer hub error: {error}"))
+                else:
+                    future.set_result(result)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            if not self.closed:
+                logger.error(f"Channel layer hub {self._path} closed the connection")
+        finally:
+            self.close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for future in self._requests.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Channel layer hub connection closed"))
+        self._requests.clear()
+        if self._writer is not None:
+            self._writer.close()
+
+
+class LocalChannelHub:
+    """
+    Serves a LocalChannelLayer to the processes of the machine over a unix socket.
+    """
+    OPERATIONS = {"send", "send_many", "receive", "group_add", "group_discard", "group_send", "flush"}
+
+    def __init__(self, path: str, **config):
+        self._path = path
+        self._layer = LocalChannelLayer(**config)
+
+    async def serve_forever(self):
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        server = await asyncio.start_unix_server(self._serve_client, path=self._path)
+        logger.info(f"Channel layer hub listening on {self._path}")
+        async with server:
+            await server.serve_forever()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        calls: Dict[int, asyncio.Task] = {}
+        try:
+            while True:
+                request_id, operation, *args = await _read(reader)
+                if operation == "cancel":
+                    call = calls.pop(args[0], None)
+                    if call is not None:
+                        call.cancel()
+                    continue
+                call = calls[request_id] = asyncio.create_task(self._call(writer, request_id, operation, args))
+                call.add_done_callback(lambda _, request_id=request_id: calls.pop(request_id, None))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for call in list(calls.values()):
+                call.cancel()
+            writer.close()
+
+    async def _call(self, writer: asyncio.StreamWriter, request_id: int, operation: str, args: list):
+        error, result = None, None
+        try:
+            if operation not in self.OPERATIONS:
+                raise ValueError(f"Unknown operation {operation}")
+            result = await getattr(self._layer, operation)(*args)
+        except ChannelFull:
+            error, result = "ChannelFull", args[0]
+        except Exception as e:
+            error = repr(e)
+        # Nothing awaited since the message left its queue, the answer cannot be cancelled away
+        if not writer.is_closing():
+            writer.write(_pack([request_id, error, result]))
+
+
+def serve_hub(path: str, **config):
+    """Entry point of the hub process."""
+    asyncio.run(LocalChannelHub(path, **config).serve_forever())
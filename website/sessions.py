@@ -0,0 +1,199 @@
+# website/sessions.py
+
+import atexit
+import logging
+import threading
+import time
+from typing import Optional, Dict, Tuple
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.contrib.sessions.backends import cached_db
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DatabaseError, connections
+
+KEY_PREFIX = "website.sessions.cache_write_behind"
+
+logger = logging.getLogger(__name__)
+
+
+class SessionWriter:
+    """
+    Writes the saved sessions to the database `delay` seconds after the first save of a batch,
+    every session saved in the meantime in one bulk upsert. A session saved again before the
+    write is only written once, with its last data. The sessions still waiting when the process
+    exits are written by an exit hook, the writer thread is a daemon.
+    """
+    WRITE_DELAY = 1.0
+
+    def __init__(self, delay: float = WRITE_DELAY):
+        self.delay: float = delay
+        self._pending: Dict[str, Tuple[str, datetime]] = {}
+        self._lock = threading.Lock()
+        # Held while a batch is written, a deleted session cannot be written back after its delete
+        self._write_lock = threading.Lock()
+        self._scheduled = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, session_key: str, session_data: str, expire_date: datetime):
+        with self._lock:
+            self._pending[session_key] = (session_data, expire_date)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        self._scheduled.set()
+
+    def pending(self, session_key: str) -> Optional[str]:
+        """Encoded data of the session if it is waiting to be written."""
+        with self._lock:
+            entry = self._pending.get(session_key)
+        return entry[0] if entry is not None else None
+
+    def cancel(self, session_key: str):
+        with self._lock:
+            self._pending.pop(session_key, None)
+        with self._write_lock:
+            pass
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            model = SessionStore.get_model_class()
+            try:
+                model.objects.bulk_create(
+                    [model(session_key=key, session_data=data, expire_date=expire_date) for key, (data, expire_date) in pending.items()],
+                    update_conflicts=True,
+                    unique_fields=["session_key"],
+                    update_fields=["session_data", "expire_date"],
+                )
+            except DatabaseError as e:
+                logger.error(f"Failed writing {len(pending)} sessions: {e}")
+                with self._lock:
+                    # Sessions saved again since keep their newer data
+                    for key, entry in pending.items():
+                        self._pending.setdefault(key, entry)
+                self._scheduled.set()
+
+    def _run(self):
+        while True:
+            self._scheduled.wait()
+            time.sleep(self.delay)
+            self._scheduled.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception(f"Session writer failed: {e}")
+            finally:
+                connections.close_all()
+
+
+session_writer = SessionWriter()
+
+
+class SessionStore(cached_db.SessionStore):
+    """
+    Sessions kept in the SESSION_CACHE_ALIAS cache, written to the database by the session writer
+    after the response. A session cached in the memory of the process is loaded without a database
+    query nor a thread hop, aload reads the in-memory cache directly.
+
+    An in-memory cache is only valid for a single process, the saves of the others are not seen:
+    several processes share a cache server instead. The TIMEOUT of the cache, if any, bounds how
+    long a session stays cached.
+
+    New sessions are inserted in the database right away, so their keys stay unique.
+    """
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._local_cache = isinstance(self._cache, LocMemCache)
+
+    def _cache_timeout(self, expiry_age: int) -> int:
+        timeout = self._cache.default_timeout
+        return expiry_age if timeout is None else min(expiry_age, timeout)
+
+    def _pending(self) -> Optional[dict]:
+        # Evicted from the cache before its write, the database is behind
+        pending = session_writer.pending(self.session_key)
+        return self.decode(pending) if pending is not None else None
+
+    def _cached(self, cache_key: str) -> Optional[dict]:
+        try:
+            data = self._cache.get(cache_key)
+        except Exception:
+            data = None
+        return data if data is not None else self._pending()
+
+    async def _acached(self, cache_key: str) -> Optional[dict]:
+        if self._local_cache:
+            return self._cached(cache_key)
+        try:
+            data = await self._cache.aget(cache_key)
+        except Exception:
+            data = None
+        return data if data is not None else self._pending()
+
+    async def _acache_set(self, cache_key: str, data: dict, expiry_age: int):
+        if self._local_cache:
+            self._cache.set(cache_key, data, self._cache_timeout(expiry_age))
+        else:
+            await self._cache.aset(cache_key, data, self._cache_timeout(expiry_age))
+
+    def load(self):
+        data = self._cached(self.cache_key)
+        if data is None:
+            s = self._get_session_from_db()
+            if s is None:
+                return {}
+            data = self.decode(s.session_data)
+            self._cache.set(self.cache_key, data, self._cache_timeout(self.get_expiry_age(expiry=s.expire_date)))
+        return data
+
+    async def aload(self):
+        cache_key = await self.acache_key()
+        data = await self._acached(cache_key)
+        if data is None:
+            s = await self._aget_session_from_db()
+            if s is None:
+                return {}
+            data = self.decode(s.session_data)
+            await self._acache_set(cache_key, data, await self.aget_expiry_age(expiry=s.expire_date))
+        return data
+
+    def exists(self, session_key):
+        return bool(session_key) and session_writer.pending(session_key) is not None or super().exists(session_key)
+
+    async def aexists(self, session_key):
+        return bool(session_key) and session_writer.pending(session_key) is not None or await super().aexists(session_key)
+
+    def save(self, must_create=False):
+        if must_create or self.session_key is None:
+            return super().save(must_create)
+        data = self._get_session()
+        self._cache.set(self.cache_key, data, self._cache_timeout(self.get_expiry_age()))
+        session_writer.schedule(self.session_key, self.encode(data), self.get_expiry_date())
+
+    async def asave(self, must_create=False):
+        if must_create or self.session_key is None:
+            return await super().asave(must_create)
+        data = await self._aget_session()
+        await self._acache_set(await self.acache_key(), data, await self.aget_expiry_age())
+        session_writer.schedule(self.session_key, self.encode(data), await self.aget_expiry_date())
+
+    def delete(self, session_key=None):
+        session_key = session_key or self.session_key
+        if session_key is None:
+            return
+        session_writer.cancel(session_key)
+        super().delete(session_key)
+
+    async def adelete(self, session_key=None):
+        session_key = session_key or self.session_key
+        if session_key is None:
+            return
+        await sync_to_async(session_writer.cancel)(session_key)
+        await super().adelete(session_key)
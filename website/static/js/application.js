@@ -215,6 +215,15 @@ var PyPoker = {
             });
         },
 
+        updateEquity: function(players) {
+            for (let playerId in players) {
+                let equity = Math.round(players[playerId].equity * 100);
+                let $cardsContainer = $('#players .player[data-player-id="' + playerId + '"] .cards');
+                $cardsContainer.find('.equity').remove();
+                $cardsContainer.append($('<div class="equity"></div>').text(equity + '%'));
+            }
+        },
+
         updatePots: function(pots) {
             $('#pots').empty();
             for (let potIndex in pots) {
@@ -288,6 +297,9 @@ var PyPoker = {
                 case 'showdown':
                     PyPoker.Game.updatePlayersCards(message.players);
                     break;
+                case 'equity':
+                    PyPoker.Game.updateEquity(message.players);
+                    break;
                 case 'ping':
                     PyPoker.Player.handlePing(message);
                     break;
@@ -318,6 +330,7 @@ var PyPoker = {
 
     Player: {
         betMode: false,
+        betSeq: null,
         cardsChangeMode: false,
 
         resetTimers: function() {
@@ -343,6 +356,7 @@ var PyPoker = {
 
         enableBetMode: function(message) {
             PyPoker.Player.betMode = true;
+            PyPoker.Player.betSeq = message.seq;
 
             if (!message.min_score || $('#current-player').data('allowed-to-bet')) {
                 $('#bet-input').slider({
@@ -676,7 +690,8 @@ var PyPoker = {
         $('#fold-cmd').click(function() {
             PyPoker.socket.send(JSON.stringify({
                 'message_type': 'bet',
-                'bet': -1
+                'bet': -1,
+                'seq': PyPoker.Player.betSeq
             }));
             PyPoker.Player.disableBetMode();
         });
@@ -684,7 +699,8 @@ var PyPoker = {
         $('#no-bet-cmd').click(function() {
             PyPoker.socket.send(JSON.stringify({
                 'message_type': 'bet',
-                'bet': 0
+                'bet': 0,
+                'seq': PyPoker.Player.betSeq
             }));
             PyPoker.Player.disableBetMode();
         });
@@ -692,7 +708,8 @@ var PyPoker = {
         $('#bet-cmd').click(function() {
             PyPoker.socket.send(JSON.stringify({
                 'message_type': 'bet',
-                'bet': $('#bet-input').val()
+                'bet': $('#bet-input').val(),
+                'seq': PyPoker.Player.betSeq
             }));
             PyPoker.Player.disableBetMode();
         });
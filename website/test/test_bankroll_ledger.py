@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import random
+import unittest
+
+from ..Services.Logic.PokerGame import Player, HandLedger, HoldemPokerGameFactory, GamePacing
+from ..Services.Logic.GameSimulator import BotPlayer, SimulationTable, random_strategy
+#python -m unittest website.test.test_bankroll_ledger
+
+
+class LedgerMock:
+    def __init__(self):
+        self.hands = []
+
+    def submit(self, game_id, hand, entries):
+        self.hands.append((game_id, hand, entries))
+
+
+class HandLedgerTest(unittest.TestCase):
+    def test_movements_in_minor_units(self):
+        ledger = LedgerMock()
+        hand_ledger = HandLedger(ledger, "game-1")
+        player = Player("p1", "Player 1", 100.0)
+        hand_ledger.take(player, 25.5, "blind")
+        hand_ledger.give(player, 0.1, "win")
+        self.assertAlmostEqual(74.6, player.money)
+        self.assertEqual([], ledger.hands)
+
+        hand_ledger.commit()
+        self.assertEqual([("game-1", 0, [("p1", None, -2550, "blind"), ("p1", None, 10, "win")])], ledger.hands)
+
+    def test_commit_uses_room_hand_number(self):
+        ledger = LedgerMock()
+        hand_ledger = HandLedger(ledger, "game-1", 7)
+        player = Player("p1", "Player 1", 100.0)
+        player.user_id = 3
+        hand_ledger.take(player, 10.0, "bet")
+        hand_ledger.commit()
+        self.assertEqual([("game-1", 7, [("p1", 3, -1000, "bet")])], ledger.hands)
+
+    def test_without_ledger_only_moves_money(self):
+        hand_ledger = HandLedger()
+        player = Player("p1", "Player 1", 100.0)
+        hand_ledger.take(player, 10.0, "bet")
+        hand_ledger.commit()
+        self.assertEqual(90.0, player.money)
+
+    def test_refused_movement_not_recorded(self):
+        ledger = LedgerMock()
+        hand_ledger = HandLedger(ledger, "game-1")
+        player = Player("p1", "Player 1", 10.0)
+        with self.assertRaises(ValueError):
+            hand_ledger.take(player, 20.0, "bet")
+        hand_ledger.commit()
+        self.assertEqual([], ledger.hands)
+
+
+class GameLedgerTest(unittest.TestCase):
+    def test_hands_record_every_chip_movement(self):
+        logger = logging.getLogger("GameLedgerTest")
+        logger.setLevel(logging.CRITICAL)
+        rng = random.Random(3)
+        bots = [BotPlayer(f"bot-{k}", f"Bot {k}", 1000, random_strategy(rng)) for k in range(4)]
+        table = SimulationTable(bots)
+        ledger = LedgerMock()
+        game_factory = HoldemPokerGameFactory(
+            big_blind=50,
+            small_blind=25,
+            logger=logger,
+            game_subscribers=[table],
+            pacing=GamePacing.profile("simulation"),
+            ledger=ledger
+        )
+
+        async def play(hands):
+            for hand in range(hands):
+                seated = [bot for bot in bots if bot.money >= 50]
+                if len(seated) < 2:
+                    break
+                money = {bot.id: bot.money for bot in seated}
+                table.start_hand()
+                game = game_factory.create_game(seated, hand=hand)
+                await game.play_hand(seated[hand % len(seated)].id)
+                _, number, entries = ledger.hands[-1]
+                self.assertEqual(hand, number)
+                self.assertEqual(0, sum(units for _, _, units, _ in entries))
+                for bot in seated:
+                    units = sum(units for player_id, _, units, _ in entries if player_id == bot.id)
+                    self.assertEqual(HandLedger.to_minor_units(bot.money - money[bot.id]), units)
+
+        asyncio.run(play(20))
+        self.assertGreater(len(ledger.hands), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
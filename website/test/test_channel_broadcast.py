@@ -0,0 +1,136 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+import fakeredis
+from channels.layers import InMemoryChannelLayer
+from channels_redis.core import RedisChannelLayer
+
+from ..layers import LocalChannelLayer
+from ..Services.Logic.ChannelBroadcast import ChannelBroadcaster, send_many
+from ..Services.Logic import Game_RoomServer
+from ..Services.Logic.Game_RoomServer import GameRoomFactory
+from ..Services.Logic.GameWorker import RemoteChannel
+from ..Services.Logic.Player_ClientChannelServer import PlayerServer
+#python -m unittest website.test.test_channel_broadcast
+
+
+class SendManyTest(unittest.TestCase):
+    def test_local_layer_skips_full_channels(self):
+        async def run():
+            layer = LocalChannelLayer(capacity=1)
+            await layer.send("player-2", {"type": "game.frame", "text": "{}"})
+            over_capacity = await send_many(layer, ["player-1", "player-2", "player-3"], {"type": "game.frame", "text": "[]"})
+            return over_capacity, [(await layer.receive(channel))["text"] for channel in ("player-1", "player-2", "player-3")]
+
+        over_capacity, texts = asyncio.run(run())
+        self.assertEqual(1, over_capacity)
+        self.assertEqual(["[]", "{}", "[]"], texts)
+
+    def test_layer_without_batches(self):
+        async def run():
+            layer = InMemoryChannelLayer(capacity=1)
+            await layer.send("player-2", {"type": "game.frame", "text": "{}"})
+            over_capacity = await send_many(layer, ["player-1", "player-2"], {"type": "game.frame", "text": "[]"})
+            return over_capacity, (await layer.receive("player-1"))["text"]
+
+        self.assertEqual((1, "[]"), asyncio.run(run()))
+
+
+    def test_redis_layer_by_shard(self):
+        async def run():
+            servers = [fakeredis.FakeServer(), fakeredis.FakeServer()]
+            layer = RedisChannelLayer(hosts=["redis://shard-0", "redis://shard-1"], capacity=1)
+            layer.connection = lambda index: fakeredis.aioredis.FakeRedis(server=servers[index])
+            first, second = await layer.new_channel(), await layer.new_channel()
+            await layer.send("player-2", {"type": "game.frame", "text": "{}"})
+            channels = [first, "player-2", second, "player-3"]
+            over_capacity = await send_many(layer, channels, {"type": "game.frame", "text": "[]"})
+            # The layer's receive runs a script, the queues are read as it would
+            received = {}
+            for channel in channels:
+                name = layer.non_local_name(channel) if "!" in channel else channel
+                connection = layer.connection(layer.consistent_hash(name))
+                received[channel] = [layer.deserialize(data) for data in await connection.zrange(layer.prefix + name, 0, -1)]
+            return channels, over_capacity, received
+
+        channels, over_capacity, received = asyncio.run(run())
+        self.assertEqual(1, over_capacity)
+        self.assertEqual([["[]"], ["{}"], ["[]"], ["[]"]], [[message["text"] for message in received[channel]] for channel in channels])
+        # Process specific channels share their process' queue, one message names both channels
+        self.assertEqual([channels[0], channels[2]], received[channels[0]][0]["__asgi_channel__"])
+        self.assertEqual(["player-3"], received["player-3"][0]["__asgi_channel__"])
+
+
+class ChannelBroadcasterTest(unittest.TestCase):
+    class ChannelMock:
+        def __init__(self):
+            self.frames = []
+            self.messages = []
+
+        async def send(self, text_data=None):
+            self.frames.append(text_data)
+
+        async def send_json(self, message):
+            self.messages.append(message)
+
+    def test_room_broadcast_in_one_batch(self):
+        async def run():
+            layer = LocalChannelLayer()
+            broadcaster = ChannelBroadcaster(layer)
+            room = GameRoomFactory(game_factory=None, room_size=3, broadcaster=broadcaster).create_room("room-1")
+            local_channel = self.ChannelMock()
+            room.players = {
+                "player-1": PlayerServer("player-1", "Player 1", 1000, channel=RemoteChannel(layer, "consumer-1")),
+                "player-2": PlayerServer("player-2", "Player 2", 1000, channel=RemoteChannel(layer, "consumer-2")),
+                "player-3": PlayerServer("player-3", "Player 3", 1000, channel=local_channel),
+            }
+            await room.broadcast({"message_type": "game-update", "event": "game-over"})
+            await room.players["player-3"].flush()
+            frames = [await layer.receive("consumer-1"), await layer.receive("consumer-2")]
+            return broadcaster.metrics.snapshot(), frames, local_channel.frames
+
+        metrics, frames, local_frames = asyncio.run(run())
+        self.assertEqual(1, metrics["batches"])
+        self.assertEqual(2, metrics["max_batch"])
+        self.assertEqual({"type": "game.frame", "text": '{"message_type":"game-update","event":"game-over"}'}, frames[0])
+        self.assertIs(frames[0], frames[1])
+        self.assertEqual([frames[0]["text"]], local_frames)
+
+    def test_room_broadcast_encoded_once(self):
+        async def run():
+            room = GameRoomFactory(game_factory=None, room_size=3).create_room("room-1")
+            channels = {f"player-{k}": self.ChannelMock() for k in range(1, 4)}
+            for player_id, channel in channels.items():
+                await room.join(PlayerServer(player_id, player_id, 1000, channel=channel))
+            spectator = self.ChannelMock()
+            room.watch("spectator-1", spectator)
+            await asyncio.sleep(0)
+            for channel in (*channels.values(), spectator):
+                channel.frames.clear()
+            with mock.patch.object(Game_RoomServer.json, "dumps", wraps=json.dumps) as dumps:
+                await room.game_event("new-game", {"event": "new-game"})
+                await room.game_event("cards-assignment", {"event": "cards-assignment", "target": "player-2", "cards": []})
+            for player in room.players.values():
+                await player.flush()
+            await asyncio.sleep(0)
+            return dumps.call_count, channels, spectator
+
+        encodings, channels, spectator = asyncio.run(run())
+        self.assertEqual(1, encodings)
+        frame = spectator.frames[0]
+        self.assertEqual({"message_type": "game-update", "event": "new-game"}, json.loads(frame))
+        self.assertEqual([frame], spectator.frames)
+        for channel in channels.values():
+            self.assertEqual([frame], channel.frames)
+            self.assertIs(frame, channel.frames[0])
+        self.assertEqual(
+            {"player-1": [], "player-2": [{"message_type": "game-update", "event": "cards-assignment", "target": "player-2", "cards": []}], "player-3": []},
+            {player_id: channel.messages for player_id, channel in channels.items()}
+        )
+        self.assertEqual([], spectator.messages)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+from uuid import uuid4
+
+import fakeredis
+
+from ..Services.Logic.ChannelRedis import ChannelRedis, MessageQueue, RedisChannelListener
+from ..Services.Logic.Player_ClientChannelServer import PlayerServer
+from ..Services.Logic.PokerGame import MessageTimeout
+#python -m unittest website.test.test_channel_redis
+
+
+class ChannelRedisTest(unittest.TestCase):
+    def setUp(self):
+        self.prefix = f"test:{uuid4().hex}"
+        self.server = fakeredis.FakeServer()
+
+    def create_redis(self):
+        # Clients of the same in-process server, as the queues of a process share the real one
+        return fakeredis.aioredis.FakeRedis(server=self.server)
+
+    def test_pop_times_out(self):
+        async def pop():
+            queue = MessageQueue(self.create_redis(), f"{self.prefix}:queue")
+            with self.assertRaises(MessageTimeout):
+                await queue.pop(asyncio.get_running_loop().time() + 0.2)
+
+        asyncio.run(pop())
+
+    def test_player_channel(self):
+        async def run():
+            redis_client = self.create_redis()
+            loop = asyncio.get_running_loop()
+            channels = [ChannelRedis(redis_client, f"{self.prefix}:{k}:in", f"{self.prefix}:{k}:out") for k in range(3)]
+            players = [PlayerServer(f"player-{k}", f"Player {k}", 1000, channel=channel) for k, channel in enumerate(channels)]
+            listener = RedisChannelListener(redis_client)
+            try:
+                for player, channel in zip(players, channels):
+                    await listener.subscribe_player(player, channel)
+
+                await MessageQueue(redis_client, f"{self.prefix}:2:in").push({"message_type": "bet", "bet": 10, "seq": 1})
+                bet = await players[2].recv_message(loop.time() + 2, seq=1)
+
+                await players[0].send_message({"message_type": "game-update"})
+                update = await MessageQueue(redis_client, f"{self.prefix}:0:out").pop(loop.time() + 2)
+
+                await MessageQueue(redis_client, f"{self.prefix}:1:in").push({"message_type": "disconnect"})
+                disconnect = await players[1].recv_message(loop.time() + 2)
+                return bet, update, disconnect, players[1].connected
+            finally:
+                await listener.close()
+
+        bet, update, disconnect, connected = asyncio.run(run())
+        self.assertEqual(10, bet["bet"])
+        self.assertEqual({"message_type": "game-update"}, update)
+        self.assertEqual("disconnect", disconnect["message_type"])
+        self.assertFalse(connected)
+
+
+if __name__ == '__main__':
+    unittest.main()
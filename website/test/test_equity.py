@@ -0,0 +1,46 @@
+import random
+import unittest
+
+from ..Services.Logic.PokerGame import Card
+from ..Services.Logic.Equity import EquityCalculator
+#python -m unittest website.test.test_equity
+
+
+class EquityCalculatorTest(unittest.TestCase):
+    def test_river_is_decided(self):
+        equities = EquityCalculator().calculate(
+            {"player-1": [Card(14, 0), Card(14, 1)], "player-2": [Card(13, 0), Card(12, 1)]},
+            [Card(2, 0), Card(7, 1), Card(9, 2), Card(10, 3), Card(4, 0)]
+        )
+        self.assertEqual(1.0, equities["player-1"]["win"])
+        self.assertEqual(0.0, equities["player-2"]["equity"])
+
+    def test_turn_is_enumerated(self):
+        equities = EquityCalculator().calculate(
+            {"player-1": [Card(14, 0), Card(14, 1)], "player-2": [Card(13, 2), Card(13, 3)]},
+            [Card(2, 0), Card(7, 1), Card(9, 2), Card(10, 3)]
+        )
+        # 44 rivers, only the two remaining kings win for player-2
+        self.assertAlmostEqual(42 / 44, equities["player-1"]["win"])
+        self.assertAlmostEqual(2 / 44, equities["player-2"]["win"])
+
+    def test_split_pot(self):
+        equities = EquityCalculator().calculate(
+            {"player-1": [Card(14, 0), Card(14, 1)], "player-2": [Card(14, 2), Card(14, 3)]},
+            [Card(2, 0), Card(7, 1), Card(9, 2), Card(10, 3)]
+        )
+        self.assertEqual(1.0, equities["player-1"]["tie"])
+        self.assertEqual(0.5, equities["player-2"]["equity"])
+
+    def test_preflop_is_sampled(self):
+        calculator = EquityCalculator(samples=2000, rng=random.Random(42))
+        equities = calculator.calculate(
+            {"player-1": [Card(14, 0), Card(14, 1)], "player-2": [Card(13, 2), Card(13, 3)]},
+            []
+        )
+        self.assertAlmostEqual(0.82, equities["player-1"]["equity"], delta=0.04)
+        self.assertAlmostEqual(1.0, equities["player-1"]["equity"] + equities["player-2"]["equity"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import unittest
+from unittest.mock import patch
+
+from ..Services.Logic.PokerGame import Card, Player, HoldemPokerGameFactory, HoldemPokerScore
+from ..Services.Logic.EvaluatorExecutor import EvaluatorExecutor
+#python -m unittest website.test.test_evaluator_executor
+
+
+class EvaluatorExecutorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = EvaluatorExecutor(max_workers=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def test_evaluate_all_hands_in_one_call(self):
+        hands = {
+            "player-1": [int(Card(14, 0)), int(Card(14, 1))],
+            "player-2": [int(Card(13, 0)), int(Card(13, 1))],
+        }
+        board = [int(Card(2, 0)), int(Card(7, 1)), int(Card(9, 2)), int(Card(13, 2)), int(Card(4, 1))]
+        evaluations = asyncio.run(self.executor.evaluate(hands, board))
+        self.assertEqual(HoldemPokerScore.PAIR, evaluations["player-1"][0])
+        self.assertEqual(HoldemPokerScore.TRIPS, evaluations["player-2"][0])
+
+    def test_game_preloads_scores(self):
+        async def evaluate():
+            game_factory = HoldemPokerGameFactory(50, 25, logging.getLogger(__name__), evaluator_executor=self.executor)
+            game = game_factory.create_game([Player("player-1", "Player One", 1000), Player("player-2", "Player Two", 1000)])
+            scores = game._create_scores()
+            scores.assign_cards("player-1", [Card(14, 0), Card(14, 1)])
+            scores.assign_cards("player-2", [Card(13, 0), Card(13, 1)])
+            scores.add_shared_cards([Card(2, 0), Card(7, 1), Card(9, 2), Card(13, 2), Card(4, 1)])
+            await game._evaluate_scores(scores)
+            return scores
+
+        scores = asyncio.run(evaluate())
+        self.assertEqual(HoldemPokerScore.TRIPS, scores.player_score("player-2").category)
+        self.assertEqual(0, scores.cache_misses)
+
+    def test_workers_share_the_cpus(self):
+        with patch("os.cpu_count", return_value=8):
+            self.assertEqual(8, EvaluatorExecutor.processes_per_worker(0))
+            self.assertEqual(2, EvaluatorExecutor.processes_per_worker(4))
+            self.assertEqual(1, EvaluatorExecutor.processes_per_worker(16))
+
+
+if __name__ == '__main__':
+    unittest.main()
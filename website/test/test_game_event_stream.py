@@ -0,0 +1,51 @@
+import asyncio
+import logging
+import unittest
+from uuid import uuid4
+
+import fakeredis
+
+from ..Services.Logic.GameEventStream import GameEventLog
+from ..Services.Logic.PokerGame import GameEventDispatcher
+#python -m unittest website.test.test_game_event_stream
+
+
+class GameEventLogTest(unittest.TestCase):
+    def setUp(self):
+        self.room_id = f"test-{uuid4().hex}"
+
+    def test_consumer_group_and_replay(self):
+        async def run():
+            event_log = GameEventLog(fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer()), maxlen=100)
+            await event_log.ensure_group(self.room_id, "front-ends")
+            await event_log.ensure_group(self.room_id, "front-ends")
+            await event_log.ensure_group(self.room_id, "player-1")
+
+            stream = event_log.subscriber(self.room_id)
+            dispatcher = GameEventDispatcher("game-1", logging.getLogger(__name__))
+            dispatcher.subscribe(stream)
+            await dispatcher.raise_event("new-game", {"players": []})
+            await dispatcher.raise_event("cards-assignment", {"target": "player-1", "cards": []})
+            await dispatcher.raise_event("shared-cards", {"cards": []})
+            await stream.flush()
+
+            events = await event_log.read_group([self.room_id], "front-ends", "front-end-1", block=100)
+            await event_log.ack(self.room_id, "front-ends", *(event_id for _, event_id, _ in events))
+            player_events = await event_log.read_group([self.room_id], "player-1", "front-end-1", player_id="player-1", block=100)
+            pending = await event_log._redis.xpending(event_log.stream_key(self.room_id), "front-ends")
+            first_id = events[0][1]
+            replayed = await event_log.replay(self.room_id, first_id, player_id="player-1")
+            spectator = await event_log.replay(self.room_id)
+            return events, player_events, pending["pending"], replayed, spectator
+
+        events, player_events, pending, replayed, spectator = asyncio.run(run())
+        self.assertEqual(["new-game", "shared-cards"], [event["event"] for _, _, event in events])
+        self.assertEqual(["new-game", "cards-assignment", "shared-cards"], [event["event"] for _, _, event in player_events])
+        self.assertEqual(0, pending)
+        self.assertEqual({self.room_id}, {room_id for room_id, _, _ in events})
+        self.assertEqual(["cards-assignment", "shared-cards"], [event["event"] for _, event in replayed])
+        self.assertEqual(["new-game", "shared-cards"], [event["event"] for _, event in spectator])
+
+
+if __name__ == '__main__':
+    unittest.main()
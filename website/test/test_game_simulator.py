@@ -0,0 +1,27 @@
+import asyncio
+import unittest
+
+from ..Services.Logic.GameSimulator import GameSimulator, SimulationTable, BotPlayer, random_strategy
+#python -m unittest website.test.test_game_simulator
+
+
+class GameSimulatorTest(unittest.TestCase):
+    def test_hands_keep_invariants(self):
+        report = asyncio.run(GameSimulator(players=4, seed=7).play(200))
+        self.assertEqual(200, report["hands"])
+        self.assertEqual([], report["violation_samples"])
+        self.assertEqual(0, report["bet_errors"])
+        self.assertEqual(0, report["game_errors"])
+
+    def test_lost_chips_are_reported(self):
+        bot = BotPlayer("bot-1", "Bot 1", 1000, random_strategy(None))
+        table = SimulationTable([bot])
+        table.start_hand()
+        bot.take_money(25)
+        asyncio.run(table.game_event("pots-update", {"pots": [{"money": 20, "player_ids": ["bot-1"]}]}))
+        table.check_hand(0)
+        self.assertEqual(2, table.violations_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+
+from ..layers import LocalChannelLayer
+from ..Services.Logic.Game_RoomServer import GameRoomFactory, GameServer
+from ..Services.Logic.GameWorker import GameWorker, RemoteChannel, worker_name
+from ..Services.Logic.HashRing import ConsistentHashRing
+from ..Services.Logic.Player_ClientChannelServer import PlayerServer
+#python -m unittest website.test.test_game_worker
+
+
+class GameWorkerTest(unittest.TestCase):
+    WORKERS = [worker_name(0), worker_name(1)]
+
+    def _room_owned_by(self, worker: str) -> str:
+        ring = ConsistentHashRing(self.WORKERS)
+        return next(f"room-{k}" for k in range(1000) if ring.get(f"room-{k}") == worker)
+
+    def _workers(self, layer):
+        return [
+            GameWorker(name, self.WORKERS, GameServer(GameRoomFactory(game_factory=None, room_size=4)), channel_layer=layer)
+            for name in self.WORKERS
+        ]
+
+    def _join_message(self, room_id, player_id, **message):
+        return {
+            "type": "player.join",
+            "room_id": room_id,
+            "player": {"id": player_id, "name": player_id, "money": 1000, "reply_channel": f"consumer-{player_id}"},
+            **message
+        }
+
+    def test_join_reaches_room_owner(self):
+        room_id = self._room_owned_by(worker_name(1))
+
+        async def join():
+            layer = LocalChannelLayer()
+            first, second = self._workers(layer)
+            await first.dispatch(self._join_message(room_id, "player-1"))
+            forwarded = await asyncio.wait_for(layer.receive(second.name), 1)
+            await second.dispatch(forwarded)
+            return first, second, forwarded
+
+        first, second, forwarded = asyncio.run(join())
+        self.assertEqual(1, forwarded["hops"])
+        self.assertIsNone(first._game_server.get_room(room_id))
+        self.assertEqual(["player-1"], list(second._game_server.get_room(room_id).players))
+
+    def test_forwarding_stops_after_max_hops(self):
+        room_id = self._room_owned_by(worker_name(1))
+
+        async def join():
+            layer = LocalChannelLayer()
+            first, _ = self._workers(layer)
+            await first.dispatch(self._join_message(room_id, "player-1", hops=GameWorker.MAX_HOPS, forwarded=True))
+            return first
+
+        first = asyncio.run(join())
+        self.assertEqual(["player-1"], list(first._game_server.get_room(room_id).players))
+
+    def test_handed_over_room_keeps_its_table(self):
+        room_id = self._room_owned_by(worker_name(1))
+
+        async def hand_over():
+            layer = LocalChannelLayer()
+            first, second = self._workers(layer)
+            room = first._game_server.room_factory.create_room(id=room_id, private=True)
+            first._game_server.adopt_room(room)
+            for k in range(2):
+                await room.join(PlayerServer(
+                    f"player-{k}", f"Player {k}", 1000 + k,
+                    channel=RemoteChannel(layer, f"consumer-{k}"),
+                    user_id=k + 1,
+                    session_key=f"session-{k}"
+                ))
+            room.watch("spectator-1", RemoteChannel(layer, "consumer-spectator"))
+            room.start_votes.add("player-1")
+            room.hands_played = 5
+            await first._hand_over(room, second.name)
+            await second.dispatch(await asyncio.wait_for(layer.receive(second.name), 1))
+            return first, second._game_server.get_room(room_id)
+
+        first, room = asyncio.run(hand_over())
+        self.assertIsNone(first._game_server.get_room(room_id))
+        self.assertTrue(room.private)
+        self.assertEqual(5, room.hands_played)
+        self.assertEqual({"player-1"}, room.start_votes)
+        self.assertEqual(
+            [("player-0", 1000, 1, "session-0", "consumer-0"), ("player-1", 1001, 2, "session-1", "consumer-1")],
+            [(player.id, player.money, player.user_id, player.session_key, player.channel.reply_channel) for player in room.players.values()]
+        )
+        self.assertEqual({"spectator-1": "consumer-spectator"}, {spectator_id: channel.reply_channel for spectator_id, channel in room.spectators.channels().items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import itertools
+import random
+import unittest
+
+from ..Services.Logic.PokerGame import Card, Cards, HoldemHandEvaluator, HoldemPokerScore, HoldemPokerScoreDetector
+#python -m unittest website.test.test_hand_evaluator
+
+
+class HoldemHandEvaluatorTests(unittest.TestCase):
+    def _evaluate(self, cards):
+        return HoldemHandEvaluator().evaluate([int(card) for card in cards])
+
+    def _cascade_score(self, cards):
+        cards_obj = Cards(cards, 2)
+        score_functions = [
+            (HoldemPokerScore.STRAIGHT_FLUSH,   cards_obj.straight_flush),
+            (HoldemPokerScore.QUADS,            cards_obj.quads),
+            (HoldemPokerScore.FULL_HOUSE,       cards_obj.full_house),
+            (HoldemPokerScore.FLUSH,            cards_obj.flush),
+            (HoldemPokerScore.STRAIGHT,         cards_obj.straight),
+            (HoldemPokerScore.TRIPS,            cards_obj.trips),
+            (HoldemPokerScore.TWO_PAIR,         cards_obj.two_pair),
+            (HoldemPokerScore.PAIR,             cards_obj.pair),
+            (HoldemPokerScore.NO_PAIR,          cards_obj.no_pair),
+        ]
+        for score_category, score_function in score_functions:
+            score = score_function()
+            if score:
+                return HoldemPokerScore(score_category, score)
+
+    def test_wheel_straight(self):
+        cards = [Card(14, 0), Card(2, 1), Card(3, 2), Card(4, 3), Card(5, 0), Card(9, 1), Card(13, 2)]
+        self.assertEqual((HoldemPokerScore.STRAIGHT, (5, 4, 3, 2, 14), None), self._evaluate(cards))
+
+    def test_straight_flush_over_quads(self):
+        cards = [Card(9, 1), Card(8, 1), Card(7, 1), Card(6, 1), Card(5, 1), Card(5, 0), Card(5, 2)]
+        self.assertEqual((HoldemPokerScore.STRAIGHT_FLUSH, (9, 8, 7, 6, 5), 1), self._evaluate(cards))
+
+    def test_quads_kicker(self):
+        cards = [Card(10, 0), Card(10, 1), Card(10, 2), Card(10, 3), Card(13, 0), Card(13, 1), Card(2, 0)]
+        self.assertEqual((HoldemPokerScore.QUADS, (10, 10, 10, 10, 13), None), self._evaluate(cards))
+
+    def test_flush_uses_flush_suit(self):
+        cards = [Card(14, 1), Card(9, 2), Card(7, 2), Card(4, 2), Card(3, 2), Card(2, 2), Card(13, 0)]
+        self.assertEqual((HoldemPokerScore.FLUSH, (9, 7, 4, 3, 2), 2), self._evaluate(cards))
+
+    def test_ranking_key_matches_score_strength(self):
+        cards = [Card(12, 3), Card(12, 0), Card(7, 1), Card(7, 2), Card(3, 0)]
+        score = HoldemPokerScoreDetector().get_score(cards)
+        self.assertEqual(HoldemPokerScore(score.category, score.cards).strength, score.strength)
+
+    def test_matches_cards_cascade(self):
+        deck = [Card(rank, suit) for rank in range(2, 15) for suit in range(4)]
+        detector = HoldemPokerScoreDetector()
+        rng = random.Random(1234)
+        for num_cards in (2, 4, 5, 6, 7):
+            for _ in range(2000):
+                cards = rng.sample(deck, num_cards)
+                expected = self._cascade_score(cards)
+                score = detector.get_score(cards)
+                self.assertEqual(expected.category, score.category)
+                self.assertEqual([int(card) for card in expected.cards], [int(card) for card in score.cards])
+                self.assertEqual(expected.strength, score.strength)
+
+    def test_seven_cards_best_of_five(self):
+        deck = [Card(rank, suit) for rank in range(2, 15) for suit in range(4)]
+        evaluator = HoldemHandEvaluator()
+        rng = random.Random(4321)
+        for _ in range(300):
+            values = [int(card) for card in rng.sample(deck, 7)]
+            best = max(evaluator.strength(five) for five in itertools.combinations(values, 5))
+            self.assertEqual(best, evaluator.strength(values))
+
+    def test_two_trips_full_house(self):
+        cards = [Card(14, 0), Card(14, 1), Card(14, 2), Card(13, 0), Card(13, 1), Card(13, 2), Card(4, 3)]
+        self.assertEqual((HoldemPokerScore.FULL_HOUSE, (14, 14, 14, 13, 13), None), self._evaluate(cards))
+        self.assertEqual([14, 14, 14, 13, 13], [card.rank for card in self._cascade_score(cards).cards])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import logging
+import random
+import unittest
+
+from ..Services.Logic.HandHistory import HandHistoryRecorder
+from ..Services.Logic.PokerGame import HoldemPokerGameFactory, GamePacing
+from ..Services.Logic.GameSimulator import BotPlayer, SimulationTable, random_strategy
+#python -m unittest website.test.test_hand_history
+
+
+class WriterMock:
+    def __init__(self):
+        self.hands = []
+
+    def submit(self, hand):
+        self.hands.append(hand)
+
+
+class HandHistoryRecorderTest(unittest.TestCase):
+    def test_records_hand_events(self):
+        writer = WriterMock()
+        recorder = HandHistoryRecorder(writer, {"p1": 1, "p2": 2}.get)
+
+        async def play():
+            await recorder.game_event("new-game", {"event": "new-game", "game_id": "g1", "players": [{"id": "p1"}, {"id": "p2"}, {"id": "p3"}]})
+            await recorder.game_event("player-action", {"event": "player-action", "game_id": "g1", "action": "bet"})
+            await recorder.game_event("winner-designation", {"event": "winner-designation", "game_id": "g1", "pot": {"money": 150.0, "winner_ids": ["p2"]}})
+            await recorder.game_event("winner-designation", {"event": "winner-designation", "game_id": "g1", "pot": {"money": 50.0, "winner_ids": ["p1"]}})
+            self.assertEqual([], writer.hands)
+            await recorder.game_event("game-over", {"event": "game-over", "game_id": "g1"})
+
+        asyncio.run(play())
+        self.assertEqual(1, len(writer.hands))
+        hand = writer.hands[0]
+        self.assertEqual(200.0, hand.pot)
+        self.assertEqual([1, 2], hand.user_ids)
+        self.assertEqual(2, hand.winner_user_id)
+        lines = [json.loads(line) for line in hand.log.split("\n")]
+        self.assertEqual(["new-game", "player-action", "winner-designation", "winner-designation", "game-over"], [line["event"] for line in lines])
+        self.assertEqual("g1", lines[0]["game_id"])
+        self.assertNotIn("game_id", lines[1])
+
+    def test_events_outside_hand_ignored(self):
+        writer = WriterMock()
+        recorder = HandHistoryRecorder(writer, lambda player_id: None)
+        asyncio.run(recorder.game_event("game-over", {"event": "game-over", "game_id": "g1"}))
+        self.assertEqual([], writer.hands)
+
+    def test_records_played_hands(self):
+        logger = logging.getLogger("HandHistoryRecorderTest")
+        logger.setLevel(logging.CRITICAL)
+        bots = [BotPlayer(f"bot-{k}", f"Bot {k}", 1000, random_strategy(random.Random(k))) for k in range(3)]
+        writer = WriterMock()
+        game_factory = HoldemPokerGameFactory(
+            big_blind=50,
+            small_blind=25,
+            logger=logger,
+            game_subscribers=[SimulationTable(bots), HandHistoryRecorder(writer, lambda player_id: None)],
+            pacing=GamePacing.profile("simulation")
+        )
+
+        async def play():
+            for hand in range(3):
+                # Every hand is dealt, whatever the random bots lost in the previous one
+                for bot in bots:
+                    bot.reset_money(1000)
+                await game_factory.create_game(bots).play_hand(bots[hand].id)
+
+        asyncio.run(play())
+        self.assertEqual(3, len(writer.hands))
+        for hand in writer.hands:
+            self.assertGreater(hand.pot, 0)
+            self.assertEqual("game-over", json.loads(hand.log.split("\n")[-1])["event"])
+
+
+if __name__ == '__main__':
+    unittest.main()
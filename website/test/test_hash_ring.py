@@ -0,0 +1,43 @@
+import unittest
+
+from ..Services.Logic.HashRing import ConsistentHashRing
+#python -m unittest website.test.test_hash_ring
+
+
+class ConsistentHashRingTest(unittest.TestCase):
+    def setUp(self):
+        self.keys = [f"room-{k}" for k in range(5000)]
+
+    def test_empty_ring(self):
+        self.assertIsNone(ConsistentHashRing().get("room-1"))
+
+    def test_same_nodes_same_owners(self):
+        ring1 = ConsistentHashRing(["worker-0", "worker-1", "worker-2"])
+        ring2 = ConsistentHashRing(["worker-2", "worker-0", "worker-1"])
+        for key in self.keys:
+            self.assertEqual(ring1.get(key), ring2.get(key))
+
+    def test_keys_spread_over_nodes(self):
+        ring = ConsistentHashRing([f"worker-{k}" for k in range(4)])
+        owners = [ring.get(key) for key in self.keys]
+        for node in ring.nodes:
+            self.assertGreater(owners.count(node), len(self.keys) / 8)
+
+    def test_added_node_only_takes_keys(self):
+        ring = ConsistentHashRing([f"worker-{k}" for k in range(4)])
+        before = {key: ring.get(key) for key in self.keys}
+        ring.add("worker-4")
+        moved = [key for key in self.keys if ring.get(key) != before[key]]
+        self.assertTrue(all(ring.get(key) == "worker-4" for key in moved))
+        self.assertLess(len(moved), len(self.keys) / 3)
+
+    def test_removed_node_gives_back_keys(self):
+        ring = ConsistentHashRing([f"worker-{k}" for k in range(4)])
+        before = {key: ring.get(key) for key in self.keys}
+        ring.add("worker-4")
+        ring.remove("worker-4")
+        self.assertEqual(before, {key: ring.get(key) for key in self.keys})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from channels.exceptions import ChannelFull
+
+from ..layers import LocalChannelLayer, LocalChannelHub
+#python -m unittest website.test.test_local_channel_layer
+
+
+class LocalChannelLayerTest(unittest.TestCase):
+    def test_send_receive_in_order(self):
+        async def run():
+            layer = LocalChannelLayer()
+            await layer.send("player-1", {"type": "game.message", "n": 1})
+            await layer.send("player-1", {"type": "game.message", "n": 2})
+            return [(await layer.receive("player-1"))["n"] for _ in range(2)]
+
+        self.assertEqual([1, 2], asyncio.run(run()))
+
+    def test_receive_waits_for_message(self):
+        async def run():
+            layer = LocalChannelLayer()
+            receive = asyncio.create_task(layer.receive("player-1"))
+            await asyncio.sleep(0)
+            await layer.send("player-1", {"type": "game.message"})
+            return await asyncio.wait_for(receive, 1)
+
+        self.assertEqual({"type": "game.message"}, asyncio.run(run()))
+
+    def test_cancelled_receive_leaves_message(self):
+        async def run():
+            layer = LocalChannelLayer()
+            receive = asyncio.create_task(layer.receive("player-1"))
+            await asyncio.sleep(0)
+            await layer.send("player-1", {"type": "game.message"})
+            receive.cancel()
+            other = asyncio.create_task(layer.receive("player-1"))
+            return await asyncio.wait_for(other, 1)
+
+        self.assertEqual({"type": "game.message"}, asyncio.run(run()))
+
+    def test_capacity(self):
+        async def run():
+            layer = LocalChannelLayer(capacity=2, channel_capacity={"room-*": 1})
+            await layer.send("player-1", {"type": "game.message"})
+            await layer.send("player-1", {"type": "game.message"})
+            with self.assertRaises(ChannelFull):
+                await layer.send("player-1", {"type": "game.message"})
+            await layer.send("room-1", {"type": "game.message"})
+            with self.assertRaises(ChannelFull):
+                await layer.send("room-1", {"type": "game.message"})
+
+        asyncio.run(run())
+
+    def test_expired_messages_are_dropped(self):
+        async def run():
+            layer = LocalChannelLayer(expiry=-1, capacity=1)
+            await layer.send("player-1", {"type": "game.message", "n": 1})
+            # The expired message no longer counts in the capacity
+            await layer.send("player-1", {"type": "game.message", "n": 2})
+            layer.expiry = 60
+            await layer.send("player-2", {"type": "game.message", "n": 3})
+            return await asyncio.wait_for(layer.receive("player-2"), 1)
+
+        self.assertEqual(3, asyncio.run(run())["n"])
+
+    def test_group_send_shares_message(self):
+        async def run():
+            layer = LocalChannelLayer(capacity=1)
+            for channel in ("player-1", "player-2", "player-3"):
+                await layer.group_add("room", channel)
+            await layer.send("player-3", {"type": "game.message"})
+            await layer.group_discard("room", "player-2")
+            message = {"type": "game.frame", "text": "{}"}
+            # player-3 is full and misses the message
+            await layer.group_send("room", message)
+            received = await layer.receive("player-1")
+            self.assertIs(message, received)
+            self.assertNotIn("player-2", layer._queues)
+            self.assertEqual({"type": "game.message"}, await layer.receive("player-3"))
+            self.assertNotIn("player-3", layer._queues)
+
+        asyncio.run(run())
+
+    def test_group_membership_expires(self):
+        async def run():
+            layer = LocalChannelLayer(group_expiry=10)
+            await layer.group_add("room", "player-1")
+            layer._groups["room"]["player-1"] = time.time() - 20
+            await layer.group_send("room", {"type": "game.message"})
+            self.assertNotIn("player-1", layer._queues)
+            self.assertNotIn("room", layer._groups)
+
+        asyncio.run(run())
+
+    def test_unreceived_channels_are_swept(self):
+        async def run():
+            layer = LocalChannelLayer(expiry=10, group_expiry=10)
+            await layer.send("specific.local!closed", {"type": "game.message"})
+            await layer.group_add("idle-room", "specific.local!closed")
+            self.assertIn("specific.local!closed", layer._queues)
+            # Nobody receives from the channel nor sends to the group, other sends sweep them
+            layer._queues["specific.local!closed"][0] = (time.time() - 1, {"type": "game.message"})
+            layer._groups["idle-room"]["specific.local!closed"] = time.time() - 20
+            await layer.send("player-1", {"type": "game.message"})
+            self.assertIn("specific.local!closed", layer._queues)
+            layer._swept_at -= 10
+            await layer.send("player-1", {"type": "game.message"})
+            self.assertEqual(["player-1"], list(layer._queues))
+            self.assertEqual({}, layer._groups)
+
+        asyncio.run(run())
+
+
+class LocalChannelHubTest(unittest.TestCase):
+    def test_processes_share_the_hub(self):
+        async def run(path):
+            hub = asyncio.create_task(LocalChannelHub(path, capacity=1).serve_forever())
+            web, worker = LocalChannelLayer(socket=path), LocalChannelLayer(socket=path)
+            try:
+                await web.group_add("poker-ring", "web-1")
+                await worker.group_send("poker-ring", {"type": "ring.update", "workers": ["poker-worker-0"]})
+                received = await asyncio.wait_for(web.receive("web-1"), 5)
+
+                receive = asyncio.create_task(worker.receive("poker-worker-0"))
+                await web.send("poker-worker-0", {"type": "player.bet", "data": b"\x00"})
+                bet = await asyncio.wait_for(receive, 5)
+
+                await web.send("poker-worker-1", {"type": "player.bet"})
+                with self.assertRaises(ChannelFull):
+                    await web.send("poker-worker-1", {"type": "player.bet"})
+                return received, bet
+            finally:
+                await web.close()
+                await worker.close()
+                # Lets the hub see the connections closing
+                await asyncio.sleep(0.1)
+                hub.cancel()
+
+        with tempfile.TemporaryDirectory() as directory:
+            received, bet = asyncio.run(run(os.path.join(directory, "channels.sock")))
+        self.assertEqual(["poker-worker-0"], received["workers"])
+        self.assertEqual(b"\x00", bet["data"])
+
+
+if __name__ == '__main__':
+    unittest.main()
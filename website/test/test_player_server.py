@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import random
+import unittest
+
+from ..Services.Logic.Player_ClientChannelServer import PlayerServer
+from ..Services.Logic.PokerGame import MessageTimeout, ChannelError, GameSubscriber, HoldemPokerGameFactory, GamePacing
+from ..Services.Logic.GameSimulator import BotPlayer, SimulationTable, random_strategy
+#python -m unittest website.test.test_player_server
+
+
+class PlayerServerInboxTest(unittest.TestCase):
+    class ChannelMock:
+        async def send_json(self, message):
+            pass
+
+    def _player(self):
+        return PlayerServer("player-1", "Player One", 1000, channel=self.ChannelMock())
+
+    def test_stale_bets_are_dropped(self):
+        async def receive():
+            player = self._player()
+            await player.receive_bet({"message_type": "bet", "bet": 50, "seq": 1})
+            await player.receive_bet({"message_type": "bet", "bet": 100, "seq": 2})
+            return await player.recv_message(seq=2)
+
+        self.assertEqual(100, asyncio.run(receive())["bet"])
+
+    def test_bet_received_while_waiting(self):
+        async def receive():
+            player = self._player()
+            loop = asyncio.get_running_loop()
+            loop.call_soon(asyncio.ensure_future, player.receive_bet({"message_type": "bet", "bet": 0, "seq": 3}))
+            return await player.recv_message(timeout_epoch=loop.time() + 1, seq=3)
+
+        self.assertEqual(0, asyncio.run(receive())["bet"])
+
+    def test_timeout(self):
+        async def receive():
+            player = self._player()
+            await player.receive_bet({"message_type": "bet", "bet": 50, "seq": 1})
+            await player.recv_message(timeout_epoch=asyncio.get_running_loop().time() + 0.01, seq=2)
+
+        self.assertRaises(MessageTimeout, asyncio.run, receive())
+
+    def test_disconnect_wakes_up_the_game(self):
+        async def receive():
+            player = self._player()
+            asyncio.get_running_loop().call_soon(asyncio.ensure_future, player.disconnect())
+            return await player.recv_message(seq=5)
+
+        self.assertEqual("disconnect", asyncio.run(receive())["message_type"])
+
+    def test_inbox_is_bounded(self):
+        async def receive():
+            player = self._player()
+            for seq in range(PlayerServer.INBOX_SIZE + 2):
+                await player.receive_bet({"message_type": "bet", "bet": seq, "seq": seq})
+            return await player.recv_message()
+
+        self.assertEqual(2, asyncio.run(receive())["bet"])
+
+
+
+class PlayerServerOutboxTest(unittest.TestCase):
+    class BlockedChannel:
+        def __init__(self):
+            self.frames = []
+            self.unblocked = asyncio.Event()
+
+        async def send(self, text_data=None):
+            await self.unblocked.wait()
+            self.frames.append(text_data)
+
+        async def send_json(self, message):
+            await self.unblocked.wait()
+            self.frames.append(message)
+
+    def _fill(self, overflow_policy):
+        async def send():
+            channel = self.BlockedChannel()
+            player = PlayerServer("player-1", "Player One", 1000, channel=channel, overflow_policy=overflow_policy)
+            for k in range(PlayerServer.OUTBOX_SIZE + 2):
+                await player.send_raw(f"room-update-{k}", "room-update")
+                await asyncio.sleep(0)
+            await player.send_message({"message_type": "game-update", "event": "new-game"})
+            connected = player.connected
+            channel.unblocked.set()
+            await player.flush()
+            return connected, channel.frames, player
+
+        return asyncio.run(send())
+
+    def test_snapshots_are_coalesced(self):
+        connected, frames, _ = self._fill(PlayerServer.OVERFLOW_COALESCE)
+        self.assertTrue(connected)
+        last = f"room-update-{PlayerServer.OUTBOX_SIZE + 1}"
+        self.assertEqual(["room-update-0", last, {"message_type": "game-update", "event": "new-game"}], frames[:1] + frames[-2:])
+        self.assertLess(len(frames), PlayerServer.OUTBOX_SIZE)
+
+    def test_congested_player_is_disconnected(self):
+        async def receive(player):
+            return await player.recv_message(seq=1)
+
+        connected, frames, player = self._fill(PlayerServer.OVERFLOW_DISCONNECT)
+        self.assertFalse(connected)
+        self.assertEqual("disconnect", asyncio.run(receive(player))["message_type"])
+
+    def test_send_does_not_wait_for_the_socket(self):
+        async def send():
+            channel = self.BlockedChannel()
+            player = PlayerServer("player-1", "Player One", 1000, channel=channel)
+            await asyncio.wait_for(player.send_message({"message_type": "game-update", "event": "new-game"}), 0.1)
+            return channel.frames
+
+        self.assertEqual([], asyncio.run(send()))
+
+
+class PlayerServerLostChannelTest(unittest.TestCase):
+    class BrokenChannel:
+        def __init__(self, sent_before_failure):
+            self.sent = 0
+            self.sent_before_failure = sent_before_failure
+
+        async def send_json(self, message):
+            if self.sent == self.sent_before_failure:
+                raise ConnectionResetError("Socket closed")
+            self.sent += 1
+
+    class Table(GameSubscriber):
+        # Bets go to the bots, every event to the player like a room does
+        def __init__(self, bots):
+            self._bots = SimulationTable(bots)
+            self.player = None
+            self.events = []
+
+        async def game_event(self, event, event_data):
+            self.events.append(event)
+            if event != "player-action" or event_data["player"]["id"] != self.player.id:
+                await self._bots.game_event(event, event_data)
+            await self.player.send_message(event_data)
+
+    def test_failed_send_wakes_up_the_game(self):
+        async def receive():
+            player = PlayerServer("player-1", "Player One", 1000, channel=self.BrokenChannel(0))
+            await player.send_message({"message_type": "game-update", "event": "new-game"})
+            message = await player.recv_message(timeout_epoch=asyncio.get_running_loop().time() + 1, seq=1)
+            return player.connected, message
+
+        connected, message = asyncio.run(receive())
+        self.assertFalse(connected)
+        self.assertEqual("disconnect", message["message_type"])
+
+    def _play_hand(self, player_connected, sent_before_failure):
+        logger = logging.getLogger("PlayerServerLostChannelTest")
+        logger.setLevel(logging.CRITICAL)
+        bots = [BotPlayer(f"bot-{k}", f"Bot {k}", 1000, random_strategy(random.Random(k), fold_rate=0)) for k in range(2)]
+        table = self.Table(bots)
+        game_factory = HoldemPokerGameFactory(
+            big_blind=50,
+            small_blind=25,
+            logger=logger,
+            game_subscribers=[table],
+            pacing=GamePacing.profile("simulation")
+        )
+
+        async def play():
+            player = PlayerServer("player-1", "Player One", 1000, channel=self.BrokenChannel(sent_before_failure), logger=logger)
+            player._connected = player_connected
+            table.player = player
+            await game_factory.create_game([player] + bots).play_hand(player.id)
+            return player, table.events
+
+        player, events = asyncio.run(play())
+        self.assertFalse(player.connected)
+        self.assertIn("dead-player", events)
+        self.assertIn("winner-designation", events)
+        self.assertEqual("game-over", events[-1])
+        self.assertEqual(3000, player.money + sum(bot.money for bot in bots))
+
+    def test_send_failing_mid_hand(self):
+        self._play_hand(player_connected=True, sent_before_failure=3)
+
+    def test_closed_player_is_dead(self):
+        self._play_hand(player_connected=False, sent_before_failure=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import unittest
+from unittest import mock
+
+from ..Services.Logic.PokerGame import *
+#python -m unittest website.test.test_poker_game
+
+
+class CardTest(unittest.TestCase):
+    def test_cards_are_interned(self):
+        self.assertIs(Card(14, 3), Card(14, 3))
+        self.assertIs(Card(14, 3), Card.from_value(int(Card(14, 3))))
+
+    def test_invalid_card(self):
+        self.assertRaises(ValueError, Card, 1, 0)
+        self.assertRaises(ValueError, Card, 2, 4)
+
+    def test_deck_uses_interned_cards(self):
+        deck = Deck(2)
+        cards = deck.pop_cards(52)
+        self.assertEqual(52, len(set(cards)))
+        self.assertTrue(all(card is Card(card.rank, card.suit) for card in cards))
+        self.assertEqual(52, len(deck.dealt))
+
+
+class HandTest(unittest.TestCase):
+    def test_membership(self):
+        hand = Hand([Card(14, 3), Card(2, 0)])
+        self.assertIn(Card(14, 3), hand)
+        self.assertNotIn(Card(14, 2), hand)
+
+    def test_iterates_highest_first(self):
+        hand = Hand([Card(2, 0), Card(14, 3), Card(10, 1)])
+        self.assertEqual([Card(14, 3), Card(10, 1), Card(2, 0)], list(hand))
+
+    def test_union(self):
+        hand = Hand([Card(2, 0)]) | Hand([Card(3, 0)])
+        self.assertEqual(Hand([Card(3, 0), Card(2, 0)]), hand)
+        self.assertEqual(2, len(hand))
+
+
+class GameScoresCacheTest(unittest.TestCase):
+    class ScoreDetectorMock:
+        def __init__(self):
+            self.calls = 0
+
+        def get_score(self, cards):
+            self.calls += 1
+            return [int(card) for card in cards]
+
+    def test_score_is_cached(self):
+        detector = self.ScoreDetectorMock()
+        scores = GameScores(detector)
+        scores.assign_cards("player-1", [Card(2, 0), Card(3, 0)])
+        self.assertIs(scores.player_score("player-1"), scores.player_score("player-1"))
+        self.assertEqual(1, detector.calls)
+        self.assertEqual(1, scores.cache_misses)
+        self.assertEqual(1, scores.cache_hits)
+
+    def test_shared_cards_invalidate_cache(self):
+        detector = self.ScoreDetectorMock()
+        scores = GameScores(detector)
+        scores.assign_cards("player-1", [Card(2, 0), Card(3, 0)])
+        scores.player_score("player-1")
+        scores.add_shared_cards([Card(4, 0), Card(5, 0), Card(6, 0)])
+        self.assertEqual([24, 20, 16, 12, 8], scores.player_score("player-1"))
+        self.assertEqual(2, detector.calls)
+
+    def test_assign_cards_invalidates_player_only(self):
+        detector = self.ScoreDetectorMock()
+        scores = GameScores(detector)
+        scores.assign_cards("player-1", [Card(2, 0), Card(3, 0)])
+        scores.assign_cards("player-2", [Card(4, 0), Card(5, 0)])
+        scores.player_score("player-1")
+        scores.player_score("player-2")
+        scores.assign_cards("player-1", [Card(6, 0), Card(7, 0)])
+        self.assertEqual([28, 24], scores.player_score("player-1"))
+        scores.player_score("player-2")
+        self.assertEqual(3, detector.calls)
+        self.assertEqual(1, scores.cache_hits)
+
+
+class GamePlayersTest(unittest.TestCase):
+    def setUp(self):
+        self.players = [Player(f"player-{k}", f"Player {k}", 1000) for k in range(1, 6)]
+        self.game_players = GamePlayers(self.players)
+
+    def test_round_skips_folders(self):
+        self.game_players.fold("player-2")
+        self.game_players.fold("player-4")
+        self.assertEqual(["player-5", "player-1", "player-3"], [p.id for p in self.game_players.round("player-5")])
+        self.assertEqual(["player-3", "player-1", "player-5"], [p.id for p in self.game_players.round("player-3", reverse=True)])
+
+    def test_round_from_folded_seat(self):
+        self.game_players.fold("player-2")
+        self.assertEqual(["player-3", "player-4", "player-5", "player-1"], [p.id for p in self.game_players.round("player-2")])
+
+    def test_get_next(self):
+        self.game_players.fold("player-2")
+        self.assertIs(self.players[2], self.game_players.get_next("player-1"))
+        self.assertRaises(ValueError, self.game_players.get_next, "player-2")
+        for player_id in ("player-1", "player-3", "player-4"):
+            self.game_players.fold(player_id)
+        self.assertIsNone(self.game_players.get_next("player-5"))
+
+    def test_reset_relinks_all_but_dead(self):
+        self.game_players.fold("player-1")
+        self.game_players.remove("player-3")
+        self.game_players.reset()
+        self.assertEqual(["player-1", "player-2", "player-4", "player-5"], [p.id for p in self.game_players.active])
+        self.assertEqual(4, len(self.game_players.all))
+        self.assertIs(self.players[3], self.game_players.get_next("player-2"))
+
+
+class GamePotsTest(unittest.TestCase):
+    def setUp(self):
+        self.players = [Player(f"player-{k}", f"Player {k}", 1000) for k in range(1, 5)]
+        self.game_players = GamePlayers(self.players)
+        self.game_pots = GamePots(self.game_players)
+
+    def test_all_in_pots_are_kept(self):
+        self.game_pots.add_bets({"player-1": 100.0, "player-2": 200.0, "player-3": 200.0, "player-4": 200.0})
+        main_pot = self.game_pots[0]
+        self.game_pots.add_bets({"player-2": 50.0, "player-3": 100.0, "player-4": 100.0})
+        self.assertIs(main_pot, self.game_pots[0])
+        self.assertEqual([400, 450, 100], [pot.money for pot in self.game_pots])
+        self.assertEqual([100, 250, 300], [pot.cap for pot in self.game_pots])
+
+    def test_folders_leave_the_pots(self):
+        self.game_pots.add_bets({"player-1": 100.0, "player-2": 200.0, "player-3": 200.0, "player-4": 200.0})
+        self.game_players.fold("player-2")
+        self.game_pots.add_bets({"player-2": 50.0, "player-3": 100.0, "player-4": 100.0})
+        self.assertEqual([400, 550], [pot.money for pot in self.game_pots])
+        self.assertEqual([self.players[0], self.players[2], self.players[3]], self.game_pots[0].players)
+
+    def test_dead_players_money_stays_in_pots(self):
+        self.game_pots.add_bets({"player-1": 100.0, "player-2": 100.0, "player-3": 100.0, "player-4": 100.0})
+        self.game_players.remove("player-4")
+        self.game_pots.add_bets({"player-1": 100.0, "player-2": 100.0, "player-3": 100.0})
+        self.assertEqual(700, sum(pot.money for pot in self.game_pots))
+        self.assertNotIn(self.players[3], self.game_pots[0].players)
+
+    def test_folder_with_highest_bet(self):
+        self.game_players.fold("player-4")
+        self.assertRaises(ValueError, self.game_pots.add_bets, {"player-3": 200.0, "player-4": 400.0})
+
+
+class GamePacingTest(unittest.TestCase):
+    class ConnectedPlayer(Player):
+        connected = True
+
+    def _wait(self, pacing, players, step=GamePacing.AFTER_SHOWDOWN):
+        with mock.patch("asyncio.sleep", new=mock.AsyncMock()) as sleep:
+            asyncio.run(pacing.wait(step, GamePlayers(players)))
+        return sleep
+
+    def test_waits_when_watched(self):
+        sleep = self._wait(GamePacing.profile("normal"), [self.ConnectedPlayer("player-1", "Player One", 1000)])
+        sleep.assert_awaited_once_with(2)
+
+    def test_skips_when_unattended(self):
+        sleep = self._wait(GamePacing.profile("normal"), [Player("player-1", "Player One", 1000)])
+        sleep.assert_not_awaited()
+
+    def test_simulation_profile_never_waits(self):
+        sleep = self._wait(GamePacing.profile("simulation"), [self.ConnectedPlayer("player-1", "Player One", 1000)])
+        sleep.assert_not_awaited()
+
+    def test_unknown_profile(self):
+        self.assertRaises(ValueError, GamePacing.profile, "slow-motion")
+
+    def test_factory_passes_pacing(self):
+        pacing = GamePacing.profile("turbo")
+        game_factory = HoldemPokerGameFactory(50, 25, logging.getLogger(__name__), pacing=pacing)
+        game = game_factory.create_game([Player("player-1", "Player One", 1000), Player("player-2", "Player Two", 1000)])
+        self.assertIs(pacing, game._pacing)
+
+
+if __name__ == '__main__':
+    unittest.main()
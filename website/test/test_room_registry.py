@@ -0,0 +1,57 @@
+import asyncio
+import unittest
+
+from ..Services.Logic.Game_RoomServer import GameRoomFactory, GameServer
+from ..Services.Logic.Player_ClientChannelServer import PlayerServer
+#python -m unittest website.test.test_room_registry
+
+
+class RoomRegistryTest(unittest.TestCase):
+    class ChannelMock:
+        async def send(self, text_data=None):
+            await asyncio.sleep(0)
+
+        async def send_json(self, message):
+            pass
+
+    def _player(self, k):
+        return PlayerServer(f"player-{k}", f"Player {k}", 1000, channel=self.ChannelMock())
+
+    def test_burst_fills_rooms(self):
+        async def join():
+            server = GameServer(GameRoomFactory(game_factory=None, room_size=3))
+            rooms = await asyncio.gather(*(server._join_any_public_room(self._player(k)) for k in range(10)))
+            return server, rooms
+
+        server, rooms = asyncio.run(join())
+        self.assertEqual([1, 3, 3, 3], sorted(len(room.players) for room in set(rooms)))
+        self.assertIs(rooms[0], server.get_room(rooms[0].id))
+
+    def test_queued_players_join_once(self):
+        async def join():
+            server = GameServer(GameRoomFactory(game_factory=None, room_size=4))
+            start = asyncio.get_running_loop().create_task(server.start())
+            for k in range(7):
+                server.add_new_player(self._player(k), room_id=f"private-{k % 2}")
+            await asyncio.sleep(0)
+            await server.stop()
+            start.cancel()
+            return server
+
+        server = asyncio.run(join())
+        self.assertEqual(["player-0", "player-2", "player-4", "player-6"], sorted(server.get_room("private-0").players))
+        self.assertEqual(["player-1", "player-3", "player-5"], sorted(server.get_room("private-1").players))
+
+    def test_empty_rooms_are_reaped(self):
+        async def join_and_leave():
+            server = GameServer(GameRoomFactory(game_factory=None, room_size=3))
+            room = await server._join_private_room(self._player(1), "private-room")
+            await room.leave("player-1")
+            return server
+
+        server = asyncio.run(join_and_leave())
+        self.assertIsNone(server.get_room("private-room"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import unittest
+
+from ..Services.Logic.Game_RoomServer import GameRoomFactory
+from ..Services.Logic.Player_ClientChannelServer import PlayerServer
+from ..Services.Logic.SpectatorFeed import SpectatorFeed
+#python -m unittest website.test.test_spectator_feed
+
+
+class ChannelMock:
+    def __init__(self, blocked: bool = False):
+        self.frames = []
+        self.errors = []
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def send(self, text_data=None):
+        await self.unblocked.wait()
+        self.frames.append(json.loads(text_data))
+
+    async def send_json(self, message):
+        self.errors.append(message)
+
+
+class SpectatorFeedTest(unittest.TestCase):
+    def test_spectators_get_public_events_only(self):
+        async def run():
+            room = GameRoomFactory(game_factory=None, room_size=1).create_room("room-1")
+            await room.join(PlayerServer("player-1", "Player 1", 1000, channel=ChannelMock()))
+            spectator = ChannelMock()
+            room.watch("spectator-1", spectator)
+            await room.game_event("cards-assignment", {"event": "cards-assignment", "target": "player-1", "cards": []})
+            await room.game_event("new-game", {"event": "new-game"})
+            await asyncio.sleep(0)
+            return room, spectator
+
+        room, spectator = asyncio.run(run())
+        self.assertEqual(["update", "new-game"], [frame["event"] for frame in spectator.frames])
+        self.assertEqual(0, room.free_seats)
+
+    def test_slow_spectator_is_dropped(self):
+        async def run():
+            feed = SpectatorFeed(buffer_size=4)
+            slow, fast = ChannelMock(blocked=True), ChannelMock()
+            feed.add("slow", slow)
+            feed.add("fast", fast)
+            for k in range(10):
+                feed.publish(json.dumps({"n": k}))
+                await asyncio.sleep(0)
+            slow.unblocked.set()
+            await asyncio.sleep(0.01)
+            return feed, slow, fast
+
+        feed, slow, fast = asyncio.run(run())
+        self.assertEqual(list(range(10)), [frame["n"] for frame in fast.frames])
+        self.assertNotIn("slow", feed)
+        self.assertIn("fast", feed)
+        self.assertEqual("error", slow.errors[0]["message_type"])
+
+
+if __name__ == '__main__':
+    unittest.main()
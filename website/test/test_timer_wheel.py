@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from ..Services.Logic.Game_RoomServer import GameRoomFactory
+from ..Services.Logic.Player_ClientChannelServer import PlayerServer
+from ..Services.Logic.TimerWheel import TimerWheel
+#python -m unittest website.test.test_timer_wheel
+
+
+class TimerWheelTest(unittest.TestCase):
+    def test_timers_fire_in_order(self):
+        async def run():
+            wheel = TimerWheel(tick=0.002, slots=4, levels=2)
+            fired = []
+            # 0.05s is past the range of both levels (4 * 4 ticks)
+            for delay in (0.05, 0.001, 0.02, 0.009):
+                wheel.call_later(delay, fired.append, delay)
+            await asyncio.sleep(0.1)
+            return fired
+
+        self.assertEqual([0.001, 0.009, 0.02, 0.05], asyncio.run(run()))
+
+    def test_never_fires_early(self):
+        async def run():
+            wheel = TimerWheel(tick=0.005)
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + 0.03
+            fired_at = []
+            wheel.call_at(deadline, lambda: fired_at.append(loop.time()))
+            await asyncio.sleep(0.1)
+            return deadline, fired_at
+
+        deadline, fired_at = asyncio.run(run())
+        self.assertEqual(1, len(fired_at))
+        self.assertGreaterEqual(fired_at[0], deadline)
+
+    def test_cancelled_timer_stops_the_wheel(self):
+        async def run():
+            wheel = TimerWheel(tick=0.002)
+            fired = []
+            wheel.call_later(0.01, fired.append, 1).cancel()
+            await asyncio.sleep(0.03)
+            return fired, wheel
+
+        fired, wheel = asyncio.run(run())
+        self.assertEqual([], fired)
+        self.assertEqual(0, wheel.pending())
+
+    def test_room_inactivity_check_leaves_wheel_idle(self):
+        class ChannelMock:
+            async def send(self, text_data=None):
+                pass
+
+            async def send_json(self, message):
+                pass
+
+        async def run():
+            room = GameRoomFactory(game_factory=None, room_size=2).create_room("room-1")
+            await room.join(PlayerServer("player-1", "Player 1", 1000, channel=ChannelMock()))
+            scheduled = room._inactivity_timer is not None
+            pending = TimerWheel.shared().pending()
+            room.release()
+            return scheduled, pending, room._inactivity_timer
+
+        scheduled, pending, timer = asyncio.run(run())
+        self.assertTrue(scheduled)
+        self.assertEqual(0, pending)
+        self.assertIsNone(timer)
+
+
+if __name__ == '__main__':
+    unittest.main()
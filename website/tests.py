@@ -1,7 +1,30 @@
 from django.test import TestCase, Client
 from django.urls import reverse
 from unittest.mock import patch, MagicMock
+import atexit
 import uuid
+import asyncio
+import time
+from decimal import Decimal
+
+from django.contrib.sessions.models import Session
+from asgiref.sync import async_to_sync
+from website import sessions
+from website.Services.Logic.BankrollLedger import BankrollLedger
+from website.Services.Logic.PokerGame import Player
+from website.Services.Logic.GameWorker import GameWorker
+from website.Services.Logic.Player_ClientChannelServer import PlayerServer
+from website.Services.Logic.HandHistory import HandHistoryWriter, FinishedHand
+from users.models import Transaction, PokerGame
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+def tearDownModule():
+    # Writes the sessions the views saved while the test database exists, not at exit
+    sessions.session_writer.flush()
+
 
 class ViewsTestCase(TestCase):
     def setUp(self):
@@ -91,3 +114,212 @@ class ViewsTestCase(TestCase):
         self.assertEqual(data['status'], "Texas Hold'em game started")
         self.assertEqual(data['pid'], 12345)
         mock_popen.assert_called_with(['python', 'website/Services/texasholdem_poker_service.py'])
+
+
+class SessionStoreTestCase(TestCase):
+    def setUp(self):
+        self.writer = sessions.SessionWriter(delay=3600)
+        # The test database is gone by the time the process exits
+        self.addCleanup(atexit.unregister, self.writer.flush)
+        patcher = patch.object(sessions, 'session_writer', self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_session(self, **data):
+        session = sessions.SessionStore()
+        session.update(data)
+        session.create()
+        return session
+
+    def test_saved_session_loads_from_cache(self):
+        """
+        Test that a saved session is loaded without reading the database before its write.
+        """
+        session = self.create_session(player_id='p1')
+        session['player_money'] = 500.0
+        session.save()
+        self.assertEqual(Session.objects.get(session_key=session.session_key).get_decoded(), {'player_id': 'p1'})
+        with self.assertNumQueries(0):
+            loaded = sessions.SessionStore(session.session_key)
+            self.assertEqual(async_to_sync(loaded.aget)('player_money'), 500.0)
+            self.assertEqual(loaded['player_id'], 'p1')
+
+    def test_evicted_session_loads_pending_data(self):
+        """
+        Test that a session evicted from the cache before its write is not loaded from the database.
+        """
+        session = self.create_session(player_id='p1')
+        session['player_money'] = 500.0
+        session.save()
+        session._cache.clear()
+        self.assertEqual(sessions.SessionStore(session.session_key)['player_money'], 500.0)
+
+    def test_flush_writes_sessions(self):
+        """
+        Test that the writer stores the last data of every saved session in the database.
+        """
+        first = self.create_session(player_id='p1')
+        second = self.create_session(player_id='p2')
+        first['player_money'] = 10.0
+        first.save()
+        first['player_money'] = 20.0
+        first.save()
+        second['player_money'] = 30.0
+        second.save()
+        with self.assertNumQueries(1):
+            self.writer.flush()
+        self.assertEqual(Session.objects.get(session_key=first.session_key).get_decoded()['player_money'], 20.0)
+        self.assertEqual(Session.objects.get(session_key=second.session_key).get_decoded()['player_money'], 30.0)
+
+    def test_cached_session_expires_with_cache_timeout(self):
+        """
+        Test that a session is read from the database again once the cache TIMEOUT is over.
+        """
+        session = self.create_session(player_id='p1')
+        session['player_money'] = 500.0
+        session.save()
+        self.writer.flush()
+        later = time.time() + session._cache.default_timeout + 1
+        with patch('django.core.cache.backends.locmem.time.time', return_value=later), self.assertNumQueries(1):
+            self.assertEqual(sessions.SessionStore(session.session_key)['player_money'], 500.0)
+
+    def test_pending_sessions_written_at_exit(self):
+        """
+        Test that the sessions waiting when the process exits are written by the exit hook.
+        """
+        with patch('website.sessions.atexit.register') as register:
+            session = self.create_session(player_id='p1')
+            session['player_money'] = 500.0
+            session.save()
+            session['player_money'] = 600.0
+            session.save()
+        register.assert_called_once_with(self.writer.flush)
+        register.call_args[0][0]()
+        self.assertEqual(Session.objects.get(session_key=session.session_key).get_decoded()['player_money'], 600.0)
+
+    def test_delete_cancels_pending_write(self):
+        """
+        Test that a deleted session is not written back by the writer.
+        """
+        session = self.create_session(player_id='p1')
+        session['player_money'] = 500.0
+        session.save()
+        session_key = session.session_key
+        session.delete()
+        self.writer.flush()
+        self.assertFalse(Session.objects.filter(session_key=session_key).exists())
+        self.assertIsNone(self.writer.pending(session_key))
+
+
+class BankrollLedgerTestCase(TestCase):
+    def test_flush_writes_hands(self):
+        """
+        Test that the chip movements of the queued hands are written in one insert.
+        """
+        ledger = BankrollLedger()
+        alice = User.objects.create(username='alice')
+        first = Player('p1', 'Player 1', 1000.0)
+        first.user_id = alice.id
+        second = Player('p2', 'Player 2', 1000.0)
+
+        async def play():
+            hand_ledger = ledger.hand_ledger('game-1', 0)
+            hand_ledger.take(first, 25.0, 'blind')
+            hand_ledger.take(second, 50.0, 'blind')
+            hand_ledger.give(second, 75.0, 'win')
+            hand_ledger.commit()
+            hand_ledger = ledger.hand_ledger('game-2', 1)
+            hand_ledger.take(first, 0.5, 'bet')
+            hand_ledger.commit()
+            await ledger.flush()
+
+        with self.assertNumQueries(1):
+            async_to_sync(play)()
+        movements = list(Transaction.objects.order_by('id').values_list('player_id', 'hand', 'transaction_type', 'units'))
+        self.assertEqual([
+            ('p1', 0, 'blind', -2500),
+            ('p2', 0, 'blind', -5000),
+            ('p2', 0, 'win', 7500),
+            ('p1', 1, 'bet', -50),
+        ], movements)
+        self.assertEqual(Transaction.objects.get(hand=1).amount, Decimal('-0.50'))
+        self.assertEqual(['p1', 'p1'], list(Transaction.objects.filter(user=alice).values_list('player_id', flat=True)))
+        self.assertFalse(Transaction.objects.filter(player_id='p2', user__isnull=False).exists())
+
+
+class GameWorkerTestCase(TestCase):
+    class ChannelMock:
+        reply_channel = 'consumer-1'
+
+        async def send_json(self, message):
+            pass
+
+    def setUp(self):
+        self.writer = sessions.SessionWriter(delay=3600)
+        # The test database is gone by the time the process exits
+        self.addCleanup(atexit.unregister, self.writer.flush)
+        patcher = patch.object(sessions, 'session_writer', self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_leaving_player_money_saved(self):
+        """
+        Test that the worker stores the chips of a leaving player in its session, its consumer is gone.
+        """
+        session = sessions.SessionStore()
+        session.update({'player_id': 'p1', 'player_money': 1000.0})
+        session.create()
+        room = MagicMock()
+        game_server = MagicMock()
+        game_server.get_room.return_value = room
+        worker = GameWorker('poker-worker-0', ['poker-worker-0'], game_server, channel_layer=MagicMock())
+
+        async def leave():
+            player = PlayerServer('p1', 'Player 1', 750.0, channel=self.ChannelMock(), session_key=session.session_key)
+            room.players = {'p1': player}
+            await worker.dispatch({'type': 'player.leave', 'room_id': 'room-1', 'player_id': 'p1'})
+
+        async_to_sync(leave)()
+        self.assertEqual(sessions.SessionStore(session.session_key)['player_money'], 750.0)
+        self.writer.flush()
+        self.assertEqual(Session.objects.get(session_key=session.session_key).get_decoded()['player_money'], 750.0)
+
+
+class HandHistoryWriterTestCase(TestCase):
+    def test_flush_writes_batch(self):
+        """
+        Test that a batch of hands takes one insert for the games and one for their players.
+        """
+        alice = User.objects.create(username='alice')
+        bob = User.objects.create(username='bob')
+        writer = HandHistoryWriter(batch_size=10, max_delay=60)
+
+        async def play():
+            writer.submit(FinishedHand(log='{"event":"new-game"}', pot=150.0, user_ids=[alice.id, bob.id], winner_user_id=bob.id, end_time=timezone.now()))
+            writer.submit(FinishedHand(log='{"event":"new-game"}', pot=75.5, user_ids=[alice.id], winner_user_id=None, end_time=timezone.now()))
+            await writer.flush()
+
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(play)()
+        inserts = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(2, len(inserts))
+        games = list(PokerGame.objects.order_by('id'))
+        self.assertEqual([Decimal('150.00'), Decimal('75.50')], [game.pot for game in games])
+        self.assertEqual(bob, games[0].winner)
+        self.assertEqual({alice, bob}, set(games[0].players.all()))
+        self.assertEqual([alice], list(games[1].players.all()))
+        self.assertEqual({games[0].start_time}, set(games[0].gameplayer_set.values_list('start_time', flat=True)))
+
+    def test_full_batch_written_without_delay(self):
+        """
+        Test that the writer does not wait for the delay once a batch is full.
+        """
+        writer = HandHistoryWriter(batch_size=2, max_delay=60)
+
+        async def play():
+            for _ in range(2):
+                writer.submit(FinishedHand(log='', pot=10.0, user_ids=[], winner_user_id=None, end_time=timezone.now()))
+            await asyncio.wait_for(writer._writer, 5)
+
+        async_to_sync(play)()
+        self.assertEqual(2, PokerGame.objects.count())